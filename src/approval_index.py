@@ -0,0 +1,164 @@
+"""
+Authorization index for approved users and domains.
+
+The Bot configuration may list thousands of approved users and many domains.
+Instead of scanning the lists on every message, the index is built once
+when the configuration is (re)loaded:
+- users are stored in a case-folded hash set
+- domains are stored in a trie of reversed domain labels ("com" -> "example" -> "sub"),
+  so "user@sub.example.com" is approved by "example.com" in as many steps
+  as there are labels in the user's domain, regardless of the list size
+
+Additional users and domains can be bulk loaded from an external CSV or JSON file
+(see load_approval_file()).
+
+run: python approval_index.py [entries] for a benchmark against the linear list scan
+"""
+
+import os
+import csv
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+DOMAIN_END = "$" # trie node marker for the end of an approved domain
+
+class ApprovalIndex(object):
+    """
+    Case-insensitive index of approved users and domains.
+
+    Attributes:
+        users (set): case-folded e-mail addresses
+        domains (dict): trie of reversed domain labels
+        include_subdomains (bool): approve also subdomains of the approved domains
+    """
+    def __init__(self, users = [], domains = [], include_subdomains = False):
+        self.users = set()
+        self.domains = {}
+        self.domain_count = 0
+        self.include_subdomains = include_subdomains
+
+        self.add_users(users)
+        self.add_domains(domains)
+
+    def __len__(self):
+        return len(self.users) + self.domain_count
+
+    def add_users(self, users):
+        for user in users:
+            user = user.strip().casefold()
+            if len(user) > 0:
+                self.users.add(user)
+
+    def add_domains(self, domains):
+        for domain in domains:
+            labels = self._domain_labels(domain)
+            if len(labels) == 0:
+                continue
+            node = self.domains
+            for label in labels:
+                node = node.setdefault(label, {})
+            if not DOMAIN_END in node:
+                node[DOMAIN_END] = True
+                self.domain_count += 1
+
+    def user_approved(self, user_email):
+        """
+        Check if the user is approved either by e-mail or by e-mail domain.
+
+        Parameters:
+            user_email (str): user's e-mail address
+
+        Returns:
+            bool: True if the user is approved
+        """
+        if user_email is None:
+            return False
+        user_email = user_email.strip().casefold()
+        if user_email in self.users:
+            return True
+
+        _, sep, domain = user_email.rpartition("@")
+        if len(sep) == 0:
+            return False
+        return self.domain_approved(domain)
+
+    def domain_approved(self, domain):
+        node = self.domains
+        for label in self._domain_labels(domain):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self.include_subdomains and DOMAIN_END in node:
+                return True
+
+        return DOMAIN_END in node
+
+    @staticmethod
+    def _domain_labels(domain):
+        return [label for label in reversed(domain.strip().strip(".").casefold().split(".")) if len(label) > 0]
+
+def load_approval_file(file_name):
+    """
+    Load approved users and domains from an external file.
+
+    Supported formats:
+    - JSON: {"approved_users": [...], "approved_domains": [...]} or a plain list of entries
+    - CSV / plain text: one entry per line or per cell, optional header
+
+    Entries containing "@" are treated as users, other entries as domains.
+
+    Parameters:
+        file_name (str): path to the file
+
+    Returns:
+        tuple: (list of users, list of domains)
+    """
+    users = []
+    domains = []
+
+    def add_entry(entry):
+        entry = str(entry).strip()
+        if len(entry) == 0 or entry.lower() in ("email", "user", "domain", "approved_users", "approved_domains"):
+            return
+        if "@" in entry:
+            users.append(entry)
+        else:
+            domains.append(entry)
+
+    try:
+        with open(file_name, newline = "") as file:
+            if os.path.splitext(file_name)[1].lower() == ".json":
+                data = json.load(file)
+                if isinstance(data, dict):
+                    users += data.get("approved_users", [])
+                    domains += data.get("approved_domains", [])
+                else:
+                    for entry in data:
+                        add_entry(entry)
+            else:
+                for row in csv.reader(file):
+                    for entry in row:
+                        add_entry(entry)
+        logger.info(f"loaded {len(users)} users and {len(domains)} domains from {file_name}")
+    except (OSError, ValueError) as e:
+        logger.error(f"approval file {file_name} load exception: {e}")
+
+    return users, domains
+
+if __name__ == "__main__":
+    import sys
+    import timeit
+
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    user_list = [f"user{i}@domain{i % 1000}.example.com" for i in range(entries)]
+    domain_list = [f"org{i}.example.net" for i in range(entries)]
+    index = ApprovalIndex(user_list, domain_list)
+
+    probes = [user_list[-1], "someone@dept.org" + str(entries - 1) + ".example.net", "nobody@unknown.example.org"]
+    rounds = 100
+    for probe in probes:
+        linear = timeit.timeit(lambda: probe in user_list or probe.split("@")[1] in domain_list, number = rounds) / rounds
+        indexed = timeit.timeit(lambda: index.user_approved(probe), number = rounds) / rounds
+        print(f"{probe}: linear scan {linear * 1e6:.1f} us, index {indexed * 1e6:.1f} us")
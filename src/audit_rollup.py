@@ -0,0 +1,142 @@
+"""
+Running usage rollups of the audit records.
+
+Every audit record updates the counters of its day (UTC), meeting host and requester
+as it is written, so the usage reports are served without reading the audit log.
+The counters are kept for the last "days" days in an SQLite database ("path"),
+each record is an atomic increment, so several Bot processes can share the rollups.
+Without a path the counters are kept in an in-memory database of the process.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_DAYS = 90
+TOP_ENTRIES = 10
+
+TOTAL = "total"
+HOST = "host"
+REQUESTER = "requester"
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS usage (day TEXT NOT NULL, scope TEXT NOT NULL, name TEXT NOT NULL,
+    counter TEXT NOT NULL, n INTEGER NOT NULL, PRIMARY KEY (day, scope, name, counter))"""
+
+def _counters(status, recordings):
+    return {"requests": 1, status: 1, "recordings": recordings}
+
+class AuditRollup(object):
+    """
+    Per-day, per-host and per-requester counters of requests, statuses and served recordings.
+    """
+    def __init__(self, days = ROLLUP_DAYS, path = None):
+        self._lock = threading.Lock()
+        self._connection = None
+        self._purged_day = None
+        self.enabled = True
+        self.days = days
+        self.path = None
+        self.configure({"days": days, "path": path})
+
+    def configure(self, options):
+        path = options.get("path")
+        with self._lock:
+            self.enabled = options.get("enabled", True)
+            self.days = options.get("days", ROLLUP_DAYS)
+            if self._connection is None or path != self.path:
+                self.path = path
+                self._open(path)
+
+    def _open(self, path):
+        if self._connection is not None:
+            self._connection.close()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok = True)
+        # a single connection serialized by the lock, the processes are serialized by SQLite
+        self._connection = sqlite3.connect(path or ":memory:", timeout = 30, isolation_level = None, check_same_thread = False)
+        if path:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(SCHEMA)
+        self._purged_day = None
+        logger.info(f"audit rollup {path or 'in memory'} opened")
+
+    def record(self, entry, timestamp = None):
+        """
+        Add an audit record (see recording_bot.audit_log()).
+        """
+        if not self.enabled:
+            return
+        moment = datetime.fromtimestamp(timestamp or time.time(), timezone.utc)
+        day = moment.strftime("%Y-%m-%d")
+        status = entry.get("status") or "unknown"
+        recordings = sum(len(meeting.get("recordings", [])) for meeting in entry.get("recordings") or [])
+        host = (entry.get("meeting_host") or "-").casefold()
+        requester = (entry.get("requestor") or "-").casefold()
+        rows = [(day, scope, name, counter, value) for scope, name in ((TOTAL, "-"), (HOST, host), (REQUESTER, requester))
+            for counter, value in _counters(status, recordings).items()]
+        with self._lock:
+            connection = self._connection
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    connection.executemany("INSERT INTO usage (day, scope, name, counter, n) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT (day, scope, name, counter) DO UPDATE SET n = n + excluded.n", rows)
+                    if day != self._purged_day:
+                        oldest = (moment - timedelta(days = self.days)).strftime("%Y-%m-%d")
+                        connection.execute("DELETE FROM usage WHERE day <= ?", (oldest,))
+                        self._purged_day = day
+                    connection.execute("COMMIT")
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+            except sqlite3.Error as e:
+                logger.error(f"audit rollup {self.path} update failed: {e}")
+
+    def _totals(self, scope, since, names = None):
+        query = "SELECT name, counter, SUM(n) FROM usage WHERE scope = ? AND day >= ?"
+        parameters = [scope, since]
+        if names is not None:
+            query += f" AND name IN ({', '.join('?' * len(names))})"
+            parameters += names
+        result = {}
+        for name, counter, value in self._connection.execute(query + " GROUP BY name, counter", parameters):
+            result.setdefault(name, {})[counter] = value
+        return result
+
+    def _top(self, scope, since, top):
+        names = [row[0] for row in self._connection.execute("SELECT name FROM usage WHERE scope = ? AND day >= ? "
+            "AND counter = 'requests' GROUP BY name ORDER BY SUM(n) DESC, name LIMIT ?", (scope, since, top))]
+        counters = self._totals(scope, since, names) if names else {}
+        return [dict(counters.get(name, {}), name = name) for name in names]
+
+    def report(self, days = 30, top = TOP_ENTRIES):
+        """
+        Usage of the last "days" days (including today).
+
+        Returns:
+            dict: since (day), totals, per-day totals, top hosts and requesters by the number of requests
+        """
+        since = (datetime.now(timezone.utc) - timedelta(days = days - 1)).strftime("%Y-%m-%d")
+        per_day = {}
+        with self._lock:
+            for day, counter, value in self._connection.execute("SELECT day, counter, n FROM usage "
+                    "WHERE scope = ? AND day >= ? ORDER BY day", (TOTAL, since)):
+                per_day.setdefault(day, {})[counter] = value
+            totals = self._totals(TOTAL, since).get("-", {})
+            hosts = self._top(HOST, since, top)
+            requesters = self._top(REQUESTER, since, top)
+        return {
+            "since": since,
+            "totals": totals,
+            "days": per_day,
+            "hosts": hosts,
+            "requesters": requesters
+        }
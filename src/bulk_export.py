@@ -0,0 +1,213 @@
+"""
+Bulk export of recording links for compliance pulls.
+
+A list of meeting numbers and/or host e-mails is resolved in a thread pool, all Webex API
+calls share a TokenBucket rate budget. Each recording is written to the manifest
+(CSV or JSON lines) as soon as it is resolved, so the memory use doesn't depend
+on the number of recordings. The finished manifest file is then delivered
+as a Webex message attachment or an HTTP download.
+"""
+
+import re
+import os
+import csv
+import json
+import time
+import logging
+import tempfile
+import threading
+import concurrent.futures
+from datetime import datetime, timedelta, timezone
+
+try:
+    from .metrics import metrics
+except:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+EXPORT_WORKERS = 4
+MANIFEST_FIELDS = ["meeting_number", "meeting_id", "topic", "host_email", "time_recorded", "duration",
+    "audio_url", "video_url", "expiration"]
+MANIFEST_FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson"
+}
+
+ENTRY_SEPARATORS = re.compile(r"[,;\n]+")
+EMAIL_PATTERN = re.compile(r"^\S+@\S{2,}\.\S{2,}$")
+MEETING_NUMBER_PATTERN = re.compile(r"^[\d\s]+$")
+DATE_RANGE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})(?:\s*\.\.\s*(\d{4}-\d{2}-\d{2}))?")
+FORMAT_PATTERN = re.compile(r"\b(csv|jsonl)\b", re.IGNORECASE)
+
+class ExportRequestError(ValueError):
+    pass
+
+def parse_targets(entries):
+    """
+    Split the export entries to meeting numbers and host e-mails. A meeting number
+    can be followed by its host e-mail in the same entry.
+
+    Parameters:
+        entries (str or list): entries separated by comma, semicolon or new line
+
+    Returns:
+        list: ("meeting", number, host e-mail or None) and ("host", e-mail, e-mail) tuples, duplicates removed
+    """
+    if isinstance(entries, str):
+        entries = ENTRY_SEPARATORS.split(entries)
+    result = []
+    seen = set()
+    for entry in entries:
+        words = str(entry).split()
+        emails = [word.casefold() for word in words if EMAIL_PATTERN.match(word)]
+        number = " ".join(word for word in words if not EMAIL_PATTERN.match(word))
+        if number:
+            if not MEETING_NUMBER_PATTERN.match(number) or len(emails) > 1:
+                raise ExportRequestError(f"invalid entry \"{entry.strip()}\"")
+            targets = [("meeting", number.replace(" ", ""), emails[0] if emails else None)]
+        else:
+            targets = [("host", email, email) for email in emails]
+        for target in targets:
+            if target not in seen:
+                seen.add(target)
+                result.append(target)
+    return result
+
+def parse_date(value, end_of_day = False):
+    moment = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo = timezone.utc)
+    if end_of_day:
+        moment += timedelta(days = 1)
+    return moment
+
+def parse_export_command(text, default_days):
+    """
+    Parse the "export" command: [csv|jsonl] [YYYY-MM-DD[..YYYY-MM-DD]] <entries>
+
+    Returns:
+        tuple: (targets, from_time, to_time, format)
+    """
+    manifest_format = "csv"
+    format_match = FORMAT_PATTERN.search(text)
+    if format_match is not None:
+        manifest_format = format_match.group(1).lower()
+        text = text[:format_match.start()] + text[format_match.end():]
+    to_time = datetime.now(timezone.utc)
+    from_time = to_time - timedelta(days = default_days)
+    date_match = DATE_RANGE_PATTERN.search(text)
+    if date_match is not None:
+        from_time = parse_date(date_match.group(1))
+        if date_match.group(2):
+            to_time = min(to_time, parse_date(date_match.group(2), end_of_day = True))
+        text = text[:date_match.start()] + text[date_match.end():]
+    return parse_targets(text), from_time, to_time, manifest_format
+
+def time_windows(from_time, to_time, days):
+    """
+    Split the time range to windows of at most "days" (the Webex list APIs limit the range).
+    """
+    start = from_time
+    while start < to_time:
+        end = min(to_time, start + timedelta(days = days))
+        yield start, end
+        start = end
+
+def webex_time(moment):
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+class ManifestWriter(object):
+    """
+    Thread-safe incremental writer of the manifest rows to a file.
+    """
+    def __init__(self, file, manifest_format = "csv"):
+        if manifest_format not in MANIFEST_FORMATS:
+            raise ExportRequestError(f"unknown manifest format {manifest_format}")
+        self.file = file
+        self.format = manifest_format
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._csv = None
+        if manifest_format == "csv":
+            self._csv = csv.DictWriter(file, fieldnames = MANIFEST_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, row):
+        with self._lock:
+            if self._csv is not None:
+                self._csv.writerow(row)
+            else:
+                self.file.write(json.dumps(row) + "\n")
+            self.rows += 1
+
+def manifest_row(rec, meeting_number = None):
+    return {
+        "meeting_number": meeting_number or "",
+        "meeting_id": rec.meeting_id,
+        "topic": rec.topic,
+        "host_email": rec.host_email,
+        "time_recorded": rec.time_recorded,
+        "duration": rec.duration,
+        "audio_url": rec.audio_url,
+        "video_url": rec.video_url,
+        "expiration": rec.expiration
+    }
+
+class BulkExport(object):
+    """
+    Resolve the export targets concurrently and write the manifest.
+
+    Attributes:
+        resolve (callable): resolve(target, from_time, to_time) -> iterator of (meeting number, Recording),
+            makes the API calls through the shared limiter
+        workers (int): number of targets resolved in parallel
+    """
+    def __init__(self, resolve, workers = EXPORT_WORKERS):
+        self.resolve = resolve
+        self.workers = workers
+
+    def run(self, targets, from_time, to_time, writer):
+        """
+        Returns:
+            dict: export summary - targets, recordings, failed targets, duration
+        """
+        started = time.monotonic()
+        failed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers = self.workers, thread_name_prefix = "export") as executor:
+            futures = {executor.submit(self._export_target, target, from_time, to_time, writer): target for target in targets}
+            for future in concurrent.futures.as_completed(futures):
+                target = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"export of {target[0]} {target[1]} failed: {e}")
+                    failed.append(f"{target[1]}: {e}")
+        duration = time.monotonic() - started
+        metrics.observe("export.duration", duration)
+        metrics.inc("export.recordings", writer.rows)
+        logger.info(f"export of {len(targets)} targets finished in {duration:.1f}s, {writer.rows} recordings, {len(failed)} failed")
+        return {
+            "targets": len(targets),
+            "recordings": writer.rows,
+            "failed": failed,
+            "duration": round(duration, 1)
+        }
+
+    def _export_target(self, target, from_time, to_time, writer):
+        for meeting_number, rec in self.resolve(target, from_time, to_time):
+            writer.write(manifest_row(rec, meeting_number))
+
+def export_to_file(export, targets, from_time, to_time, manifest_format = "csv", directory = None):
+    """
+    Run the export into a temporary file.
+
+    Returns:
+        tuple: (file path, summary) - the caller removes the file after delivery
+    """
+    file_descriptor, path = tempfile.mkstemp(prefix = "recordings_", suffix = f".{manifest_format}", dir = directory)
+    try:
+        with os.fdopen(file_descriptor, "w", newline = "") as file:
+            summary = export.run(targets, from_time, to_time, ManifestWriter(file, manifest_format))
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, summary
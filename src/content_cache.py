@@ -0,0 +1,281 @@
+"""
+Size-bounded on-disk cache of recording files.
+
+When several participants of the same meeting ask for the audio, the recording is downloaded
+only once. Files are keyed by recording id and media type ("audio", "video"):
+- files are written to a temporary name and atomically renamed when complete
+- the index is a SQLite database (WAL mode), safe for concurrent readers and for
+  several Bot processes sharing the cache directory
+- the least recently used files are evicted when the total size exceeds "max_bytes"
+- concurrent requests for the same missing file wait for a single download
+  (thread lock within the process, fcntl lock file across processes)
+- cached files are served via mmap, so the upload reads the pages directly
+  from the page cache
+"""
+
+import os
+import mmap
+import time
+import fcntl
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    from .recording_download import download_recording, probe, stream_recording
+except:
+    from recording_download import download_recording, probe, stream_recording
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.db"
+MAX_BYTES = 2 * 1024 * 1024 * 1024
+MEDIA_EXTENSIONS = {
+    "audio": ".mp3",
+    "video": ".mp4"
+}
+
+def _map_file(path, size):
+    """
+    Open the file for reading via mmap (empty files can't be mapped).
+    """
+    with open(path, "rb") as file:
+        if size == 0:
+            return open(path, "rb"), 0
+        mapped = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        return mapped, size
+
+class ContentCache(object):
+    """
+    On-disk LRU cache of recording files.
+
+    Attributes:
+        root (str): cache directory
+        max_bytes (int): maximum total size of the cached files
+    """
+    def __init__(self, root, max_bytes = MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok = True)
+
+        self._local = threading.local()
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        with self._db() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, file TEXT NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(os.path.join(self.root, INDEX_FILE), timeout = 30, isolation_level = None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _db(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _key(recording_id, media):
+        return f"{media}:{recording_id}"
+
+    def _file_name(self, key, media):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + MEDIA_EXTENSIONS.get(media, ".bin")
+
+    def get(self, recording_id, media):
+        """
+        Get the path and size of a cached file.
+
+        Returns:
+            tuple: (path, size) or (None, None) if not cached
+        """
+        key = self._key(recording_id, media)
+        connection = self._connection()
+        row = connection.execute("SELECT file, size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, None
+        path = os.path.join(self.root, row[0])
+        if not os.path.exists(path):
+            with self._db() as db:
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None, None
+        connection.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return path, row[1]
+
+    def open(self, recording_id, media):
+        """
+        Open a cached file for reading via mmap.
+
+        Returns:
+            tuple: (mmap, size) or (None, None) if not cached
+        """
+        path, size = self.get(recording_id, media)
+        if path is None:
+            return None, None
+        try:
+            return _map_file(path, size)
+        except FileNotFoundError:
+            # evicted by another process in the meantime
+            return None, None
+
+    def put_file(self, recording_id, media, temp_path):
+        """
+        Move a complete downloaded file into the cache.
+
+        Returns:
+            tuple: (path, size)
+        """
+        key = self._key(recording_id, media)
+        file_name = self._file_name(key, media)
+        path = os.path.join(self.root, file_name)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        now = time.time()
+        with self._db() as db:
+            db.execute("INSERT OR REPLACE INTO entries (key, file, size, created, last_access) VALUES (?, ?, ?, ?, ?)", (key, file_name, size, now, now))
+        self.evict()
+        return path, size
+
+    def put_chunks(self, recording_id, media, chunks):
+        """
+        Write the chunks to the cache atomically.
+
+        Returns:
+            tuple: (path, size)
+        """
+        temp_path = os.path.join(self.root, f".{threading.get_ident()}.{time.monotonic_ns()}.tmp")
+        try:
+            with open(temp_path, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                file.flush()
+                os.fsync(file.fileno())
+            return self.put_file(recording_id, media, temp_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @contextmanager
+    def _key_lock(self, key):
+        """
+        Exclusive lock of a key within the process and across the processes. The thread lock
+        and the lock file are removed by the last holder.
+        """
+        with self._key_locks_lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                lock_path = os.path.join(self.root, "." + hashlib.sha256(key.encode("utf-8")).hexdigest() + ".lock")
+                while True:
+                    lock_file = open(lock_path, "a")
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        # the file may have been removed by its previous holder while we waited
+                        if os.path.samestat(os.fstat(lock_file.fileno()), os.stat(lock_path)):
+                            break
+                    except FileNotFoundError:
+                        pass
+                    lock_file.close()
+                try:
+                    yield
+                finally:
+                    os.remove(lock_path)
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+        finally:
+            with self._key_locks_lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def open_or_fetch(self, recording_id, media, url):
+        """
+        Open the cached file, download it first if not cached. Concurrent requests
+        for the same file share a single download. A file larger than the whole cache
+        is not cached: it is streamed from the URL if its size is known in advance,
+        otherwise served once from the downloaded file.
+
+        Returns:
+            tuple: (mmap or other readable body, size)
+        """
+        mapped, size = self.open(recording_id, media)
+        if mapped is not None:
+            self.hits += 1
+            return mapped, size
+
+        key = self._key(recording_id, media)
+        with self._key_lock(key):
+            mapped, size = self.open(recording_id, media)
+            if mapped is not None:
+                self.hits += 1
+                return mapped, size
+            self.misses += 1
+            size, _, _ = probe(url)
+            if size is not None and size > self.max_bytes:
+                logger.info(f"{key} of {size} bytes exceeds the cache size, streamed without caching")
+                return stream_recording(url), size
+            temp_path = os.path.join(self.root, f".{self._file_name(key, media)}.download")
+            download_recording(url, temp_path)
+            size = os.path.getsize(temp_path)
+            if size > self.max_bytes:
+                logger.info(f"{key} of {size} bytes exceeds the cache size, served without caching")
+                try:
+                    # the unlinked file disappears when the reader closes it
+                    return _map_file(temp_path, size)
+                finally:
+                    os.remove(temp_path)
+            self.put_file(recording_id, media, temp_path)
+            return self.open(recording_id, media)
+
+    def evict(self):
+        """
+        Remove the least recently used files until the total size fits into max_bytes.
+        """
+        removed = []
+        with self._db() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            for key, file_name, size in db.execute("SELECT key, file, size FROM entries ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                removed.append(file_name)
+                total -= size
+        # open readers keep their data, unlinked files disappear after they are closed
+        for file_name in removed:
+            try:
+                os.remove(os.path.join(self.root, file_name))
+            except FileNotFoundError:
+                pass
+        logger.info(f"evicted {len(removed)} files from content cache")
+        return len(removed)
+
+    def stats(self):
+        row = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "files": row[0],
+            "bytes": row[1],
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
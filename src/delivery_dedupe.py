@@ -0,0 +1,153 @@
+"""
+Detection of duplicate event deliveries.
+
+Webex redelivers a webhook if the response is slow and the websocket may replay
+activities after a reconnect. Every event id is remembered for "ttl" seconds,
+an event seen before is skipped. The in-memory set is bounded by "max_entries",
+the oldest ids are dropped first. For several Bot processes behind a load balancer
+the ids can be stored in a shared SQLite database ("store_path").
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+try:
+    from .metrics import metrics
+except:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_TTL = 3600
+MAX_ENTRIES = 100000
+PURGE_INTERVAL = 300 # seconds between removals of expired ids from the database
+
+class DeliveryDedupe(object):
+    """
+    Time and size bounded set of seen event ids.
+
+    Attributes:
+        ttl (float): how long an id is remembered, in seconds
+        max_entries (int): maximum number of ids kept in memory
+        store_path (str): optional SQLite database shared by several processes
+    """
+    def __init__(self, ttl = DEDUPE_TTL, max_entries = MAX_ENTRIES, store_path = None):
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()
+        self._local = threading.local()
+        self._last_purge = 0
+        self.configure({"ttl": ttl, "max_entries": max_entries, "store_path": store_path})
+
+    def configure(self, options):
+        with self._lock:
+            self.ttl = options.get("ttl", DEDUPE_TTL)
+            self.max_entries = options.get("max_entries", MAX_ENTRIES)
+            store_path = options.get("store_path")
+            if store_path != getattr(self, "store_path", None):
+                self._local = threading.local()
+            self.store_path = store_path
+        if self.store_path is not None:
+            directory = os.path.dirname(self.store_path)
+            if directory:
+                os.makedirs(directory, exist_ok = True)
+            self._connection().execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.store_path, timeout = 30, isolation_level = None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def first_seen(self, key):
+        """
+        Record the event id.
+
+        Returns:
+            bool: True if the id wasn't seen within the ttl, False for a duplicate
+        """
+        if key is None:
+            return True
+        now = time.time()
+        with self._lock:
+            while len(self._seen) > 0:
+                oldest_key, expires = next(iter(self._seen.items()))
+                if expires > now and len(self._seen) < self.max_entries:
+                    break
+                del self._seen[oldest_key]
+            expires = self._seen.get(key)
+            if expires is not None and expires > now:
+                duplicate = True
+            else:
+                duplicate = False
+                self._seen[key] = now + self.ttl
+                self._seen.move_to_end(key)
+
+        if not duplicate and self.store_path is not None:
+            duplicate = not self._store_first_seen(key, now)
+            if duplicate:
+                # seen by another process, which may forget() it after a failure
+                with self._lock:
+                    self._seen.pop(key, None)
+
+        if duplicate:
+            metrics.inc("dedupe.duplicates")
+            logger.info(f"duplicate delivery of {key}, skipping")
+        return not duplicate
+
+    def _store_first_seen(self, key, now):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT expires FROM seen WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] > now:
+                connection.execute("COMMIT")
+                return False
+            connection.execute("INSERT OR REPLACE INTO seen (key, expires) VALUES (?, ?)", (key, now + self.ttl))
+            if now - self._last_purge > PURGE_INTERVAL:
+                self._last_purge = now
+                connection.execute("DELETE FROM seen WHERE expires < ?", (now,))
+            connection.execute("COMMIT")
+            return True
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def forget(self, key):
+        """
+        Remove the event id, so that a redelivery of a failed event is processed again.
+        """
+        if key is None:
+            return
+        with self._lock:
+            self._seen.pop(key, None)
+        if self.store_path is not None:
+            self._connection().execute("DELETE FROM seen WHERE key = ?", (key,))
+
+    def __len__(self):
+        return len(self._seen)
+
+def webhook_delivery_key(webhook):
+    """
+    Get the id of the event from a webhook payload (message, attachmentAction, meeting or recording id).
+    """
+    try:
+        return f"{webhook['resource']}:{webhook['event']}:{webhook['data']['id']}"
+    except (KeyError, TypeError):
+        return None
+
+def websocket_delivery_key(msg):
+    """
+    Get the id of the activity from a websocket message.
+    """
+    try:
+        activity = msg["data"]["activity"]
+        return f"{activity['verb']}:{activity['id']}"
+    except (KeyError, TypeError):
+        return None
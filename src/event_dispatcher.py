@@ -0,0 +1,91 @@
+"""
+Concurrent dispatch of incoming events with per-key ordering.
+
+Events of the same key (Webex space) are processed one after another in the order
+of arrival, events of different keys run in parallel in a bounded thread pool.
+The caller never blocks: if the number of pending events exceeds "max_pending",
+new events are rejected.
+"""
+
+import time
+import logging
+import threading
+import concurrent.futures
+from collections import deque
+
+try:
+    from .metrics import metrics as default_metrics
+except:
+    from metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_WORKERS = 8
+MAX_PENDING = 1000
+
+class KeyedDispatcher(object):
+    """
+    Bounded thread pool with serial processing per key.
+
+    Attributes:
+        workers (int): number of worker threads
+        max_pending (int): maximum number of queued and running events
+    """
+    def __init__(self, workers = DISPATCH_WORKERS, max_pending = MAX_PENDING, metrics = None, name = "dispatcher"):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.metrics = metrics or default_metrics
+        self.name = name
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = workers, thread_name_prefix = name)
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._pending = 0
+
+        self.metrics.register_gauge(f"{name}.pending", lambda: self._pending)
+        self.metrics.register_gauge(f"{name}.active_keys", lambda: len(self._queues))
+
+    def submit(self, key, function, *args, **kwargs):
+        """
+        Queue function(*args, **kwargs) after the previous events of the same key.
+
+        Returns:
+            bool: False if the event was rejected because of too many pending events
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.metrics.inc(f"{self.name}.rejected")
+                logger.warning(f"{self.name}: {self._pending} events pending, rejecting event for {key}")
+                return False
+            self._pending += 1
+            item = (function, args, kwargs, time.monotonic())
+            queue = self._queues.get(key)
+            if queue is not None:
+                # a worker is already processing this key, it will pick the item up
+                queue.append(item)
+                return True
+            self._queues[key] = deque([item])
+        self.executor.submit(self._run, key)
+        return True
+
+    def _run(self, key):
+        with self._lock:
+            function, args, kwargs, enqueued = self._queues[key][0]
+        self.metrics.observe(f"{self.name}.queue_wait", time.monotonic() - enqueued)
+        try:
+            function(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"{self.name}: event processing for {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+                queue = self._queues[key]
+                queue.popleft()
+                if len(queue) == 0:
+                    del self._queues[key]
+                    key = None
+            if key is not None:
+                # give other keys a chance before processing the next event of this key
+                self.executor.submit(self._run, key)
+
+    def shutdown(self, wait = True):
+        self.executor.shutdown(wait = wait)
@@ -0,0 +1,174 @@
+"""
+Cost-aware fair scheduler for recording requests.
+
+Each user has a separate queue. Queues are served by deficit round robin:
+in every round a user's deficit grows by "quantum" times the user's weight and the user
+may run requests until the deficit is spent. A burst of requests from one user thus
+doesn't delay the other users more than one request each. Requests with cost over
+"heavy_cost" (long "days back" ranges, large series) may run only "max_heavy" at a time,
+so cheap requests always find a free worker.
+
+Queue wait and service time are reported to the metrics registry.
+"""
+
+import time
+import logging
+import threading
+import concurrent.futures
+from collections import deque
+
+try:
+    from .metrics import metrics as default_metrics
+except:
+    from metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+WORKERS = 4
+MAX_HEAVY = 1
+HEAVY_COST = 20
+QUANTUM = 10
+MIN_WEIGHT = 0.01 # a user's deficit must grow, otherwise the round robin never ends
+
+class _Job(object):
+    __slots__ = ("user", "cost", "function", "args", "kwargs", "future", "enqueued")
+
+    def __init__(self, user, cost, function, args, kwargs):
+        self.user = user
+        self.cost = cost
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.future = concurrent.futures.Future()
+        self.enqueued = time.monotonic()
+
+class FairScheduler(object):
+    """
+    Per-user queues served by weighted deficit round robin with a cap on heavy requests.
+
+    Attributes:
+        workers (int): number of worker threads
+        max_heavy (int): maximum number of heavy requests running at once
+        heavy_cost (float): cost from which a request is considered heavy
+        quantum (float): deficit added to a user in each round
+        weights (dict): user -> weight, default 1, at least MIN_WEIGHT
+    """
+    def __init__(self, workers = WORKERS, max_heavy = MAX_HEAVY, heavy_cost = HEAVY_COST, quantum = QUANTUM,
+            weights = {}, metrics = None, name = "scheduler"):
+        self.max_heavy = max_heavy
+        self.heavy_cost = heavy_cost
+        self.quantum = quantum if quantum > 0 else QUANTUM
+        self.weights = {}
+        for user, weight in weights.items():
+            if weight < MIN_WEIGHT:
+                logger.warning(f"{name} weight {weight} of {user} raised to {MIN_WEIGHT}")
+                weight = MIN_WEIGHT
+            self.weights[user.casefold()] = weight
+        self.metrics = metrics or default_metrics
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._queues = {}
+        self._deficits = {}
+        self._ring = deque()
+        self._heavy_running = 0
+        self._running = 0
+        self._stopped = False
+
+        self._threads = [threading.Thread(target = self._worker, name = f"{name}-{i}", daemon = True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+        self.metrics.register_gauge(f"{name}.queued", self.queued)
+        self.metrics.register_gauge(f"{name}.running", lambda: self._running)
+
+    def submit(self, user, cost, function, *args, **kwargs):
+        """
+        Queue a request of a user.
+
+        Returns:
+            concurrent.futures.Future: result of function(*args, **kwargs)
+        """
+        user = (user or "").casefold()
+        job = _Job(user, cost, function, args, kwargs)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError(f"{self.name} stopped")
+            queue = self._queues.get(user)
+            if queue is None:
+                queue = deque()
+                self._queues[user] = queue
+                self._deficits[user] = 0
+                self._ring.append(user)
+            queue.append(job)
+            self._cond.notify()
+        return job.future
+
+    def queued(self):
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _pick(self):
+        """
+        Select the next job (deficit round robin), called with the condition locked.
+        """
+        while len(self._ring) > 0:
+            eligible = False
+            for _ in range(len(self._ring)):
+                user = self._ring[0]
+                queue = self._queues[user]
+                job = queue[0]
+                if job.cost >= self.heavy_cost and self._heavy_running >= self.max_heavy:
+                    self._ring.rotate(-1)
+                    continue
+                eligible = True
+                if self._deficits[user] >= job.cost:
+                    self._deficits[user] -= job.cost
+                    queue.popleft()
+                    if len(queue) == 0:
+                        # idle users don't accumulate deficit
+                        self._ring.popleft()
+                        del self._queues[user]
+                        del self._deficits[user]
+                    return job
+                self._deficits[user] += self.quantum * self.weights.get(user, 1)
+                self._ring.rotate(-1)
+            if not eligible:
+                return None
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._pick()
+                while job is None:
+                    if self._stopped:
+                        return
+                    self._cond.wait()
+                    job = self._pick()
+                heavy = job.cost >= self.heavy_cost
+                if heavy:
+                    self._heavy_running += 1
+                self._running += 1
+
+            kind = "heavy" if heavy else "light"
+            started = time.monotonic()
+            self.metrics.observe(f"{self.name}.queue_wait.{kind}", started - job.enqueued)
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    try:
+                        job.future.set_result(job.function(*job.args, **job.kwargs))
+                    except BaseException as e:
+                        job.future.set_exception(e)
+            finally:
+                self.metrics.observe(f"{self.name}.service_time.{kind}", time.monotonic() - started)
+                with self._cond:
+                    self._running -= 1
+                    if heavy:
+                        self._heavy_running -= 1
+                    self._cond.notify_all()
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
@@ -0,0 +1,331 @@
+"""
+Durable job queue in SQLite.
+
+Jobs (webhook events, websocket activities, bulk exports) are stored before they are
+processed, so a restart doesn't drop them. A worker leases a job for "lease_time" seconds,
+the lease is renewed while the job runs. A job whose lease expired (its process died)
+is leased again by any worker of any process sharing the database, so unfinished jobs
+resume after a restart. The delivery is at-least-once, the handlers must tolerate a repeat.
+
+A failed job is retried after "retry_delay" seconds, doubled with each attempt. After
+"max_attempts" the job is moved to the dead letters, which are kept for "dead_retention" seconds.
+Jobs with the same "group" run one at a time in the order of enqueueing (e.g. events of a space).
+
+shutdown() stops leasing, waits for the running jobs and releases the leases of those
+which didn't finish in time.
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+
+try:
+    from .metrics import metrics as default_metrics
+except:
+    from metrics import metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+WORKERS = 4
+LEASE_TIME = 300 # seconds
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 10 # seconds, doubled with each attempt
+DEAD_RETENTION = 7 * 86400 # seconds
+POLL_INTERVAL = 1 # seconds, jobs from other processes and retries are found by polling
+PURGE_INTERVAL = 3600 # seconds
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL,
+        job_key TEXT UNIQUE, group_key TEXT, state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,
+        enqueued REAL NOT NULL, run_at REAL NOT NULL, leased_until REAL, lease_owner TEXT, last_error TEXT)""",
+    "CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, run_at)",
+    "CREATE INDEX IF NOT EXISTS jobs_group ON jobs (group_key, id)"
+]
+
+class JobQueue(object):
+    """
+    SQLite-backed job queue with leases, retries and dead letters.
+
+    Attributes:
+        path (str): database file
+        workers (int): number of worker threads
+        lease_time (float): seconds a job is leased to a worker, renewed while the job runs
+        max_attempts (int): attempts after which a failing job is dead-lettered
+        retry_delay (float): delay of the first retry
+        dead_retention (float): seconds the dead letters are kept
+    """
+    def __init__(self, path, workers = WORKERS, lease_time = LEASE_TIME, max_attempts = MAX_ATTEMPTS,
+            retry_delay = RETRY_DELAY, dead_retention = DEAD_RETENTION, metrics = None, name = "job_queue"):
+        self.path = path
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.dead_retention = dead_retention
+        self.metrics = metrics or default_metrics
+        self.name = name
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{os.urandom(4).hex()}"
+
+        self._local = threading.local()
+        self._handlers = {}
+        self._cond = threading.Condition()
+        self._running = {} # job id -> kind
+        self._stopped = False
+        self._last_purge = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        connection = self._connection()
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+        self._threads = [threading.Thread(target = self._worker, name = f"{name}-{i}", daemon = True) for i in range(workers)]
+        self._threads.append(threading.Thread(target = self._renew_leases, name = f"{name}-leases", daemon = True))
+        for thread in self._threads:
+            thread.start()
+
+        self.metrics.register_gauge(f"{name}.depth", self.depth)
+        self.metrics.register_gauge(f"{name}.oldest_age", self.oldest_age)
+        logger.info(f"job queue {path} opened, {workers} workers")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout = 30, isolation_level = None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def register(self, kind, handler):
+        """
+        Set the handler of a job kind. Workers lease only the kinds with a handler.
+
+        Parameters:
+            kind (str): job kind
+            handler (callable): called with the job payload, an exception means failure
+        """
+        with self._cond:
+            self._handlers[kind] = handler
+            self._cond.notify_all()
+
+    def handles(self, kind):
+        return kind in self._handlers
+
+    def enqueue(self, kind, payload, key = None, group = None, delay = 0):
+        """
+        Store a job.
+
+        Parameters:
+            kind (str): job kind
+            payload: JSON-serializable job data
+            key (str): unique job key, a job with the same key already queued is not added again
+            group (str): jobs of the same group run one at a time in the order of enqueueing
+
+        Returns:
+            int: job id or None if a job with the key is already queued
+        """
+        now = time.time()
+        cursor = self._connection().execute("INSERT OR IGNORE INTO jobs (kind, payload, job_key, group_key, state, enqueued, run_at) "
+            "VALUES (?, ?, ?, ?, 'ready', ?, ?)", (kind, json.dumps(payload), key, group, now, now + delay))
+        if cursor.rowcount == 0:
+            logger.debug(f"{kind} job {key} already queued")
+            return None
+        self.metrics.inc(f"{self.name}.enqueued.{kind}")
+        with self._cond:
+            self._cond.notify()
+        return cursor.lastrowid
+
+    def _lease(self):
+        """
+        Lease the next runnable job: ready and due, or leased with an expired lease,
+        and not preceded by an unfinished job of its group.
+
+        Returns:
+            tuple: (id, kind, payload, attempts, enqueued) or None
+        """
+        kinds = list(self._handlers)
+        if not kinds:
+            return None
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(f"SELECT id, kind, payload, attempts, enqueued FROM jobs "
+                f"WHERE kind IN ({', '.join('?' * len(kinds))}) "
+                "AND ((state = 'ready' AND run_at <= ?) OR (state = 'leased' AND leased_until < ?)) "
+                "AND (group_key IS NULL OR NOT EXISTS (SELECT 1 FROM jobs AS earlier WHERE earlier.group_key = jobs.group_key "
+                "AND earlier.id < jobs.id AND earlier.state IN ('ready', 'leased'))) "
+                "ORDER BY run_at, id LIMIT 1", (*kinds, now, now)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE jobs SET state = 'leased', attempts = attempts + 1, leased_until = ?, lease_owner = ? "
+                    "WHERE id = ?", (now + self.lease_time, self.owner, row[0]))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        if row is not None:
+            return row[0], row[1], row[2], row[3] + 1, row[4]
+
+    def _finish(self, job_id, kind, attempts, error = None):
+        connection = self._connection()
+        if error is None:
+            connection.execute("DELETE FROM jobs WHERE id = ? AND lease_owner = ?", (job_id, self.owner))
+            self.metrics.inc(f"{self.name}.done.{kind}")
+        elif attempts >= self.max_attempts:
+            connection.execute("UPDATE jobs SET state = 'dead', leased_until = NULL, run_at = ?, last_error = ? "
+                "WHERE id = ? AND lease_owner = ?", (time.time(), error, job_id, self.owner))
+            self.metrics.inc(f"{self.name}.dead.{kind}")
+            logger.error(f"{kind} job {job_id} dead-lettered after {attempts} attempts: {error}")
+        else:
+            delay = self.retry_delay * 2 ** (attempts - 1)
+            connection.execute("UPDATE jobs SET state = 'ready', leased_until = NULL, run_at = ?, last_error = ? "
+                "WHERE id = ? AND lease_owner = ?", (time.time() + delay, error, job_id, self.owner))
+            self.metrics.inc(f"{self.name}.retried.{kind}")
+            logger.warning(f"{kind} job {job_id} attempt {attempts} failed, retry in {delay}s: {error}")
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+            try:
+                job = self._lease()
+                self._purge()
+            except sqlite3.Error as e:
+                logger.error(f"job queue {self.path} lease failed: {e}")
+                job = None
+            if job is None:
+                with self._cond:
+                    if not self._stopped:
+                        self._cond.wait(POLL_INTERVAL)
+                continue
+            job_id, kind, payload, attempts, enqueued = job
+            with self._cond:
+                self._running[job_id] = kind
+            started = time.time()
+            self.metrics.observe(f"{self.name}.queue_wait.{kind}", started - enqueued)
+            error = None
+            try:
+                if attempts > self.max_attempts:
+                    # leased again after a crash of the worker process
+                    raise RuntimeError(f"lease expired {attempts - 1} times")
+                self._handlers[kind](json.loads(payload))
+            except Exception as e:
+                logger.exception(f"{kind} job {job_id} failed")
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                self.metrics.observe(f"{self.name}.service_time.{kind}", time.time() - started)
+                try:
+                    self._finish(job_id, kind, attempts, error)
+                except sqlite3.Error as e:
+                    logger.error(f"{kind} job {job_id} finish failed, it runs again after the lease expires: {e}")
+                with self._cond:
+                    self._running.pop(job_id, None)
+                    self._cond.notify_all()
+
+    def _renew_leases(self):
+        while True:
+            with self._cond:
+                self._cond.wait(self.lease_time / 3)
+                if self._stopped:
+                    return
+                job_ids = list(self._running)
+            if not job_ids:
+                continue
+            try:
+                self._connection().execute(f"UPDATE jobs SET leased_until = ? WHERE lease_owner = ? AND state = 'leased' "
+                    f"AND id IN ({', '.join('?' * len(job_ids))})", (time.time() + self.lease_time, self.owner, *job_ids))
+            except sqlite3.Error as e:
+                logger.error(f"job queue {self.path} lease renewal failed: {e}")
+
+    def _purge(self):
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        cursor = self._connection().execute("DELETE FROM jobs WHERE state = 'dead' AND run_at < ?", (now - self.dead_retention,))
+        if cursor.rowcount:
+            logger.info(f"{cursor.rowcount} dead jobs purged")
+
+    def depth(self):
+        """
+        Returns:
+            dict: kind -> number of queued and running jobs
+        """
+        rows = self._connection().execute("SELECT kind, COUNT(*) FROM jobs WHERE state IN ('ready', 'leased') GROUP BY kind").fetchall()
+        return dict(rows)
+
+    def oldest_age(self):
+        """
+        Returns:
+            float: seconds since the oldest unfinished job was enqueued, 0 if there is none
+        """
+        oldest = self._connection().execute("SELECT MIN(enqueued) FROM jobs WHERE state IN ('ready', 'leased')").fetchone()[0]
+        return round(time.time() - oldest, 3) if oldest is not None else 0
+
+    def dead_letters(self, limit = 20):
+        """
+        Returns:
+            list: latest dead jobs {"id", "kind", "attempts", "enqueued", "error"}
+        """
+        rows = self._connection().execute("SELECT id, kind, attempts, enqueued, last_error FROM jobs WHERE state = 'dead' "
+            "ORDER BY run_at DESC LIMIT ?", (limit,)).fetchall()
+        return [{"id": row[0], "kind": row[1], "attempts": row[2], "enqueued": row[3], "error": row[4]} for row in rows]
+
+    def requeue(self, job_id):
+        """
+        Move a dead job back to the queue with a new set of attempts.
+
+        Returns:
+            bool: True if the job was dead
+        """
+        cursor = self._connection().execute("UPDATE jobs SET state = 'ready', attempts = 0, run_at = ?, lease_owner = NULL "
+            "WHERE id = ? AND state = 'dead'", (time.time(), job_id))
+        with self._cond:
+            self._cond.notify()
+        return cursor.rowcount > 0
+
+    def stats(self):
+        counts = dict(self._connection().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        with self._cond:
+            running = len(self._running)
+        return {
+            "ready": counts.get("ready", 0),
+            "leased": counts.get("leased", 0),
+            "dead": counts.get("dead", 0),
+            "running": running,
+            "depth": self.depth(),
+            "oldest_age": self.oldest_age()
+        }
+
+    def shutdown(self, timeout = None):
+        """
+        Stop leasing jobs and wait for the running ones. Leases of the jobs still running
+        after the timeout are released, so the jobs run again after a restart.
+
+        Returns:
+            int: number of jobs which didn't finish
+        """
+        end = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            while self._running:
+                wait = end - time.monotonic() if end is not None else None
+                if wait is not None and wait <= 0:
+                    break
+                self._cond.wait(wait)
+            unfinished = list(self._running)
+        if unfinished:
+            # the attempt didn't fail, don't count it
+            self._connection().execute(f"UPDATE jobs SET state = 'ready', attempts = attempts - 1, leased_until = NULL, lease_owner = NULL "
+                f"WHERE lease_owner = ? AND state = 'leased' AND id IN ({', '.join('?' * len(unfinished))})", (self.owner, *unfinished))
+            logger.warning(f"job queue drain timed out, {len(unfinished)} jobs released")
+        else:
+            logger.info("job queue drained")
+        return len(unfinished)
@@ -0,0 +1,130 @@
+"""
+Incremental parsing of large JSON list responses.
+
+Webex list APIs return {"items": [...]}. Instead of loading the whole page, the items
+are decoded one at a time from the response chunks and only the requested fields
+are kept, so the peak memory is proportional to one item, not to the page.
+"""
+
+import json
+import codecs
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 16 * 1024
+WHITESPACE = " \t\n\r"
+
+class JSONStreamError(ValueError):
+    pass
+
+def project(item, fields = None):
+    """
+    Keep only the fields (all of them if fields is None).
+    """
+    if fields is None or not isinstance(item, dict):
+        return item
+    return {key: item[key] for key in fields if key in item}
+
+class _Reader(object):
+    """
+    Buffer over the text chunks, the consumed part of the buffer is dropped after each value.
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Append the next chunk to the buffer.
+
+        Returns:
+            bool: False at the end of the input
+        """
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            text = self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                self.buffer = self.buffer[self.position:] + text
+                self.position = 0
+                return True
+        self.buffer = self.buffer[self.position:] + self._decoder.decode(b"", final = True)
+        self.position = 0
+        self.eof = True
+        return False
+
+    def peek(self):
+        """
+        Next non-whitespace character or "" at the end of the input.
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ""
+
+    def expect(self, characters):
+        character = self.peek()
+        if character == "" or character not in characters:
+            raise JSONStreamError(f"expected one of {characters!r}, got {character!r} at {self.position}")
+        self.position += 1
+        return character
+
+    def value(self):
+        """
+        Decode the next complete JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                result, end = self._json.raw_decode(self.buffer, self.position)
+                # a number or literal at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return result
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise JSONStreamError(f"invalid JSON: {e}") from e
+            self.fill()
+
+def iter_items(chunks, key = "items", fields = None):
+    """
+    Yield the elements of the "key" array of a JSON object one at a time.
+
+    Parameters:
+        chunks (iterable): bytes or str chunks of the JSON document (e.g. response.iter_content())
+        key (str): top-level array to stream, the other top-level values are skipped
+        fields (iterable): fields of each item to keep, None keeps the whole items
+
+    Raises:
+        JSONStreamError: the document is not a JSON object or is malformed
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() != "]":
+                while True:
+                    yield project(reader.value(), fields)
+                    if reader.expect(",]") == "]":
+                        break
+            else:
+                reader.expect("]")
+            return
+        reader.value()
+        if reader.expect(",}") == "}":
+            return
@@ -31,7 +31,25 @@ CS_CZ = {
     "loc_submit": "OK",
     "loc_meeting_no": "Číslo schůzky",
     "loc_meeting_host": "Hostitel",
-    "loc_days": "Dní zpět"
+    "loc_days": "Dní zpět",
+    "loc_audio_file": "Zvuková stopa nahrávky {}",
+    "loc_degraded": "Webex teď odpovídá pomalu nebo není dostupný, zkuste to, prosím, za chvíli znovu.",
+    "loc_partial": "Některé nahrávky se nepodařilo včas načíst, pro úplný seznam to zkuste znovu za chvíli.",
+    "loc_searching": "Hledám nahrávky {} v {} schůzkách…",
+    "loc_search_progress": "{}: prohledáno {}/{} schůzek, nalezeno nahrávek: {}",
+    "loc_search_done": "{}: nalezeno nahrávek: {}",
+    "loc_export_denied": "Hromadný export není povolen.",
+    "loc_export_invalid": "Chybný požadavek na export: {}. Použijte: export [csv|jsonl] [RRRR-MM-DD[..RRRR-MM-DD]] <čísla schůzek nebo e-maily hostitelů oddělené čárkou>",
+    "loc_export_started": "Export {} položek za období {} až {} byl zahájen, výsledek pošlu jako soubor.",
+    "loc_export_done": "Exportováno nahrávek: {} z {} schůzek nebo hostitelů za {} s.",
+    "loc_export_failed": "Nepodařilo se zpracovat: {}",
+    "loc_export_error": "Export se nepodařil, zkuste to, prosím, později.",
+    "loc_batch_too_large": "Najednou lze zadat nejvýše {} schůzek.",
+    "loc_batch_title": "Nahrávky {} schůzek",
+    "loc_usage_denied": "Přehled využití není povolen.",
+    "loc_usage_report": "Využití za posledních {} dní: požadavků {}, zamítnuto {}, poskytnuto nahrávek {}.",
+    "loc_usage_hosts": "Hostitelé (požadavky / zamítnuto / nahrávky):",
+    "loc_usage_requesters": "Žadatelé (požadavky / zamítnuto / nahrávky):"
 }
 
 EN_US = {
@@ -47,7 +65,25 @@ EN_US = {
     "loc_submit": "Submit",
     "loc_meeting_no": "Meeting number",
     "loc_meeting_host": "Meeting host",
-    "loc_days": "Days back"
+    "loc_days": "Days back",
+    "loc_audio_file": "Audio of the recording {}",
+    "loc_degraded": "Webex is slow or unavailable at the moment, please try again in a while.",
+    "loc_partial": "Some recordings could not be loaded in time, try again in a while to get the complete list.",
+    "loc_searching": "Searching recordings of {} in {} meetings…",
+    "loc_search_progress": "{}: {}/{} meetings checked, {} recordings found",
+    "loc_search_done": "{}: {} recordings found",
+    "loc_export_denied": "Bulk export is not allowed.",
+    "loc_export_invalid": "Invalid export request: {}. Use: export [csv|jsonl] [YYYY-MM-DD[..YYYY-MM-DD]] <meeting numbers or host e-mails separated by comma>",
+    "loc_export_started": "Export of {} entries from {} to {} started, the result will be sent as a file.",
+    "loc_export_done": "{} recordings of {} meetings or hosts exported in {} s.",
+    "loc_export_failed": "Failed: {}",
+    "loc_export_error": "Export failed, please try again later.",
+    "loc_batch_too_large": "At most {} meetings can be requested at once.",
+    "loc_batch_title": "Recordings of {} meetings",
+    "loc_usage_denied": "Usage report is not allowed.",
+    "loc_usage_report": "Usage in the last {} days: {} requests, {} denied, {} recordings provided.",
+    "loc_usage_hosts": "Hosts (requests / denied / recordings):",
+    "loc_usage_requesters": "Requesters (requests / denied / recordings):"
 }
 
 # add the  language constant to make it available for the Bot
@@ -0,0 +1,180 @@
+"""
+Compact typed model of Webex meetings and recordings.
+
+Webex API responses are parsed once into slotted objects. Only the fields used by the Bot
+are kept and ISO timestamps are converted to epoch seconds at parse time,
+so sorting and comparisons don't need to parse the dates again.
+"""
+
+import os
+import logging
+from datetime import timezone
+from urllib.parse import urlparse, quote
+from dateutil import parser as date_parser
+
+logger = logging.getLogger(__name__)
+
+_EPOCH_DAYS_CACHE = {}
+
+def _days_from_civil(year, month, day):
+    """
+    Days since 1970-01-01 for a proleptic Gregorian date (H. Hinnant's algorithm).
+    """
+    year -= month <= 2
+    era = (year if year >= 0 else year - 399) // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+def parse_timestamp(stamp):
+    """
+    Convert an ISO 8601 timestamp to epoch seconds.
+
+    Fast path for the fixed format used by Webex APIs: "YYYY-MM-DDTHH:MM:SS[.fff](Z|+HH:MM|-HH:MM)".
+    Other formats fall back to dateutil.
+
+    Parameters:
+        stamp (str): timestamp
+
+    Returns:
+        float: epoch seconds or None
+    """
+    if not stamp:
+        return None
+    try:
+        if len(stamp) < 20 or stamp[4] != "-" or stamp[7] != "-" or stamp[10] not in "T " or stamp[13] != ":" or stamp[16] != ":":
+            raise ValueError(stamp)
+        date_key = stamp[:10]
+        days = _EPOCH_DAYS_CACHE.get(date_key)
+        if days is None:
+            days = _days_from_civil(int(stamp[0:4]), int(stamp[5:7]), int(stamp[8:10]))
+            _EPOCH_DAYS_CACHE[date_key] = days
+        seconds = days * 86400 + int(stamp[11:13]) * 3600 + int(stamp[14:16]) * 60 + int(stamp[17:19])
+
+        pos = 19
+        fraction = 0.0
+        if stamp[pos] == ".":
+            end = pos + 1
+            while end < len(stamp) and stamp[end].isdigit():
+                end += 1
+            fraction = float(stamp[pos:end])
+            pos = end
+
+        zone = stamp[pos:]
+        if zone == "Z":
+            offset = 0
+        elif len(zone) == 6 and zone[0] in "+-" and zone[3] == ":":
+            offset = (int(zone[1:3]) * 3600 + int(zone[4:6]) * 60) * (1 if zone[0] == "+" else -1)
+        else:
+            raise ValueError(stamp)
+
+        return seconds - offset + fraction
+    except (ValueError, IndexError):
+        parsed = date_parser.parse(stamp)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo = timezone.utc)
+        return parsed.timestamp()
+
+def fix_url(url, add_filename):
+    """
+    Add a file name to the download URL, so that the browser saves the file under a readable name.
+    """
+    if url is None:
+        return None
+    parsed_url = urlparse(url)
+    logger.debug(f"path found in URL: {parsed_url.path}")
+    url_base = os.path.basename(parsed_url.path)
+    if not url_base.endswith((".mp4", ".mp3")):
+        new_path = parsed_url.path + "/" + quote(add_filename)
+        logger.info(f"fix URL path '{parsed_url.path}' to '{new_path}'")
+        return parsed_url._replace(path = new_path).geturl()
+
+    return url
+
+class Meeting(object):
+    """
+    Webex meeting or meeting instance.
+    """
+    __slots__ = ("id", "meeting_number", "meeting_series_id", "title", "start", "start_epoch",
+        "host_email", "host_user_id", "state")
+    API_FIELDS = ("id", "meetingNumber", "meetingSeriesId", "title", "start", "hostEmail", "hostUserId", "state")
+
+    def __init__(self, id, meeting_number = None, meeting_series_id = None, title = "", start = None,
+            host_email = None, host_user_id = None, state = None, start_epoch = None):
+        self.id = id
+        self.meeting_number = meeting_number
+        self.meeting_series_id = meeting_series_id
+        self.title = title
+        self.start = start
+        self.start_epoch = start_epoch if start_epoch is not None else (parse_timestamp(start) or 0.0)
+        self.host_email = host_email
+        self.host_user_id = host_user_id
+        self.state = state
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create Meeting from Webex API "meetings" item.
+        """
+        return cls(data["id"],
+            meeting_number = data.get("meetingNumber"),
+            meeting_series_id = data.get("meetingSeriesId"),
+            title = data.get("title", ""),
+            start = data.get("start"),
+            host_email = data.get("hostEmail"),
+            host_user_id = data.get("hostUserId"),
+            state = data.get("state"))
+
+    def __repr__(self):
+        return f"Meeting(id={self.id!r}, number={self.meeting_number!r}, title={self.title!r}, start={self.start!r}, host={self.host_email!r})"
+
+class Recording(object):
+    """
+    Webex meeting recording with temporary download links.
+    """
+    __slots__ = ("id", "meeting_id", "topic", "time_recorded", "time_recorded_epoch", "duration_seconds",
+        "host_email", "audio_url", "video_url", "expiration", "expiration_epoch")
+    API_FIELDS = ("id", "meetingId", "topic", "timeRecorded", "durationSeconds", "hostEmail", "temporaryDirectDownloadLinks")
+
+    def __init__(self, id, meeting_id = None, topic = "", time_recorded = None, duration_seconds = 0,
+            host_email = None, audio_url = None, video_url = None, expiration = None):
+        self.id = id
+        self.meeting_id = meeting_id
+        self.topic = topic
+        self.time_recorded = time_recorded
+        self.time_recorded_epoch = parse_timestamp(time_recorded) or 0.0
+        self.duration_seconds = duration_seconds or 0
+        self.host_email = host_email
+        self.audio_url = audio_url
+        self.video_url = video_url
+        self.expiration = expiration
+        self.expiration_epoch = parse_timestamp(expiration)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create Recording from Webex API "recordings/{id}" response.
+        """
+        topic = data.get("topic", "")
+        links = data.get("temporaryDirectDownloadLinks") or {}
+        return cls(data["id"],
+            meeting_id = data.get("meetingId"),
+            topic = topic,
+            time_recorded = data.get("timeRecorded"),
+            duration_seconds = data.get("durationSeconds"),
+            host_email = data.get("hostEmail"),
+            audio_url = fix_url(links.get("audioDownloadLink"), f"{topic}.mp3"),
+            video_url = fix_url(links.get("recordingDownloadLink"), f"{topic}.mp4"),
+            expiration = links.get("expiration"))
+
+    @property
+    def has_links(self):
+        return self.audio_url is not None or self.video_url is not None
+
+    @property
+    def duration(self):
+        return f"{self.duration_seconds//60:02d}:{self.duration_seconds%60:02d}"
+
+    def __repr__(self):
+        return f"Recording(id={self.id!r}, meeting_id={self.meeting_id!r}, topic={self.topic!r}, recorded={self.time_recorded!r}, expires={self.expiration!r})"
@@ -0,0 +1,214 @@
+"""
+Persistent store of ended meeting instances and their recording ids.
+
+An ended meeting instance never changes, so the instances of a series are kept in SQLite
+together with the time range already synced from the Webex API. A request lists only
+the instances newer than the last sync (minus "settle_time" for the meetings which were
+still running) and the part of its "days back" window which is older than the synced range,
+the rest is read locally. Recording ids of an instance (also none) are stored once the meeting
+is older than "settle_time", the recording details (temporary links) are always fetched.
+
+The store survives restarts and can be shared by several Bot processes.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+try:
+    from .meeting_model import Meeting
+except:
+    from meeting_model import Meeting
+
+logger = logging.getLogger(__name__)
+
+SETTLE_TIME = 86400 # seconds after which an ended meeting and its recordings are final
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS series (tenant TEXT NOT NULL, meeting_number TEXT NOT NULL, host_key TEXT NOT NULL,
+        series_id TEXT NOT NULL, meeting_host TEXT, covered_from REAL NOT NULL, covered_to REAL NOT NULL,
+        PRIMARY KEY (tenant, meeting_number, host_key))""",
+    """CREATE TABLE IF NOT EXISTS instances (id TEXT PRIMARY KEY, series_id TEXT NOT NULL, host_email TEXT,
+        meeting_number TEXT, title TEXT, start TEXT, start_epoch REAL NOT NULL, host_user_id TEXT, state TEXT,
+        recordings_synced REAL)""",
+    "CREATE INDEX IF NOT EXISTS instances_series ON instances (series_id, start_epoch)",
+    """CREATE TABLE IF NOT EXISTS recording_ids (meeting_id TEXT NOT NULL, recording_id TEXT NOT NULL, time_recorded TEXT,
+        PRIMARY KEY (meeting_id, recording_id))"""
+]
+
+def plan_sync(series, from_epoch, to_epoch, settle_time = SETTLE_TIME):
+    """
+    Time ranges to request from the API for a series.
+
+    Parameters:
+        series (dict): stored series (see MeetingStore.series()) or None
+        from_epoch (float): start of the requested window
+        to_epoch (float): end of the requested window (now)
+
+    Returns:
+        tuple: (list of (from, to) epoch ranges, start of the synced range after the sync)
+    """
+    if series is None:
+        return [(from_epoch, to_epoch)], from_epoch
+    delta_from = series["covered_to"] - settle_time
+    if delta_from <= from_epoch:
+        # the stored range is too old to be continued, sync the whole window again
+        return [(from_epoch, to_epoch)], from_epoch
+    ranges = []
+    covered_from = series["covered_from"]
+    if from_epoch < covered_from:
+        ranges.append((from_epoch, covered_from))
+        covered_from = from_epoch
+    ranges.append((max(delta_from, covered_from), to_epoch))
+    return ranges, covered_from
+
+class MeetingStore(object):
+    """
+    SQLite store of the ended meeting instances per series.
+
+    Attributes:
+        path (str): database file
+        settle_time (float): seconds after which an ended meeting and its recording ids are considered final
+    """
+    def __init__(self, path, settle_time = SETTLE_TIME):
+        self.path = path
+        self.settle_time = settle_time
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        connection = self._connection()
+        for statement in SCHEMA:
+            connection.execute(statement)
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(instances)")]
+        if "recordings_synced" not in columns:
+            # database created by an older version
+            connection.execute("ALTER TABLE instances ADD COLUMN recordings_synced REAL")
+        logger.info(f"meeting store {path} opened")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout = 30, isolation_level = None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def series(self, tenant, meeting_number, host_key):
+        """
+        Returns:
+            dict: series_id, meeting_host, covered_from, covered_to or None if the series wasn't synced yet
+        """
+        row = self._connection().execute("SELECT series_id, meeting_host, covered_from, covered_to FROM series "
+            "WHERE tenant = ? AND meeting_number = ? AND host_key = ?", (tenant, meeting_number, host_key.casefold())).fetchone()
+        if row is not None:
+            return {"series_id": row[0], "meeting_host": row[1], "covered_from": row[2], "covered_to": row[3]}
+
+    def merge(self, tenant, meeting_number, host_key, series_id, meeting_host, meetings, covered_from, covered_to):
+        """
+        Add the synced instances and record the synced time range of the series.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # keep the recordings_synced marker of the instances synced again
+            connection.executemany("INSERT INTO instances (id, series_id, host_email, meeting_number, title, start, "
+                "start_epoch, host_user_id, state) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                "series_id = excluded.series_id, host_email = excluded.host_email, meeting_number = excluded.meeting_number, "
+                "title = excluded.title, start = excluded.start, start_epoch = excluded.start_epoch, "
+                "host_user_id = excluded.host_user_id, state = excluded.state",
+                [(meeting.id, meeting.meeting_series_id or series_id, meeting.host_email or meeting_host, meeting.meeting_number,
+                    meeting.title, meeting.start, meeting.start_epoch, meeting.host_user_id, meeting.state) for meeting in meetings])
+            connection.execute("INSERT OR REPLACE INTO series (tenant, meeting_number, host_key, series_id, meeting_host, "
+                "covered_from, covered_to) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (tenant, meeting_number, host_key.casefold(), series_id, meeting_host, covered_from, covered_to))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def meetings(self, series_id, from_epoch, to_epoch = None):
+        """
+        Returns:
+            list: stored Meeting instances of the series started within the range, sorted by start
+        """
+        rows = self._connection().execute("SELECT id, meeting_number, series_id, title, start, host_email, host_user_id, state, start_epoch "
+            "FROM instances WHERE series_id = ? AND start_epoch >= ? AND start_epoch <= ? ORDER BY start_epoch",
+            (series_id, from_epoch, to_epoch if to_epoch is not None else time.time())).fetchall()
+        return [Meeting(row[0], meeting_number = row[1], meeting_series_id = row[2], title = row[3], start = row[4],
+            host_email = row[5], host_user_id = row[6], state = row[7], start_epoch = row[8]) for row in rows]
+
+    def meeting(self, meeting_id):
+        """
+        Returns:
+            Meeting: stored meeting instance or None
+        """
+        row = self._connection().execute("SELECT id, meeting_number, series_id, title, start, host_email, host_user_id, state, start_epoch "
+            "FROM instances WHERE id = ?", (meeting_id,)).fetchone()
+        if row is not None:
+            return Meeting(row[0], meeting_number = row[1], meeting_series_id = row[2], title = row[3], start = row[4],
+                host_email = row[5], host_user_id = row[6], state = row[7], start_epoch = row[8])
+
+    def recording_ids(self, meeting_id):
+        """
+        Returns:
+            list: {"id", "timeRecorded"} of the stored recordings (empty for a meeting without recordings)
+                or None if not stored
+        """
+        connection = self._connection()
+        synced = connection.execute("SELECT recordings_synced FROM instances WHERE id = ?", (meeting_id,)).fetchone()
+        if synced is None or synced[0] is None:
+            return None
+        rows = connection.execute("SELECT recording_id, time_recorded FROM recording_ids WHERE meeting_id = ?",
+            (meeting_id,)).fetchall()
+        return [{"id": row[0], "timeRecorded": row[1]} for row in rows]
+
+    def put_recording_ids(self, meeting_id, recordings):
+        """
+        Store the recording ids of a settled meeting instance (found in the store and older than settle_time).
+
+        Parameters:
+            recordings (list): {"id", "timeRecorded"} items of the recording list
+
+        An empty list is stored too, a settled meeting without recordings is not listed again.
+
+        Returns:
+            bool: True if stored
+        """
+        connection = self._connection()
+        row = connection.execute("SELECT start_epoch FROM instances WHERE id = ?", (meeting_id,)).fetchone()
+        if row is None or row[0] > time.time() - self.settle_time:
+            return False
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM recording_ids WHERE meeting_id = ?", (meeting_id,))
+            connection.executemany("INSERT INTO recording_ids (meeting_id, recording_id, time_recorded) VALUES (?, ?, ?)",
+                [(meeting_id, item["id"], item.get("timeRecorded")) for item in recordings])
+            connection.execute("UPDATE instances SET recordings_synced = ? WHERE id = ?", (time.time(), meeting_id))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return True
+
+    def forget_recordings(self, meeting_id):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM recording_ids WHERE meeting_id = ?", (meeting_id,))
+            connection.execute("UPDATE instances SET recordings_synced = NULL WHERE id = ?", (meeting_id,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def stats(self):
+        connection = self._connection()
+        return {
+            "series": connection.execute("SELECT COUNT(*) FROM series").fetchone()[0],
+            "instances": connection.execute("SELECT COUNT(*) FROM instances").fetchone()[0],
+            "recordings": connection.execute("SELECT COUNT(*) FROM recording_ids").fetchone()[0]
+        }
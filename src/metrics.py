@@ -0,0 +1,97 @@
+"""
+Lightweight in-process metrics.
+
+Counters, gauges and latency histograms are kept in memory and exposed as JSON
+by the /metrics endpoint. Histograms keep a bounded sample of the recent values
+and report the count, mean and percentiles.
+"""
+
+import threading
+from collections import deque
+
+HISTOGRAM_SAMPLES = 1024 # recent values kept per histogram
+
+class Histogram(object):
+    def __init__(self, samples = HISTOGRAM_SAMPLES):
+        self._values = deque(maxlen = samples)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        with self._lock:
+            self._values.append(value)
+            self.count += 1
+            self.total += value
+
+    def percentile(self, percent):
+        with self._lock:
+            values = sorted(self._values)
+        if len(values) == 0:
+            return None
+        return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+    def snapshot(self):
+        with self._lock:
+            values = sorted(self._values)
+            count = self.count
+            total = self.total
+        if len(values) == 0:
+            return {"count": 0}
+        def pick(percent):
+            return values[min(len(values) - 1, int(len(values) * percent / 100))]
+        return {
+            "count": count,
+            "mean": total / count,
+            "p50": pick(50),
+            "p95": pick(95),
+            "p99": pick(99),
+            "max": values[-1]
+        }
+
+class MetricsRegistry(object):
+    """
+    Named counters, gauges (callables evaluated on read) and histograms.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+
+    def inc(self, name, amount = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name, value):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        histogram.observe(value)
+
+    def histogram(self, name):
+        return self._histograms.get(name)
+
+    def register_gauge(self, name, function):
+        with self._lock:
+            self._gauges[name] = function
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+            gauges = dict(self._gauges)
+        result = {
+            "counters": counters,
+            "histograms": {name: histogram.snapshot() for name, histogram in histograms.items()},
+            "gauges": {}
+        }
+        for name, function in gauges.items():
+            try:
+                result["gauges"][name] = function()
+            except Exception as e:
+                result["gauges"][name] = f"error: {e}"
+        return result
+
+metrics = MetricsRegistry()
@@ -13,6 +13,10 @@ webex_token_storage_path = "./"
 webex_state_check = "Webex"
 webex_token_refreshed = False
 webex_token_key = "webex_oauth"
+webex_token_store = None # token_store.TokenStore shared by the processes, default is a file store in webex_token_storage_path
+access_token_objects = {} # (storage key, storage path) -> AccessTokenAbs
+webex_background_refresh = False # tokens are refreshed by a TokenRefresher, requests don't refresh
+tenant_credentials = None # callable(tenant name) -> (storage key, client id, client secret) or None, see tenants.py
 
 webex_oauth = Blueprint("webex_oauth", __name__)
 
@@ -59,12 +63,21 @@ def authorize():
 
     if webex_integration_client_id is None:
         webex_integration_client_id = os.getenv("WEBEX_INTEGRATION_CLIENT_ID")
-    logging.debug(f"Webex client ID: {webex_integration_client_id}")
+    client_id = webex_integration_client_id
+    state = webex_state_check
+    tenant = request.args.get("tenant")
+    if tenant:
+        credentials = tenant_credentials(tenant) if tenant_credentials is not None else None
+        if credentials is None:
+            return f"Unknown tenant {tenant}", 404
+        client_id = credentials[1]
+        state = f"{webex_state_check}:{tenant}"
+    logging.debug(f"Webex client ID: {client_id}")
     redirect_uri = quote(full_redirect_uri, safe="")
     scope = webex_scope + WBX_DEFAULT_SCOPE
     scope_uri = quote(" ".join(scope), safe="")
     temp_webex_api = WebexTeamsAPI(access_token="12345")
-    join_url = temp_webex_api.base_url+f"authorize?client_id={webex_integration_client_id}&response_type=code&redirect_uri={redirect_uri}&scope={scope_uri}&state={webex_state_check}"
+    join_url = temp_webex_api.base_url+f"authorize?client_id={client_id}&response_type=code&redirect_uri={redirect_uri}&scope={scope_uri}&state={quote(state, safe='')}"
     logging.debug(f"Redirect to: {join_url}")
 
     return redirect(join_url)
@@ -98,11 +111,19 @@ def redirect_uri():
             webex_integration_client_id = os.getenv("WEBEX_INTEGRATION_CLIENT_ID")
         if webex_integration_secret is None:
             webex_integration_secret = os.getenv("WEBEX_INTEGRATION_CLIENT_SECRET")
-        tokens = AccessTokenAbs(temp_webex_api.access_tokens.get(webex_integration_client_id, webex_integration_secret, input_code, full_redirect_uri).json_data,
-            storage_key = webex_token_key,
+        storage_key, client_id, client_secret = webex_token_key, webex_integration_client_id, webex_integration_secret
+        tenant = check_phrase.split(":", 1)[1] if check_phrase and ":" in check_phrase else None
+        if tenant:
+            credentials = tenant_credentials(tenant) if tenant_credentials is not None else None
+            if credentials is None:
+                return f"Unknown tenant {tenant}", 404
+            storage_key, client_id, client_secret = credentials
+        tokens = AccessTokenAbs(temp_webex_api.access_tokens.get(client_id, client_secret, input_code, full_redirect_uri).json_data,
+            storage_key = storage_key,
             token_storage_path = webex_token_storage_path,
-            client_id = webex_integration_client_id, 
-            client_secret = webex_integration_secret)
+            client_id = client_id, 
+            client_secret = client_secret,
+            token_store = webex_token_store)
         logging.debug(f"Access info: {tokens}")
     except ApiError as e:
         logging.error(f"Client Id and Secret loading error: {e}")
@@ -140,7 +161,14 @@ def access_token_obj(storage_key = None,
             storage_key = webex_token_key
         if token_storage_path is None:
             token_storage_path = webex_token_storage_path
-        at = AccessTokenAbs(storage_key = storage_key, token_storage_path = token_storage_path, client_id = client_id, client_secret = client_secret)
+        # the object checks the token store version on each use, no need to load the tokens again
+        at = access_token_objects.get((storage_key, token_storage_path))
+        if at is None:
+            token_store = webex_token_store if token_storage_path == webex_token_storage_path else None
+            at = AccessTokenAbs(storage_key = storage_key, token_storage_path = token_storage_path, client_id = client_id, client_secret = client_secret,
+                token_store = token_store)
+            at.background_refresh = webex_background_refresh
+            access_token_objects[(storage_key, token_storage_path)] = at
         return at
     except Exception as e:
         logging.info(f"Access Token creation exception: {e}")
@@ -0,0 +1,219 @@
+"""
+Background prefetcher of recently ended meetings and their recordings.
+
+Most recording requests come minutes to hours after a meeting ends, from hosts
+who ask every week. The prefetcher learns the meeting series from the recent requests
+and from the audit log and periodically polls for newly ended meeting instances
+and their recordings, so that the user's request is answered from the RecordingCache.
+With a tenant registry each series is polled in the context of the tenant (org)
+which requested it, with the tenant's token and into the tenant's cache.
+
+The number of Webex API calls per poll is limited by "api_budget".
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+try:
+    from .tenants import DEFAULT_TENANT, run_as
+except:
+    from tenants import DEFAULT_TENANT, run_as
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_INTERVAL = 300 # seconds
+PREFETCH_API_BUDGET = 60 # Webex API calls per poll
+PREFETCH_MAX_SERIES = 200
+PREFETCH_LEARN_DAYS = 30 # forget series which were not requested for this many days
+PREFETCH_MAX_DAYS_BACK = 31
+AUDIT_LOG_TAIL = 1024 * 1024 # bytes of audit log to read when learning
+
+LIST_COST = 3 # meeting number lookup, host lookup, series instances
+
+class _SeriesInfo(object):
+    __slots__ = ("tenant", "meeting_num", "host_email", "days_back", "last_requested", "requests")
+
+    def __init__(self, tenant, meeting_num, host_email, days_back, last_requested):
+        self.tenant = tenant
+        self.meeting_num = meeting_num
+        self.host_email = host_email
+        self.days_back = days_back
+        self.last_requested = last_requested
+        self.requests = 0
+
+class RecordingPrefetcher(object):
+    """
+    Poll Webex APIs for the meeting series which are likely to be requested.
+
+    Attributes:
+        cache (RecordingCache): cache to fill, without a tenant registry
+        tenants (TenantRegistry): series are fetched by their tenants into the tenants' caches, optional
+        fetch_meeting_list (callable): fetch_meeting_list(meeting_num, host_email, days_back) -> list of Meeting, fills the cache
+        fetch_recordings (callable): fetch_recordings(meeting_id, host_email) -> list of Recording, fills the cache
+    """
+    def __init__(self, cache, fetch_meeting_list, fetch_recordings,
+            interval = PREFETCH_INTERVAL,
+            api_budget = PREFETCH_API_BUDGET,
+            max_series = PREFETCH_MAX_SERIES,
+            learn_days = PREFETCH_LEARN_DAYS,
+            max_days_back = PREFETCH_MAX_DAYS_BACK,
+            audit_log_file = None,
+            tenants = None):
+        self.cache = cache
+        self.tenants = tenants
+        self.fetch_meeting_list = fetch_meeting_list
+        self.fetch_recordings = fetch_recordings
+        self.interval = interval
+        self.api_budget = api_budget
+        self.max_series = max_series
+        self.learn_days = learn_days
+        self.max_days_back = max_days_back
+        self.audit_log_file = audit_log_file
+
+        self._series = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_run = None
+        self.last_calls = 0
+
+    def note_request(self, meeting_num, host_email, days_back, timestamp = None, tenant = None):
+        """
+        Remember a requested meeting series of a tenant (tenant name, None for the default tenant).
+        """
+        if not meeting_num or not host_email:
+            return
+        key = (tenant or DEFAULT_TENANT, str(meeting_num).replace(" ", ""), host_email.strip().casefold())
+        timestamp = timestamp or time.time()
+        days_back = min(int(days_back), self.max_days_back)
+        with self._lock:
+            info = self._series.get(key)
+            if info is None:
+                info = _SeriesInfo(key[0], key[1], host_email.strip(), days_back, timestamp)
+                self._series[key] = info
+            info.days_back = max(info.days_back, days_back)
+            info.last_requested = max(info.last_requested, timestamp)
+            info.requests += 1
+            if len(self._series) > self.max_series:
+                oldest = min(self._series, key = lambda k: self._series[k].last_requested)
+                del self._series[oldest]
+
+    def learn_from_audit_log(self, audit_log_file = None):
+        """
+        Learn the requested meeting series from the tail of the audit log.
+        """
+        audit_log_file = audit_log_file or self.audit_log_file
+        if audit_log_file is None:
+            return 0
+        learned = 0
+        try:
+            with open(audit_log_file, "rb") as file:
+                file.seek(0, os.SEEK_END)
+                file.seek(max(0, file.tell() - AUDIT_LOG_TAIL))
+                for line in file:
+                    line = line.decode("utf-8", errors = "replace")
+                    pos = line.find("JSON: ")
+                    if pos < 0:
+                        continue
+                    try:
+                        record = json.loads(line[pos + 6:])
+                    except ValueError:
+                        continue
+                    if record.get("status") == "permitted" and record.get("days_back"):
+                        self.note_request(record.get("meeting_number"), record.get("meeting_host"), record.get("days_back"),
+                            tenant = record.get("tenant"))
+                        learned += 1
+        except OSError as e:
+            logger.info(f"audit log {audit_log_file} read exception: {e}")
+
+        logger.debug(f"learned {learned} requests from audit log")
+        return learned
+
+    def series(self):
+        """
+        Known series ordered by the last request, most recent first.
+        """
+        cutoff = time.time() - self.learn_days * 86400
+        with self._lock:
+            for key in [key for key, info in self._series.items() if info.last_requested < cutoff]:
+                del self._series[key]
+            return sorted(self._series.values(), key = lambda info: info.last_requested, reverse = True)
+
+    def run_once(self):
+        """
+        Single prefetch round within the API budget.
+
+        Returns:
+            int: number of API calls used
+        """
+        budget = self.api_budget
+        for info in self.series():
+            if budget < LIST_COST:
+                break
+            if self.tenants is not None:
+                tenant = self.tenants.get(info.tenant)
+                if tenant is None:
+                    logger.debug(f"series {info.meeting_num}/{info.host_email} of unknown tenant {info.tenant} skipped")
+                    continue
+                cache = tenant.recording_cache
+                call = lambda function, *args: run_as(tenant, function, *args)
+            else:
+                cache = self.cache
+                call = lambda function, *args: function(*args)
+            budget -= LIST_COST
+            try:
+                meetings = call(self.fetch_meeting_list, info.meeting_num, info.host_email, info.days_back)
+            except Exception as e:
+                logger.info(f"prefetch of {info.tenant}/{info.meeting_num}/{info.host_email} failed: {e}")
+                continue
+            if not meetings:
+                continue
+            # newest meetings first, they are the most likely to be requested
+            for meeting in sorted(meetings, key = lambda item: item.start_epoch, reverse = True):
+                if cache.recordings_valid_for(meeting.id) > self.interval:
+                    continue
+                if budget < 2:
+                    break
+                try:
+                    recordings = call(self.fetch_recordings, meeting.id, meeting.host_email or info.host_email)
+                    budget -= 1 + len(recordings)
+                except Exception as e:
+                    budget -= 1
+                    logger.info(f"prefetch of recordings for {meeting.id} failed: {e}")
+
+        self.last_run = time.time()
+        self.last_calls = self.api_budget - budget
+        logger.debug(f"prefetch round done, {self.last_calls} API calls used")
+        return self.last_calls
+
+    def _run(self):
+        self.learn_from_audit_log()
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"prefetch exception: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target = self._run, name = "recording-prefetcher", daemon = True)
+        self._thread.start()
+        logger.info(f"recording prefetcher started, interval: {self.interval}s, budget: {self.api_budget} calls")
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        with self._lock:
+            series_count = len(self._series)
+        return {
+            "series": series_count,
+            "last_run": self.last_run,
+            "last_calls": self.last_calls
+        }
@@ -0,0 +1,115 @@
+"""
+Progressive delivery of long replies.
+
+A placeholder message is posted right away and edited to show the progress.
+The result is posted as a series of Adaptive Cards, a card is sent as soon as it
+reaches "max_card_bytes" (and the first one as soon as there is anything to show),
+so the user gets the first links without waiting for the whole result and no card
+exceeds the Webex size limit.
+"""
+
+import time
+import json
+import logging
+
+try:
+    from . import buttons_cards as bc
+except:
+    import buttons_cards as bc
+
+logger = logging.getLogger(__name__)
+
+MAX_CARD_BYTES = 16000 # Webex limits the message attachments to about 22 kB
+EDIT_INTERVAL = 2 # seconds between placeholder edits
+MAX_EDITS = 9 # Webex allows only a limited number of edits of a message
+
+class ProgressiveReply(object):
+    """
+    Placeholder message with progress updates followed by paginated cards.
+
+    Attributes:
+        api (WebexTeamsAPI): Bot API
+        room_id (str): space to reply to
+        title (str): card header
+    """
+    def __init__(self, api, room_id, title, max_card_bytes = MAX_CARD_BYTES, edit_interval = EDIT_INTERVAL, max_edits = MAX_EDITS):
+        self.api = api
+        self.room_id = room_id
+        self.title = title
+        self.max_card_bytes = max_card_bytes
+        self.edit_interval = edit_interval
+        self.max_edits = max_edits
+        self.message_id = None
+        self.pages_sent = 0
+        self._edits = 0
+        self._last_edit = 0
+        self._blocks = []
+        self._lines = []
+        self._size = 0
+
+    def start(self, markdown):
+        try:
+            message = self.api.messages.create(roomId = self.room_id, markdown = markdown)
+            self.message_id = message.id
+            self._last_edit = time.monotonic()
+        except Exception as e:
+            logger.error(f"placeholder message failed: {e}")
+
+    def progress(self, markdown, force = False):
+        """
+        Edit the placeholder message, throttled to "edit_interval".
+        """
+        if self.message_id is None or self._edits >= self.max_edits:
+            return
+        if not force and time.monotonic() - self._last_edit < self.edit_interval:
+            return
+        # the last edit is reserved for the final text
+        if not force and self._edits >= self.max_edits - 1:
+            return
+        try:
+            self.api._session.put(self.api._session.base_url + f"messages/{self.message_id}",
+                json = {"roomId": self.room_id, "markdown": markdown})
+            self._edits += 1
+            self._last_edit = time.monotonic()
+        except Exception as e:
+            logger.error(f"placeholder edit failed: {e}")
+
+    def add(self, block, line):
+        """
+        Add a card block and its markdown fallback line. A full page is sent right away.
+        """
+        size = len(json.dumps(block))
+        if self._blocks and self._size + size > self.max_card_bytes:
+            self.flush()
+        self._blocks.append(block)
+        self._lines.append(line)
+        self._size += size
+
+    def flush(self, footer = []):
+        if not self._blocks:
+            return
+        card = bc.empty_form()
+        title = self.title if self.pages_sent == 0 else f"{self.title} ({self.pages_sent + 1})"
+        card["body"].append({
+            "type": "TextBlock",
+            "text": title,
+            "wrap": True,
+            "size": "Large"
+        })
+        card["body"] += self._blocks + footer
+        markdown = "  \n".join([title] + self._lines)
+        try:
+            self.api.messages.create(roomId = self.room_id, markdown = markdown, attachments = [bc.wrap_form(card)])
+            self.pages_sent += 1
+        except Exception as e:
+            logger.error(f"card page post failed: {e}")
+        self._blocks = []
+        self._lines = []
+        self._size = 0
+
+    def finish(self, markdown, footer = []):
+        """
+        Send the last page and replace the placeholder text with the summary.
+        """
+        self.flush(footer)
+        self.progress(markdown, force = True)
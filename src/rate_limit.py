@@ -0,0 +1,75 @@
+"""
+Token bucket rate limiter.
+
+Used to cap the upload bandwidth (tokens are bytes) and the Webex API call rate (tokens are calls).
+The bucket is thread-safe and can be shared by any number of consumers.
+"""
+
+import time
+import threading
+
+class TokenBucket(object):
+    """
+    Token bucket with a refill rate and a burst capacity.
+
+    A consumer may take more than the current content of the bucket, the bucket
+    then goes into debt and the next consumers wait until it's repaid. This keeps
+    the long-term rate exact also for large amounts (file chunks).
+
+    Attributes:
+        rate (float): tokens per second, 0 or None means unlimited
+        capacity (float): maximum burst, defaults to one second worth of tokens
+    """
+    def __init__(self, rate, capacity = None):
+        self.rate = rate or 0
+        self.capacity = capacity if capacity is not None else max(self.rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self):
+        return self.rate <= 0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, amount = 1, block = True, timeout = None):
+        """
+        Take tokens from the bucket.
+
+        Parameters:
+            amount (float): number of tokens
+            block (bool): wait for the tokens
+            timeout (float): maximum wait in seconds
+
+        Returns:
+            bool: True if the tokens were taken
+        """
+        if self.unlimited:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= min(amount, self.capacity):
+                    self._tokens -= amount
+                    return True
+                wait = (min(amount, self.capacity) - self._tokens) / self.rate
+            if not block:
+                return False
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def available(self):
+        if self.unlimited:
+            return float("inf")
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
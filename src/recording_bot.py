@@ -21,6 +21,7 @@ spark-compliance:meetings_read
 """
 
 import os, sys, shutil
+import signal
 import asyncio
 
 """
@@ -72,7 +73,7 @@ audit_logger = setup_logger("audit", AUDIT_LOG_FILE)
 logger = setup_logger(__name__, LOG_FILE, level = logging.DEBUG, log_to_stdout = True)
     
 import requests
-from flask import Flask, url_for, request
+from flask import Flask, url_for, request, send_file
 try:
     from . import oauth_grant_flow as oauth
 except:
@@ -83,10 +84,12 @@ import _thread
 import time
 import json
 import re
+import hmac
+import uuid
+import tempfile
 import base64
-from dateutil import parser as date_parser
-from datetime import datetime, timedelta
-from urllib.parse import urlparse, quote
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
 import concurrent.futures
 
 try:
@@ -97,6 +100,98 @@ try:
     from . import localization_strings
 except:
     import localization_strings
+try:
+    from .meeting_model import Meeting, Recording, parse_timestamp
+except:
+    from meeting_model import Meeting, Recording, parse_timestamp
+try:
+    from .tenants import registry as tenant_registry, current_tenant, tenant_context, run_as
+except:
+    from tenants import registry as tenant_registry, current_tenant, tenant_context, run_as
+try:
+    from .prefetcher import RecordingPrefetcher
+except:
+    from prefetcher import RecordingPrefetcher
+try:
+    from .recording_upload import RecordingUploader, post_file_message
+except:
+    from recording_upload import RecordingUploader, post_file_message
+try:
+    from .rate_limit import TokenBucket
+except:
+    from rate_limit import TokenBucket
+try:
+    from .bulk_export import BulkExport, ExportRequestError, MANIFEST_FORMATS, export_to_file, parse_export_command, \
+        parse_targets, parse_date, time_windows, webex_time
+except:
+    from bulk_export import BulkExport, ExportRequestError, MANIFEST_FORMATS, export_to_file, parse_export_command, \
+        parse_targets, parse_date, time_windows, webex_time
+try:
+    from .content_cache import ContentCache
+except:
+    from content_cache import ContentCache
+try:
+    from .single_flight import SingleFlight
+except:
+    from single_flight import SingleFlight
+try:
+    from .fair_scheduler import FairScheduler
+except:
+    from fair_scheduler import FairScheduler
+try:
+    from .metrics import metrics
+except:
+    from metrics import metrics
+try:
+    from .event_dispatcher import KeyedDispatcher
+except:
+    from event_dispatcher import KeyedDispatcher
+try:
+    from .delivery_dedupe import DeliveryDedupe, webhook_delivery_key, websocket_delivery_key
+except:
+    from delivery_dedupe import DeliveryDedupe, webhook_delivery_key, websocket_delivery_key
+try:
+    from .token_store import create_token_store
+except:
+    from token_store import create_token_store
+try:
+    from .token_refresher import TokenRefresher
+except:
+    from token_refresher import TokenRefresher
+try:
+    from .webex_resilience import webex_get, webex_list, deadline, deadline_at, current_deadline, DeadlineExceeded, CircuitOpenError
+    from . import webex_resilience
+except:
+    from webex_resilience import webex_get, webex_list, deadline, deadline_at, current_deadline, DeadlineExceeded, CircuitOpenError
+    import webex_resilience
+try:
+    from .progressive_reply import ProgressiveReply
+except:
+    from progressive_reply import ProgressiveReply
+try:
+    from .approval_index import ApprovalIndex, load_approval_file
+except:
+    from approval_index import ApprovalIndex, load_approval_file
+try:
+    from .traffic_capture import TrafficRecorder
+except:
+    from traffic_capture import TrafficRecorder
+try:
+    from .meeting_store import MeetingStore, plan_sync
+except:
+    from meeting_store import MeetingStore, plan_sync
+try:
+    from .audit_rollup import AuditRollup
+except:
+    from audit_rollup import AuditRollup
+try:
+    from .job_queue import JobQueue
+except:
+    from job_queue import JobQueue
+try:
+    from .recording_cache import MEETING_LIST_TTL, EVENTS_MEETING_LIST_TTL
+except:
+    from recording_cache import MEETING_LIST_TTL, EVENTS_MEETING_LIST_TTL
 locale_strings = localization_strings.LOCALES["en_US"]
 
 from webexteamssdk import WebexTeamsAPI, ApiError
@@ -118,6 +213,10 @@ from watchdog.events import FileSystemEventHandler, FileModifiedEvent
 webex_api = WebexTeamsAPI(access_token = os.getenv("BOT_ACCESS_TOKEN"))
 
 MEETING_REC_RANGE = 10 # days to look back for meetings
+MEETING_EVENT_RESOURCES = { # optional Integration webhooks for cache updates
+    "meetings": ["ended"],
+    "recordings": ["created"]
+}
 CONFIG_FILE = "config.json"
 CFG_FILE_PATH = os.getenv("CFG_FILE_PATH", "/config/config.json")
 DEFAULT_CONFIG_FILE = "default-config.json"
@@ -128,6 +227,56 @@ logging.info("registering OAuth blueprint")
 flask_app.register_blueprint(oauth.webex_oauth, url_prefix = "/webex")
 requests.packages.urllib3.disable_warnings()
 
+recording_cache = tenant_registry.default.recording_cache # the other tenants have their own caches
+prefetcher = None
+meeting_events_enabled = False
+recording_uploader = None
+content_cache = None
+# identical concurrent requests share the Webex API calls, authorization and audit run per requestor
+meeting_list_flight = SingleFlight("meeting list")
+recordings_flight = SingleFlight("recordings")
+rec_scheduler = None
+token_refreshers = {} # tenant name -> TokenRefresher
+delivery_dedupe = DeliveryDedupe()
+webhook_executor = concurrent.futures.ThreadPoolExecutor(max_workers = 8, thread_name_prefix = "webhook")
+MAX_SERIES_SIZES = 10000
+series_sizes = {} # (meeting number, host) -> number of instances seen in the last request
+progressive_options = {}
+export_options = {}
+batch_options = {}
+batch_executor = concurrent.futures.ThreadPoolExecutor(max_workers = 8, thread_name_prefix = "rec_batch")
+export_executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "bulk_export")
+share_executor = concurrent.futures.ThreadPoolExecutor(max_workers = 8, thread_name_prefix = "share")
+traffic_recorder = None
+meeting_store = None
+usage_rollup = AuditRollup()
+usage_options = {}
+job_queue = None
+
+def integration_api(access_token = None):
+    """
+    Integration API client of the current tenant. The client and its HTTP connection pool
+    are shared by all requests (and their parallel parts) until the token is refreshed.
+    """
+    return current_tenant().api(access_token)
+    
+def tenant_cache():
+    return current_tenant().recording_cache
+    
+def flight_key(*parts):
+    """
+    Single flight key within the current tenant, the same meeting requested in two orgs
+    is fetched separately, each with its org's token.
+    """
+    return (current_tenant().name,) + parts
+
+def recordings_key(meeting_id, host_email):
+    """
+    Single flight key of the recordings of a meeting instance, the recordings are listed
+    with "hostEmail", so a request with another host doesn't join the flight.
+    """
+    return flight_key(meeting_id, (host_email or "").casefold())
+        
 def get_last_meeting_id(meeting_num, actor_email, host_email = "", days_back_range = MEETING_REC_RANGE):
     logger.debug("entering")
     meeting_id_list, msg = get_meeting_id_list(meeting_num, actor_email, host_email = host_email, days_back_range = days_back_range)
@@ -135,10 +284,10 @@ def get_last_meeting_id(meeting_num, actor_email, host_email = "", days_back_ran
         return None, None, msg
         
     if len(meeting_id_list) > 0:
-        last_meeting = sorted(meeting_id_list, key = lambda item: date_parser.parse(item["start"]), reverse=True)[0]
+        last_meeting = max(meeting_id_list, key = lambda item: item.start_epoch)
         logger.debug(f"Got last meeting {last_meeting}")
-        last_meeting_id = last_meeting["id"]
-        last_meeting_host_email = last_meeting["hostEmail"]
+        last_meeting_id = last_meeting.id
+        last_meeting_host_email = last_meeting.host_email
         
         logger.debug("leaving")
         return last_meeting_id, last_meeting_host_email, f"Last meeting id for {meeting_num} is {last_meeting_id}."
@@ -146,59 +295,137 @@ def get_last_meeting_id(meeting_num, actor_email, host_email = "", days_back_ran
         return None, None, "Meeting not found"
         
 def get_meeting_id_list(meeting_num, actor_email, host_email = "", days_back_range = MEETING_REC_RANGE):
+    cache_host_email = host_email or actor_email
+    meeting_list, msg = tenant_cache().get_meeting_list(meeting_num, cache_host_email, days_back_range)
+    if meeting_list is not None:
+        logger.debug(f"meeting list for {meeting_num}/{cache_host_email} served from cache")
+        return meeting_list, msg
+        
+    meeting_list, msg = fetch_meeting_id_list(meeting_num, actor_email, host_email = host_email, days_back_range = days_back_range)
+    tenant_cache().put_meeting_list(meeting_num, cache_host_email, days_back_range, meeting_list, msg)
+    return meeting_list, msg
+        
+def fetch_meeting_id_list(meeting_num, actor_email, host_email = "", days_back_range = MEETING_REC_RANGE):
     logger.debug(f"entering, meeting number: {meeting_num}, actor email: {actor_email}, host email: {host_email}")
-    access_token = oauth.access_token()
+    access_token = current_tenant().access_token()
     if access_token is None:
         return None, "No access token available, please authorize the Bot first."
         
-    webex_api = WebexTeamsAPI(access_token = access_token)
-    to_time = datetime.utcnow()
-    from_time = to_time - timedelta(days = days_back_range) # how long to look back
-    from_stamp = from_time.isoformat(timespec="milliseconds")+"Z"
-    to_stamp = to_time.isoformat(timespec="milliseconds")+"Z"
+    webex_api = integration_api(access_token)
+    to_epoch = time.time()
+    from_epoch = to_epoch - days_back_range * 86400 # how long to look back
+    from_stamp = epoch_stamp(from_epoch)
+    to_stamp = epoch_stamp(to_epoch)
+    host_key = host_email or actor_email
 
     try:
-        try:
-            meeting_info = webex_api._session.get(webex_api._session.base_url+"meetings", {"meetingNumber": meeting_num, "hostEmail": host_email, "from": from_stamp, "to": to_stamp})
-        except ApiError as e:
-            res = f"Webex API call exception: {e}."
-            logger.error(res)
-            meeting_info = webex_api._session.get(webex_api._session.base_url+"meetings", {"meetingNumber": meeting_num, "hostEmail": actor_email, "from": from_stamp, "to": to_stamp})
-
-        logger.debug(f"!!! received meeting info: {dict(meeting_info)}")
-        if len(meeting_info["items"]) > 0:            
-            meeting_series_id = meeting_info["items"][0]["meetingSeriesId"]
-            host_id = meeting_info["items"][0].get("hostUserId")
+        stored_series = None
+        if meeting_store is not None:
+            stored_series = meeting_store.series(current_tenant().name, meeting_num, host_key)
+        if stored_series is not None:
+            meeting_series_id = stored_series["series_id"]
+            meeting_host = stored_series["meeting_host"]
+        else:
+            try:
+                meeting_info = first_list_item(webex_api, "meetings", {"meetingNumber": meeting_num, "hostEmail": host_email, "from": from_stamp, "to": to_stamp})
+            except ApiError as e:
+                res = f"Webex API call exception: {e}."
+                logger.error(res)
+                meeting_info = first_list_item(webex_api, "meetings", {"meetingNumber": meeting_num, "hostEmail": actor_email, "from": from_stamp, "to": to_stamp})
+
+            logger.debug(f"!!! received meeting info: {meeting_info}")
+            if meeting_info is None:
+                return None, "Meeting not found"
+            meeting_series_id = meeting_info["meetingSeriesId"]
+            host_id = meeting_info.get("hostUserId")
             if host_id is not None:
                 try:
-                    host_info = webex_api.people.get(host_id)
+                    host_info = webex_get(webex_api, f"people/{host_id}", hedge = True)
                     logger.debug(f"meeting host info: {host_info}")
-                    meeting_host = host_info.emails[0]
+                    meeting_host = host_info["emails"][0]
                 except ApiError as e:
                     logger.error(f"Webex API call exception: {e}.")
             else:
-                meeting_host = meeting_info["items"][0].get("hostEmail", host_email)
-            logger.debug(f"Found meeting series id: {meeting_series_id} for meeting number: {meeting_num}")
-            meeting_list = webex_api._session.get(webex_api._session.base_url+"meetings", {"meetingSeriesId": meeting_series_id, "hostEmail": meeting_host, "meetingType": "meeting", "state": "ended", "from": from_stamp, "to": to_stamp})
-            meeting_list = sorted(meeting_list["items"], key = lambda item: date_parser.parse(item["start"]))
-            logger.debug(f"Got meetings: {meeting_list}")
-            
-            logger.debug("leaving")
-            return meeting_list, f"{len(meeting_list)} meetings found"
+                meeting_host = meeting_info.get("hostEmail", host_email)
+        logger.debug(f"Found meeting series id: {meeting_series_id} for meeting number: {meeting_num}")
+        if meeting_store is not None:
+            meeting_list = sync_ended_meetings(webex_api, meeting_num, host_key, meeting_series_id, meeting_host, stored_series, from_epoch, to_epoch)
         else:
-            return None, "Meeting not found"
+            meeting_list = sorted(list_ended_meetings(webex_api, meeting_series_id, meeting_host, from_epoch, to_epoch), key = lambda item: item.start_epoch)
+        logger.debug(f"Got meetings: {meeting_list}")
+        
+        logger.debug("leaving")
+        return meeting_list, f"{len(meeting_list)} meetings found"
     except ApiError as e:
         res = f"Webex API call exception: {e}."
         logger.error(res)
         return None, locale_strings["loc_unable_to_get_meeting"]
         
+def epoch_stamp(epoch):
+    return webex_time(datetime.fromtimestamp(epoch, timezone.utc))
+    
+def list_ended_meetings(webex_api, meeting_series_id, meeting_host, from_epoch, to_epoch):
+    meeting_items = webex_list(webex_api, "meetings", {"meetingSeriesId": meeting_series_id, "hostEmail": meeting_host, "meetingType": "meeting", "state": "ended",
+        "from": epoch_stamp(from_epoch), "to": epoch_stamp(to_epoch)}, fields = Meeting.API_FIELDS)
+    return [Meeting.from_dict(item) for item in meeting_items]
+    
+def sync_ended_meetings(webex_api, meeting_num, host_key, meeting_series_id, meeting_host, stored_series, from_epoch, to_epoch):
+    """
+    Ended meeting instances from the meeting store. Only the instances newer than the last sync
+    and the part of the window older than the synced range are requested from the API.
+    """
+    ranges, covered_from = plan_sync(stored_series, from_epoch, to_epoch, meeting_store.settle_time)
+    new_meetings = []
+    for range_from, range_to in ranges:
+        new_meetings += list_ended_meetings(webex_api, meeting_series_id, meeting_host, range_from, range_to)
+    meeting_store.merge(current_tenant().name, meeting_num, host_key, meeting_series_id, meeting_host, new_meetings, covered_from, to_epoch)
+    metrics.inc("meeting_store.synced", len(new_meetings))
+    logger.debug(f"meeting store sync of {meeting_series_id}: {len(ranges)} ranges, {len(new_meetings)} instances")
+    return meeting_store.meetings(meeting_series_id, from_epoch, to_epoch)
+    
+def first_list_item(webex_api, path, params):
+    """
+    First item of a Webex API list, the rest of the response is not read.
+    """
+    items = webex_list(webex_api, path, params, fields = Meeting.API_FIELDS)
+    try:
+        return next(items, None)
+    finally:
+        items.close()
+        
+def submit_in_context(executor, function, *args, **kwargs):
+    """
+    Run the function in the executor with the tenant and request deadline of the calling thread.
+
+    Returns:
+        Future: result of the function
+    """
+    tenant = current_tenant()
+    request_deadline = current_deadline()
+    def run():
+        with deadline_at(request_deadline):
+            return run_as(tenant, function, *args, **kwargs)
+    return executor.submit(run)
+
+def find_known_meeting(meeting_id):
+    """
+    Meeting instance from the cached meeting lists or from the meeting store, no API call.
+
+    Returns:
+        Meeting: meeting instance or None
+    """
+    meeting = tenant_cache().find_meeting(meeting_id)
+    if meeting is None and meeting_store is not None:
+        meeting = meeting_store.meeting(meeting_id)
+    return meeting
+
 def get_meeting_details(meeting_id, host_email = None):
-    webex_api = WebexTeamsAPI(access_token = oauth.access_token())
+    webex_api = integration_api()
     try:
         params = {}
         if host_email is not None:
             params = {"hostEmail": host_email}
-        meeting_details = webex_api._session.get(webex_api._session.base_url + f"meetings/{meeting_id}", params)
+        meeting_details = Meeting.from_dict(webex_get(webex_api, f"meetings/{meeting_id}", params, hedge = True))
         logger.debug(f"Meeting details for {meeting_id}: {meeting_details}")
         return meeting_details
     except ApiError as e:
@@ -206,60 +433,78 @@ def get_meeting_details(meeting_id, host_email = None):
         
 def get_recording_details(meeting_id, host_email):
     try:
-        webex_api = WebexTeamsAPI(access_token = oauth.access_token())
-        recording_list = webex_api._session.get(webex_api._session.base_url+"recordings", {"meetingId": meeting_id, "hostEmail": host_email})
-        rec_len = len(recording_list["items"])
-        logger.debug(f"{rec_len} recordings for the meeting id {meeting_id}: {recording_list}")
-        if rec_len > 0:
-            recordings_sorted = sorted(recording_list["items"], key = lambda item: date_parser.parse(item["timeRecorded"]))
-            for rec in recordings_sorted:
-                rec_id = rec["id"]
-                logger.debug(f"Get recording {rec_id} details")
-                """
-                This part depends on an Integration scope and permissions of the user who authorized it.
-                See oauth_grant_flow.py, WBX_MEETINGS_RECORDING_READ_SCOPE
-                
-                - hostEmail parameter needs to be used if the scope is "meeting:admin_recordings_read"
-                and the authorizing user is normal Admin
-                
-                - in some Webex configurations however the admin can be blocked from recording download
-                and then only Compliance officer can access the recordings. In that case the scope has
-                to be changed to "spark-compliance:meetings_read" (and "meeting:admin_recordings_read" removed).
-                hostEmail parameter must not be used in that case. Authorization of the Integration has to be
-                done by Compliance officer.
-                """
-                
-                # for "meeting:admin_recordings_read" scope and Admin authorization:
-                # recording_detail = webex_api._session.get(webex_api._session.base_url+f"recordings/{rec_id}", {"hostEmail": host_email})
-
-                # for "spark-compliance:meetings_read" scope and Compliance officer authorization:
-                recording_detail = webex_api._session.get(webex_api._session.base_url+f"recordings/{rec_id}")
-                rec_detail = json.loads(json.dumps(recording_detail))
-                logger.debug(f"Got recording {rec_id} details: {rec_detail}")
-                yield rec_detail
+        yield from iter_recording_details(meeting_id, host_email)
     except ApiError as e:
         logger.error(f"Webex API call exception: {e}.")
+        
+def iter_recording_details(meeting_id, host_email, limiter = None):
+    """
+    Get details of the meeting recordings, raise ApiError on failure.
+    
+    Parameters:
+        limiter (TokenBucket): optional API call rate limit
+    """
+    webex_api = integration_api()
+    recording_list = meeting_store.recording_ids(meeting_id) if meeting_store is not None else None
+    if recording_list is None:
+        if limiter is not None:
+            limiter.consume()
+        # only the ids and times are needed here, the details come from "recordings/{id}"
+        recording_list = list(webex_list(webex_api, "recordings", {"meetingId": meeting_id, "hostEmail": host_email}, fields = ("id", "timeRecorded")))
+        if meeting_store is not None:
+            meeting_store.put_recording_ids(meeting_id, recording_list)
+    rec_len = len(recording_list)
+    logger.debug(f"{rec_len} recordings for the meeting id {meeting_id}: {recording_list}")
+    if rec_len > 0:
+        recordings_sorted = sorted(recording_list, key = lambda item: parse_timestamp(item.get("timeRecorded")) or 0.0)
+        for rec in recordings_sorted:
+            rec_id = rec["id"]
+            logger.debug(f"Get recording {rec_id} details")
+            """
+            This part depends on an Integration scope and permissions of the user who authorized it.
+            See oauth_grant_flow.py, WBX_MEETINGS_RECORDING_READ_SCOPE
             
+            - hostEmail parameter needs to be used if the scope is "meeting:admin_recordings_read"
+            and the authorizing user is normal Admin
+            
+            - in some Webex configurations however the admin can be blocked from recording download
+            and then only Compliance officer can access the recordings. In that case the scope has
+            to be changed to "spark-compliance:meetings_read" (and "meeting:admin_recordings_read" removed).
+            hostEmail parameter must not be used in that case. Authorization of the Integration has to be
+            done by Compliance officer.
+            """
+            
+            # for "meeting:admin_recordings_read" scope and Admin authorization:
+            # recording_detail = webex_api._session.get(webex_api._session.base_url+f"recordings/{rec_id}", {"hostEmail": host_email})
+
+            # for "spark-compliance:meetings_read" scope and Compliance officer authorization:
+            if limiter is not None:
+                limiter.consume()
+            try:
+                rec_detail = Recording.from_dict(webex_get(webex_api, f"recordings/{rec_id}", hedge = True))
+            except ApiError as e:
+                if e.status_code == 404 and meeting_store is not None:
+                    # deleted recording, list the recordings again next time
+                    meeting_store.forget_recordings(meeting_id)
+                raise
+            logger.debug(f"Got recording {rec_id} details: {rec_detail}")
+            yield rec_detail
+        
 def get_recording_urls(recording_details):
-    url_list = recording_details.get("temporaryDirectDownloadLinks")
-    if url_list:
-        return fix_url(url_list.get("audioDownloadLink"), f"{recording_details['topic']}.mp3"), fix_url(url_list.get("recordingDownloadLink"), f"{recording_details['topic']}.mp4"), url_list.get("expiration")
-    
-def fix_url(url, add_filename):
-    parsed_url = urlparse(url)
-    logger.debug(f"path found in URL: {parsed_url.path}")
-    url_base = os.path.basename(parsed_url.path)
-    if not url_base.endswith((".mp4", ".mp3")):
-        new_path = parsed_url.path + "/" + quote(add_filename)
-        logger.info(f"fix URL path '{parsed_url.path}' to '{new_path}'")
-        return parsed_url._replace(path = new_path).geturl()
-    
-    return url
+    if recording_details.has_links:
+        return recording_details.audio_url, recording_details.video_url, recording_details.expiration
         
 def meeting_is_pmr(meeting_num, host_email):
+    is_pmr = tenant_cache().get_pmr(meeting_num, host_email)
+    if is_pmr is None:
+        is_pmr = check_meeting_is_pmr(meeting_num, host_email)
+        tenant_cache().put_pmr(meeting_num, host_email, is_pmr)
+    return is_pmr
+        
+def check_meeting_is_pmr(meeting_num, host_email):
     try:
-        webex_api = WebexTeamsAPI(access_token = oauth.access_token())
-        host_preferences = webex_api._session.get(webex_api._session.base_url+"meetingPreferences/personalMeetingRoom", {"userEmail": host_email})
+        webex_api = integration_api()
+        host_preferences = webex_get(webex_api, "meetingPreferences/personalMeetingRoom", {"userEmail": host_email})
         logger.debug(f"Preferences for the meeting host {host_email} / {meeting_num}: {host_preferences['telephony']}")
         pref_telephony = host_preferences.get("telephony")
         if pref_telephony:
@@ -278,30 +523,98 @@ def audit_log(actor_email, host_email, meeting_num, days_back, status, descripti
         "days_back": days_back,
         "recordings": recordings,
         "status": status,
-        "description": description
+        "description": description,
+        "tenant": current_tenant().name
     }
     audit_logger.info(f"JSON: {json.dumps(log_dict)}")
+    usage_rollup.record(log_dict)
     
 def create_recording_audit(meeting_recordings):
+    """
+    Group the recording ids by meeting id, in the order of the first recording of each meeting.
+    """
     logger.debug("create recording audit")
-    result = []
+    by_meeting = {}
     for rec in meeting_recordings:
-        logger.debug(f"audit meeting record: {rec}")
-        recordings = get_recordings_for_meeting_id(rec["meetingId"], result)
-        if recordings is None:
-            result.append({"meetingId": rec["meetingId"], "recordings": [{"id": rec["id"]}]})
-        else:
-            recordings.append({"id": rec["id"]})
-            
-        logger.debug(f"recording audit: {result}")
-        
+        by_meeting.setdefault(rec.meeting_id, []).append({"id": rec.id})
+    result = [{"meetingId": meeting_id, "recordings": recordings} for meeting_id, recordings in by_meeting.items()]
+    logger.debug(f"recording audit: {result}")
     return result
+
+REC_ENTRY_SEPARATORS = re.compile(r"[,;\n]+")
+
+def parse_rec_requests(message, attachment_actions, actor_email):
+    """
+    Get the meeting numbers, host e-mails and days back from the "rec" command or card.
+    More meetings can be requested at once, separated by comma, semicolon or new line.
+
+    Returns:
+        list: (meeting_num, host_email, days_back) tuples or None if the input is unknown
+    """
+    if isinstance(attachment_actions, AttachmentAction):
+        meeting_nums = attachment_actions.inputs.get("meeting_number") or ""
+        host_email = attachment_actions.inputs.get("meeting_host", actor_email)
+        days_back = attachment_actions.inputs.get("days_back", MEETING_REC_RANGE)
+        if days_back == "":
+            days_back = MEETING_REC_RANGE
+        entries = [entry for entry in REC_ENTRY_SEPARATORS.split(meeting_nums) if entry.strip()] or [meeting_nums]
+        return [normalize_rec_request(entry, host_email, days_back, actor_email) for entry in entries]
+    elif isinstance(attachment_actions, Message):
+        entries = [entry for entry in REC_ENTRY_SEPARATORS.split(message) if entry.strip()] or [message]
+        return [parse_rec_text(entry, actor_email) for entry in entries]
+    else:
+        return None
+        
+def parse_rec_text(meeting_info, actor_email):
+    """
+    Parse "<meeting number> [host e-mail] [days back]".
+    """
+    meeting_info = meeting_info.strip()
+    meeting_num = re.findall(r"^([\d\s]+)", meeting_info)[0]
+    logger.debug(f"Rec command - meeting number: {meeting_num}")
+    meeting_info = meeting_info.replace(meeting_num, "")
+
+    host_match = re.findall(r"(\S{1,}@\S{2,}\.\S{2,})", meeting_info)
+    if len(host_match) == 0:
+        host_email = actor_email
+    else:
+        host_email = host_match[0]
+    logger.debug(f"Rec command - host email: {host_email}")
+    meeting_info = meeting_info.replace(host_email, "")
+
+    db_match = re.findall(r"([\d]+)", meeting_info)
+    if len(db_match) == 0:
+        days_back = MEETING_REC_RANGE
+    else:
+        days_back = db_match[0]
+    logger.debug(f"Rec command - days back: {days_back}")
+    return normalize_rec_request(meeting_num, host_email, days_back, actor_email)
     
-def get_recordings_for_meeting_id(meeting_id, recording_audit):
-    for audit_rec in recording_audit:
-        if audit_rec["meetingId"] == meeting_id:
-            return audit_rec["recordings"]
-            
+def normalize_rec_request(meeting_num, host_email, days_back, actor_email):
+    meeting_num = meeting_num.strip().replace(" ", "")
+    host_email = host_email.strip()
+    if len(host_email) == 0:
+        host_email = actor_email
+        logger.debug(f"empty host email, setting to {actor_email}")
+    days_back = int(days_back)
+    return meeting_num, host_email, days_back
+
+def note_series_size(meeting_num, host_email, size):
+    if len(series_sizes) >= MAX_SERIES_SIZES:
+        series_sizes.clear()
+    series_sizes[(meeting_num, host_email.casefold())] = size
+
+def estimate_request_cost(meeting_num, host_email, days_back):
+    """
+    Estimate the number of API calls of a "rec" request: the meeting list (including paging
+    and the host lookup) and a recording list per meeting instance. The number of instances
+    is the last seen size of the series, or a weekly meeting for unknown series.
+    """
+    instances = series_sizes.get((meeting_num, host_email.casefold()))
+    if instances is None:
+        instances = days_back // 7 + 1
+    return 3 + 2 * instances
+
 class RecordingCommand(Command):
     
     def __init__(self, bot):
@@ -370,42 +683,93 @@ class RecordingCommand(Command):
         actor_email = activity["actor"]["emailAddress"]
         actor_uuid = activity["actor"]["entryUUID"]
         actor_id = get_person_id(actor_uuid)
+        room_id = getattr(attachment_actions, "roomId", None)
         logger.debug(f"Execute with message: {message}, attachement actions: {attachment_actions}, activity: {activity}")
+        meeting_num = host_email = days_back = None
+        try:
+            rec_requests = parse_rec_requests(message, attachment_actions, actor_email)
+            if rec_requests is None:
+                return f"Unknown input from {attachment_actions}"
+        except Exception as e:
+            logger.error(f"Meeting number parsing error: {e}")
+            audit_log(actor_email, host_email, meeting_num, days_back, "invalid", "meeting number parsing error")
+            return locale_strings["loc_invalid_meeting"]
+            
+        if len(rec_requests) > 1:
+            max_meetings = batch_options.get("max_meetings", 10)
+            if len(rec_requests) > max_meetings:
+                audit_log(actor_email, host_email, ", ".join(request[0] for request in rec_requests), days_back, "invalid", "too many meetings requested")
+                return locale_strings["loc_batch_too_large"].format(max_meetings)
+            if rec_scheduler is None:
+                return self.process_batch(actor_email, actor_id, rec_requests)
+            cost = sum(estimate_request_cost(*request) for request in rec_requests)
+            return rec_scheduler.submit(actor_email, cost, run_as, current_tenant(), self.process_batch, actor_email, actor_id, rec_requests).result()
+
+        meeting_num, host_email, days_back = rec_requests[0]
+        if rec_scheduler is None:
+            return self.process_request(actor_email, actor_id, meeting_num, host_email, days_back, room_id = room_id)
+        cost = estimate_request_cost(meeting_num, host_email, days_back)
+        return rec_scheduler.submit(actor_email, cost, run_as, current_tenant(), self.process_request, actor_email, actor_id, meeting_num, host_email, days_back, room_id = room_id).result()
+
+    def process_request(self, actor_email, actor_id, meeting_num, host_email, days_back, room_id = None):
+        """
+        Get the recordings of a meeting and create the response.
+
+        Parameters:
+            actor_email (str): e-mail of the requestor
+            actor_id (str): Webex id of the requestor
+            meeting_num (str): meeting number
+            host_email (str): meeting host e-mail
+            days_back (int): how many days to look back for the meeting instances
+            room_id (str): space of the request, enables progressive reply for long results
+
+        Returns:
+            str or Response: reply to the requestor
+        """
+        try:
+            with deadline(webex_resilience.options.get("request_deadline")):
+                return self._process_request(actor_email, actor_id, meeting_num, host_email, days_back, room_id)
+        except (DeadlineExceeded, CircuitOpenError, requests.RequestException) as e:
+            logger.error(f"Recording request degraded: {e}")
+            audit_log(actor_email, host_email, meeting_num, days_back, "degraded", "Webex API unavailable or slow")
+            return locale_strings["loc_degraded"]
+            
+    def process_batch(self, actor_email, actor_id, rec_requests):
+        """
+        Get the recordings of more meetings in parallel and create one grouped response.
+        Each meeting is authorized, checked for PMR and audited separately,
+        all of them share the request deadline.
+
+        Parameters:
+            rec_requests (list): (meeting_num, host_email, days_back) tuples
+
+        Returns:
+            Response: grouped reply to the requestor
+        """
+        with deadline(webex_resilience.options.get("request_deadline")):
+            request_deadline = current_deadline()
+            futures = [batch_executor.submit(run_as, current_tenant(), self._process_batch_item, request_deadline, actor_email, actor_id, *rec_request)
+                for rec_request in rec_requests]
+            results = [(rec_request[0], future.result()) for rec_request, future in zip(rec_requests, futures)]
+        return format_batch_response(results)
+        
+    def _process_batch_item(self, request_deadline, actor_email, actor_id, meeting_num, host_email, days_back):
+        try:
+            with deadline_at(request_deadline):
+                return self._process_request(actor_email, actor_id, meeting_num, host_email, days_back, batch = True)
+        except (DeadlineExceeded, CircuitOpenError, requests.RequestException) as e:
+            logger.error(f"Recording request degraded: {e}")
+            audit_log(actor_email, host_email, meeting_num, days_back, "degraded", "Webex API unavailable or slow")
+            return locale_strings["loc_degraded"]
+            
+    def _process_request(self, actor_email, actor_id, meeting_num, host_email, days_back, room_id = None, batch = False):
+        """
+        Returns:
+            str or Response: reply to the requestor, for a batch item with recordings
+                (meeting details, recordings, complete) instead
+        """
+        request_host_email = host_email
         try:
-            if isinstance(attachment_actions, AttachmentAction):
-                meeting_num = attachment_actions.inputs.get("meeting_number")
-                host_email = attachment_actions.inputs.get("meeting_host", actor_email)
-                days_back = attachment_actions.inputs.get("days_back", MEETING_REC_RANGE)
-                if days_back == "":
-                    days_back = MEETING_REC_RANGE
-            elif isinstance(attachment_actions, Message):
-                meeting_info = message.strip()
-                meeting_num = re.findall(r"^([\d\s]+)", meeting_info)[0]
-                logger.debug(f"Rec command - meeting number: {meeting_num}")
-                meeting_info = meeting_info.replace(meeting_num, "")
-                
-                host_match = re.findall(r"(\S{1,}@\S{2,}\.\S{2,})", meeting_info)
-                if len(host_match) == 0:
-                    host_email = actor_email
-                else:
-                    host_email = host_match[0]
-                logger.debug(f"Rec command - host email: {host_email}")
-                meeting_info = meeting_info.replace(host_email, "")
-                    
-                db_match = re.findall(r"([\d]+)", meeting_info)
-                if len(db_match) == 0:
-                    days_back = MEETING_REC_RANGE
-                else:
-                    days_back = db_match[0]
-                logger.debug(f"Rec command - days back: {days_back}")
-            else:
-                return "Unknown input from {attachment_actions}"
-            meeting_num = meeting_num.strip().replace(" ", "")
-            host_email = host_email.strip()
-            if len(host_email) == 0:
-                host_email = actor_email
-                logger.debug(f"empty host email, setting to {actor_email}")
-            days_back = int(days_back)
             if len(meeting_num) > 0:
                 if self.bot.protect_pmr and meeting_is_pmr(meeting_num, host_email):
                     if  actor_email.lower() != host_email.lower():
@@ -414,23 +778,12 @@ class RecordingCommand(Command):
                         audit_log(actor_email, host_email, meeting_num, days_back, "denied", "PMR access denied")
                         return response
                         
-                """
-                meeting_id, host_email, response = get_last_meeting_id(meeting_num, actor_email, host_email = host_email)
-                if meeting_id is not None:
-                    if self.respond_only_to_host and actor_email.lower() != host_email.lower():
-                        logger.debug(f"Actor {actor_email} not a host of the meeting {meeting_num}, rejecting request.")
-                        response = Response()
-                        response.markdown = "Only host can request a meeting recording."
-                    else:
-                        meeting_details = get_meeting_details(meeting_id)
-                        meeting_recordings = get_meeting_recordings(meeting_id, host_email)
-                        response = format_recording_response(meeting_details, meeting_recordings)
-                """
-                
-                meeting_list, msg = get_meeting_id_list(meeting_num, actor_email, host_email = host_email, days_back_range = days_back)
+                request_key = flight_key(meeting_num, request_host_email.casefold(), days_back)
+                meeting_list, msg = meeting_list_flight.do(request_key, get_meeting_id_list, meeting_num, actor_email, host_email = host_email, days_back_range = days_back)
                 if meeting_list is not None and len(meeting_list) > 0:
-                    host_email = meeting_list[0].get("hostEmail")
-                    host_id = meeting_list[0].get("hostUserId")
+                    note_series_size(meeting_num, request_host_email, len(meeting_list))
+                    host_email = meeting_list[0].host_email
+                    host_id = meeting_list[0].host_user_id
                     logger.info(f"host e-mail: {host_email}, actor e-mail {actor_email}, host Id: {host_id}, actor Id: {actor_id}")
                     # if self.bot.respond_only_to_host and actor_email.lower() != host_email.lower():
                     if self.bot.respond_only_to_host and actor_id != host_id:
@@ -439,16 +792,25 @@ class RecordingCommand(Command):
                         response.markdown = locale_strings["loc_host_only"]
                         audit_log(actor_email, host_email, meeting_num, days_back, "denied", "only host can access recordings")
                     else:
-                        meeting_recordings = []
-                        for meeting in meeting_list:
-                            temp_host_email = meeting.get("hostEmail", host_email)
-                            meeting_id = meeting["id"]
-                            meeting_details = get_meeting_details(meeting_id, host_email = temp_host_email)
-                            meeting_recordings += get_meeting_recordings(meeting_id, temp_host_email)
+                        temp_host_email = meeting_list[-1].host_email or host_email
+                        # meeting instances from the list carry the title, no need for additional meeting details call
+                        meeting_details = meeting_list[-1]
+                        if batch:
+                            meeting_recordings, complete = recordings_flight.do(request_key, collect_meeting_recordings, meeting_list, host_email)
+                            response = (meeting_details, meeting_recordings, complete)
+                        elif room_id is not None and progressive_options.get("enabled", False) and len(meeting_list) >= progressive_options.get("min_meetings", 3):
+                            meeting_recordings, complete = stream_meeting_recordings(self.bot.teams, room_id, meeting_details, meeting_list, host_email)
+                            response = None # already sent
+                        else:
+                            meeting_recordings, complete = recordings_flight.do(request_key, collect_meeting_recordings, meeting_list, host_email)
+                            response = format_recording_response(meeting_details, meeting_recordings, complete = complete)
                         logger.debug(f"Got recordings: {meeting_recordings} for {meeting_details}")
-                        response = format_recording_response(meeting_details, meeting_recordings)
                         audit_recordings = create_recording_audit(meeting_recordings)
-                        audit_log(actor_email, temp_host_email, meeting_num, days_back, "permitted", "recording links provided", recordings=audit_recordings)
+                        description = "recording links provided" if complete else "partial recording links provided"
+                        audit_log(actor_email, temp_host_email, meeting_num, days_back, "permitted", description, recordings=audit_recordings)
+                        if prefetcher is not None:
+                            prefetcher.note_request(meeting_num, request_host_email, days_back, tenant = current_tenant().name)
+                        send_audio_files(actor_email, meeting_recordings)
                 else:
                     response = Response()
                     response.markdown = msg
@@ -456,13 +818,76 @@ class RecordingCommand(Command):
             else:
                 response = locale_strings["loc_meeting_number"]
                 audit_log(actor_email, host_email, meeting_num, days_back, "invalid", "meeting number not provided")
+        except (DeadlineExceeded, CircuitOpenError, requests.RequestException):
+            raise
         except Exception as e:
-            logger.error(f"Meeting number parsing error: {e}")
+            logger.error(f"Recording request error: {e}")
             response = locale_strings["loc_invalid_meeting"]
             audit_log(actor_email, host_email, meeting_num, days_back, "invalid", "meeting number parsing error")
 
         return response
         
+class ExportCommand(Command):
+    """
+    Bulk export of recording links (admins only, not shown in help).
+    
+    export [csv|jsonl] [YYYY-MM-DD[..YYYY-MM-DD]] <meeting numbers and/or host e-mails>
+    """
+    def __init__(self, bot):
+        logger.debug("Registering \"export\" command")
+        super().__init__(command_keyword="export", help_message = None, card = None)
+        self.bot = bot
+        
+    def execute(self, message, attachment_actions, activity):
+        actor_email = activity["actor"]["emailAddress"]
+        if not export_options.get("enabled", False) or actor_email.casefold() not in [admin.casefold() for admin in export_options.get("admins", [])]:
+            logger.warning(f"export denied to {actor_email}")
+            audit_log(actor_email, None, None, None, "denied", "bulk export not allowed")
+            return locale_strings["loc_export_denied"]
+        try:
+            targets, from_time, to_time, manifest_format = parse_export_command(message.strip(), MEETING_REC_RANGE)
+            check_export_request(targets, from_time, to_time)
+        except (ExportRequestError, ValueError) as e:
+            logger.error(f"export request error: {e}")
+            return locale_strings["loc_export_invalid"].format(e)
+            
+        room_id = getattr(attachment_actions, "roomId", None)
+        if job_queue is not None:
+            job_queue.enqueue("export", {"tenant": current_tenant().name, "actor_email": actor_email, "room_id": room_id,
+                "targets": targets, "from_time": from_time.isoformat(), "to_time": to_time.isoformat(), "format": manifest_format})
+        else:
+            export_executor.submit(run_as, current_tenant(), run_export_command, actor_email, room_id, targets, from_time, to_time, manifest_format)
+        return locale_strings["loc_export_started"].format(len(targets), from_time.date(), to_time.date())
+        
+class UsageCommand(Command):
+    """
+    Usage report from the audit rollups (admins only, not shown in help).
+    
+    usage [days]
+    """
+    def __init__(self, bot):
+        logger.debug("Registering \"usage\" command")
+        super().__init__(command_keyword="usage", help_message = None, card = None)
+        self.bot = bot
+        
+    def execute(self, message, attachment_actions, activity):
+        actor_email = activity["actor"]["emailAddress"]
+        if actor_email.casefold() not in [admin.casefold() for admin in usage_options.get("admins", [])]:
+            logger.warning(f"usage report denied to {actor_email}")
+            return locale_strings["loc_usage_denied"]
+        days_match = re.findall(r"\d+", message)
+        days = min(int(days_match[0]), usage_rollup.days) if days_match else 30
+        return usage_markdown(usage_rollup.report(days = max(days, 1), top = usage_options.get("top", 10)), days)
+        
+def usage_markdown(report, days):
+    totals = report["totals"]
+    lines = [locale_strings["loc_usage_report"].format(days, totals.get("requests", 0), totals.get("denied", 0), totals.get("recordings", 0))]
+    for title, entries in ((locale_strings["loc_usage_hosts"], report["hosts"]), (locale_strings["loc_usage_requesters"], report["requesters"])):
+        if entries:
+            lines.append(f"**{title}**")
+            lines += [f"- {entry['name']}: {entry.get('requests', 0)} / {entry.get('denied', 0)} / {entry.get('recordings', 0)}" for entry in entries]
+    return "  \n".join(lines)
+    
 class RecordingHelpCommand(HelpCommand):
     
     def __init__(self, bot_name, bot_help_subtitle, bot_help_image, bot):
@@ -574,27 +999,94 @@ def get_recording_response(meeting_id, host_email):
 
     return response
     
-def format_recording_response(meeting_details, meeting_recordings):
+def format_recording_response(meeting_details, meeting_recordings, complete = True):
     # res = f'{meeting_details["title"]}, started {meeting_details["start"]}'
-    res = f'{meeting_details["title"]}'
+    res = f'{meeting_details.title}'
     counter = 0
     for rec in meeting_recordings:
         counter += 1
-        audio_url, video_url, expires = get_recording_urls(rec)
-        rec_len = f'{rec["durationSeconds"]//60:02d}:{rec["durationSeconds"]%60:02d}'
-        res += f'  \n{rec["topic"]}: [audio {counter}]({audio_url}), [video {counter}]({video_url}), {rec_len}'
+        res += f'  \n{rec_markdown(rec, counter)}'
+    if not complete:
+        res += f'  \n{locale_strings["loc_partial"]}'
 
     response = Response()
     response.markdown = res
-    response.attachments = create_recording_card(meeting_details, meeting_recordings)
+    response.attachments = create_recording_card(meeting_details, meeting_recordings, complete = complete)
     
     return response
     
-def create_recording_card(meeting_details, meeting_recordings):
+class ResponsePages(object):
+    """
+    Stands in for the Bot API in ProgressiveReply: the card pages are collected
+    as Responses for the command reply instead of being posted.
+    """
+    def __init__(self):
+        self.responses = []
+        self.messages = self
+        
+    def create(self, roomId = None, markdown = None, attachments = None):
+        response = Response()
+        response.markdown = markdown
+        if attachments:
+            response.attachments = attachments[0]
+        self.responses.append(response)
+        
+def format_batch_response(results):
+    """
+    Cards with the recordings grouped by meeting, paginated by the card size.
+    
+    Parameters:
+        results (list): (meeting number, result) - result is (meeting details, recordings, complete)
+            or a text reply (denied, not found, ...)
+            
+    Returns:
+        list: Responses, one per card
+    """
+    pages = ResponsePages()
+    reply = ProgressiveReply(pages, None, locale_strings["loc_batch_title"].format(len(results)),
+        max_card_bytes = progressive_options.get("max_card_bytes", 16000))
+    all_recordings = []
+    complete = True
+    for meeting_num, result in results:
+        if isinstance(result, tuple):
+            meeting_details, meeting_recordings, meeting_complete = result
+            complete = complete and meeting_complete
+            all_recordings += meeting_recordings
+            title = f"{meeting_details.title} ({meeting_num})"
+            reply.add(batch_title_block(title), f"**{title}**")
+            for counter, rec in enumerate(meeting_recordings, start = 1):
+                reply.add(rec_block(rec), rec_markdown(rec, counter))
+        else:
+            text = getattr(result, "markdown", None) or getattr(result, "text", None) or str(result)
+            reply.add({
+                "type": "Container",
+                "items": [batch_title_block(meeting_num), {
+                    "type": "TextBlock",
+                    "text": text,
+                    "wrap": True
+                }]
+            }, f"**{meeting_num}**: {text}")
+    reply.flush(recording_card_footer(all_recordings, complete))
+    if not complete:
+        pages.responses[-1].markdown += f"  \n{locale_strings['loc_partial']}"
+    return pages.responses
+    
+def batch_title_block(title):
+    return {
+        "type": "TextBlock",
+        "text": title,
+        "wrap": True,
+        "size": "Medium",
+        "weight": "Bolder",
+        "separator": True,
+        "spacing": "Medium"
+    }
+    
+def create_recording_card(meeting_details, meeting_recordings, complete = True):
     card = bc.empty_form()
     header = {
         "type": "TextBlock",
-        "text": meeting_details["title"],
+        "text": meeting_details.title,
         "wrap": True,
         "size": "Large"
     }
@@ -603,8 +1095,14 @@ def create_recording_card(meeting_details, meeting_recordings):
     for rec in meeting_recordings:
         card["body"].append(rec_block(rec))
                 
+    card["body"] += recording_card_footer(meeting_recordings, complete)
+
+    return bc.wrap_form(card)
+    
+def recording_card_footer(meeting_recordings, complete = True):
+    result = []
     if len(meeting_recordings) > 0:
-        audio_url, video_url, expires = get_recording_urls(meeting_recordings[0])
+        expires = meeting_recordings[0].expiration or ""
         expires = expires.replace("T", " ")
         expires = expires.replace("Z", " GMT")
         expires_block = {
@@ -613,12 +1111,20 @@ def create_recording_card(meeting_details, meeting_recordings):
             "wrap": True,
             "color": "Attention"
         }
-        card["body"].append(expires_block)
-
-    return bc.wrap_form(card)
+        result.append(expires_block)
+    if not complete:
+        result.append({
+            "type": "TextBlock",
+            "text": locale_strings["loc_partial"],
+            "wrap": True,
+            "color": "Warning"
+        })
+    return result
+    
+def rec_markdown(rec, counter):
+    return f'{rec.topic}: [audio {counter}]({rec.audio_url}), [video {counter}]({rec.video_url}), {rec.duration}'
     
 def rec_block(rec):
-    audio_url, video_url, expires = get_recording_urls(rec)
     result = {
         "type": "ColumnSet",
         "columns": [
@@ -628,7 +1134,7 @@ def rec_block(rec):
                 "items": [
                     {
                         "type": "TextBlock",
-                        "text": rec["topic"],
+                        "text": rec.topic,
                         "wrap": True
                     }
                 ]
@@ -639,7 +1145,7 @@ def rec_block(rec):
                 "items": [
                     {
                         "type": "TextBlock",
-                        "text": f'{rec["durationSeconds"]//60:02d}:{rec["durationSeconds"]%60:02d}',
+                        "text": rec.duration,
                         "wrap": True
                     }
                 ]
@@ -654,12 +1160,12 @@ def rec_block(rec):
                             {
                                 "type": "Action.OpenUrl",
                                 "title": "Audio",
-                                "url": audio_url
+                                "url": rec.audio_url
                             },
                             {
                                 "type": "Action.OpenUrl",
                                 "title": "Video",
-                                "url": video_url
+                                "url": rec.video_url
                             }
                         ]
                     }
@@ -670,13 +1176,366 @@ def rec_block(rec):
     
     return result
     
+def stream_meeting_recordings(api, room_id, meeting_details, meeting_list, host_email):
+    """
+    Reply progressively: post a placeholder and send the recordings in cards
+    as the meeting instances are processed.
+    
+    Returns:
+        tuple: (list of Recording, complete)
+    """
+    reply = ProgressiveReply(api, room_id, meeting_details.title,
+        max_card_bytes = progressive_options.get("max_card_bytes", 16000),
+        edit_interval = progressive_options.get("edit_interval", 2))
+    total = len(meeting_list)
+    reply.start(locale_strings["loc_searching"].format(meeting_details.title, total))
+    meeting_recordings = []
+    complete = True
+    for index, meeting in enumerate(meeting_list):
+        try:
+            recording_host = meeting.host_email or host_email
+            recordings = recordings_flight.do(recordings_key(meeting.id, recording_host), get_meeting_recordings, meeting.id, recording_host)
+        except (DeadlineExceeded, CircuitOpenError, requests.RequestException) as e:
+            # the placeholder is finished with the recordings found so far
+            logger.warning(f"recordings incomplete, {e}")
+            complete = False
+            break
+        for rec in recordings:
+            meeting_recordings.append(rec)
+            reply.add(rec_block(rec), rec_markdown(rec, len(meeting_recordings)))
+        if reply.pages_sent == 0:
+            # the first links as soon as there are any
+            reply.flush()
+        reply.progress(locale_strings["loc_search_progress"].format(meeting_details.title, index + 1, total, len(meeting_recordings)))
+        
+    summary = locale_strings["loc_search_done"].format(meeting_details.title, len(meeting_recordings))
+    if not complete:
+        summary += f"  \n{locale_strings['loc_partial']}"
+    reply.finish(summary, footer = recording_card_footer(meeting_recordings, complete))
+    return meeting_recordings, complete
+    
+def collect_meeting_recordings(meeting_list, host_email):
+    """
+    Get the recordings of the meeting instances.
+    
+    Returns:
+        tuple: (list of Recording, complete) - complete is False if some instances
+            were skipped because of the request deadline or unavailable API
+    """
+    meeting_recordings = []
+    for meeting in meeting_list:
+        try:
+            meeting_recordings += get_meeting_recordings(meeting.id, meeting.host_email or host_email)
+        except (DeadlineExceeded, CircuitOpenError) as e:
+            logger.warning(f"recordings incomplete, {e}")
+            return meeting_recordings, False
+    return meeting_recordings, True
+    
 def get_meeting_recordings(meeting_id, host_email):
+    result = tenant_cache().get_recordings(meeting_id)
+    if result is not None:
+        logger.debug(f"recordings for {meeting_id} served from cache")
+        return result
+        
     result = []
-    for rec in get_recording_details(meeting_id, host_email):
-        result.append(rec)
+    try:
+        for rec in iter_recording_details(meeting_id, host_email):
+            result.append(rec)
+        tenant_cache().put_recordings(meeting_id, result)
+    except ApiError as e:
+        logger.error(f"Webex API call exception: {e}.")
+        
+    return result
+    
+def send_audio_files(actor_email, meeting_recordings):
+    """
+    Send the audio of the recordings as files in 1-1 space with the requestor (if enabled in the config).
+    
+    Uploads run in the background, the audio is streamed from the temporary URL to the message.
+    """
+    if recording_uploader is None:
+        return
+    for rec in meeting_recordings:
+        if rec.audio_url is not None:
+            source = None
+            if content_cache is not None:
+                source = lambda url, rec_id = rec.id: content_cache.open_or_fetch(rec_id, "audio", url)
+            recording_uploader.send_recording(rec.audio_url, f"{rec.topic}.mp3", content_type = "audio/mpeg",
+                to_person_email = actor_email, markdown = locale_strings["loc_audio_file"].format(rec.topic), source = source)
+    
+def start_uploader(config):
+    global recording_uploader, content_cache
+    
+    audio_config = config.get("send_audio", {})
+    if recording_uploader is not None or not audio_config.get("enabled", False):
+        return
+    cache_config = config.get("content_cache", {})
+    if cache_config.get("enabled", False):
+        content_cache = ContentCache(cache_config.get("path", "/tmp/recording_cache"), max_bytes = cache_config.get("max_bytes", 2 * 1024 * 1024 * 1024))
+    recording_uploader = RecordingUploader(os.getenv("BOT_ACCESS_TOKEN"),
+        max_concurrent = audio_config.get("max_concurrent_uploads", 2),
+        bandwidth_limit = audio_config.get("bandwidth_limit", 0),
+        max_file_size = audio_config.get("max_file_size", 100 * 1024 * 1024))
+    
+def start_token_refresher(config):
+    """
+    Start the background token refresh for each tenant which doesn't have it running yet.
+    """
+    refresh_config = config.get("token_refresh", {})
+    if not refresh_config.get("enabled", False):
+        return
+    oauth.webex_background_refresh = True
+    for tenant in tenant_registry.all():
+        if tenant.name in token_refreshers:
+            continue
+        refresher = TokenRefresher(tenant.access_token_obj,
+            margin = refresh_config.get("margin", 7200),
+            check_interval = refresh_config.get("check_interval", 300),
+            max_backoff = refresh_config.get("max_backoff", 1800),
+            name = "integration_token" if tenant is tenant_registry.default else f"integration_token.{tenant.name}")
+        refresher.start()
+        token_refreshers[tenant.name] = refresher
+    
+def start_scheduler(config):
+    global rec_scheduler
+    
+    scheduler_config = config.get("scheduler", {})
+    if rec_scheduler is not None or not scheduler_config.get("enabled", False):
+        return
+    rec_scheduler = FairScheduler(workers = scheduler_config.get("workers", 4),
+        max_heavy = scheduler_config.get("max_heavy", 1),
+        heavy_cost = scheduler_config.get("heavy_cost", 20),
+        quantum = scheduler_config.get("quantum", 10),
+        weights = scheduler_config.get("user_weights", {}),
+        name = "rec_scheduler")
+    
+def start_meeting_store(config):
+    """
+    Open the persistent meeting store if enabled in the config (only once per process).
+    """
+    global meeting_store
+    
+    store_config = config.get("meeting_store", {})
+    if meeting_store is not None or not store_config.get("enabled", False):
+        return
+    meeting_store = MeetingStore(store_config.get("path", "/token_storage/data/meeting_store.db"),
+        settle_time = store_config.get("settle_time", 86400))
+    
+def recording_cache_options(config):
+    """
+    "recording_cache" config section with the default meeting list TTL. The list is cached long
+    only if the meeting events invalidate it, otherwise a meeting which just ended would stay
+    invisible until the cached list expires.
+    """
+    options = dict(config.get("recording_cache", {}))
+    if options.get("meeting_list_ttl") is None:
+        options["meeting_list_ttl"] = EVENTS_MEETING_LIST_TTL if config.get("meeting_events", False) else MEETING_LIST_TTL
+    return options
+    
+def start_job_queue(config):
+    """
+    Open the durable job queue if enabled in the config (only once per process).
+    
+    Webhook events and bulk exports (chat and API) are then processed from the queue, websocket
+    activities once the websocket Bot runs (see WebexBotShare.run()).
+    """
+    global job_queue
+    
+    queue_config = config.get("job_queue", {})
+    if job_queue is not None or not queue_config.get("enabled", False):
+        return
+    job_queue = JobQueue(queue_config.get("path", "/token_storage/data/job_queue.db"),
+        workers = queue_config.get("workers", 4),
+        lease_time = queue_config.get("lease_time", 300),
+        max_attempts = queue_config.get("max_attempts", 5),
+        retry_delay = queue_config.get("retry_delay", 10),
+        dead_retention = queue_config.get("dead_retention", 7 * 86400))
+    job_queue.register("webhook", handle_webhook_event)
+    job_queue.register("export", run_export_job)
+    job_queue.register("api_export", run_api_export_job)
+    
+def drain_on_sigterm(timeout):
+    """
+    Let the queued jobs finish (up to "timeout" seconds) before the process is terminated.
+    Must be called from the main thread.
+    """
+    previous_handler = signal.getsignal(signal.SIGTERM)
+    
+    def handle_sigterm(signum, frame):
+        logger.info("SIGTERM received, draining")
+        if job_queue is not None:
+            job_queue.shutdown(timeout = timeout)
+        if callable(previous_handler):
+            previous_handler(signum, frame)
+        else:
+            signal.signal(signal.SIGTERM, previous_handler or signal.SIG_DFL)
+            os.kill(os.getpid(), signal.SIGTERM)
+            
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    
+def start_traffic_capture(config):
+    """
+    Start recording the incoming traffic for the load tests if enabled in the config (only once per process).
+    """
+    global traffic_recorder
+    
+    capture_config = config.get("traffic_capture", {})
+    if traffic_recorder is not None or not capture_config.get("enabled", False):
+        return
+    traffic_recorder = TrafficRecorder(capture_config.get("path", "/log/traffic.jsonl"),
+        max_bytes = capture_config.get("max_bytes", 100 * 1024 * 1024))
+    
+def prefetch_meeting_list(meeting_num, host_email, days_back):
+    meeting_list, msg = fetch_meeting_id_list(meeting_num, host_email, host_email = host_email, days_back_range = days_back)
+    tenant_cache().put_meeting_list(meeting_num, host_email, days_back, meeting_list, msg)
+    return meeting_list
+    
+def prefetch_meeting_recordings(meeting_id, host_email):
+    result = list(iter_recording_details(meeting_id, host_email))
+    tenant_cache().put_recordings(meeting_id, result)
+    return result
+    
+def start_prefetcher(config):
+    """
+    Start the background prefetcher if enabled in the config (only once per process).
+    """
+    global prefetcher
+    
+    prefetch_config = config.get("prefetch", {})
+    if prefetcher is not None or not prefetch_config.get("enabled", False):
+        return
+    prefetcher = RecordingPrefetcher(recording_cache, prefetch_meeting_list, prefetch_meeting_recordings,
+        interval = prefetch_config.get("interval", 300),
+        api_budget = prefetch_config.get("api_budget", 60),
+        max_series = prefetch_config.get("max_series", 200),
+        learn_days = prefetch_config.get("learn_days", 30),
+        max_days_back = prefetch_config.get("max_days_back", 31),
+        audit_log_file = config.get("audit_log_file", AUDIT_LOG_FILE) if prefetch_config.get("learn_from_audit_log", True) else None,
+        tenants = tenant_registry)
+    prefetcher.start()
+    
+def check_export_request(targets, from_time, to_time):
+    if len(targets) == 0:
+        raise ExportRequestError("no meeting numbers or hosts")
+    if len(targets) > export_options.get("max_targets", 500):
+        raise ExportRequestError(f"too many entries, maximum is {export_options.get('max_targets', 500)}")
+    if from_time >= to_time:
+        raise ExportRequestError("empty date range")
+    if (to_time - from_time).days > export_options.get("max_days", 365):
+        raise ExportRequestError(f"date range over {export_options.get('max_days', 365)} days")
         
+def create_bulk_export(actor_email):
+    """
+    Bulk export with a resolver sharing the API rate budget of one export.
+    """
+    limiter = TokenBucket(export_options.get("api_rate", 5))
+    tenant = current_tenant()
+    resolve = lambda target, from_time, to_time: resolve_export_target(target, from_time, to_time, limiter, actor_email, tenant)
+    return BulkExport(resolve, workers = export_options.get("workers", 4))
+    
+def resolve_export_target(target, from_time, to_time, limiter, actor_email, tenant):
+    """
+    Get the recordings of a meeting number or a host within the time range.
+    
+    Returns:
+        iterator: (meeting number, Recording)
+    """
+    with tenant_context(tenant):
+        yield from _resolve_export_target(target, from_time, to_time, limiter, actor_email)
+        
+def _resolve_export_target(target, from_time, to_time, limiter, actor_email):
+    kind, value, host_email = target
+    if kind == "meeting":
+        days_back = (datetime.now(timezone.utc) - from_time).days + 1
+        limiter.consume(3) # meeting number lookup, host lookup, series instances
+        meeting_list, msg = fetch_meeting_id_list(value, actor_email, host_email = host_email or actor_email, days_back_range = days_back)
+        if meeting_list is None:
+            raise ExportRequestError(msg)
+        for meeting in meeting_list:
+            if from_time.timestamp() <= meeting.start_epoch < to_time.timestamp():
+                for rec in iter_recording_details(meeting.id, meeting.host_email or host_email or actor_email, limiter = limiter):
+                    yield value, rec
+    else:
+        yield from iter_host_recordings(host_email, from_time, to_time, limiter)
+        
+def iter_host_recordings(host_email, from_time, to_time, limiter):
+    webex_api = integration_api()
+    # recording list accepts at most 30 days range
+    for window_from, window_to in time_windows(from_time, to_time, 30):
+        recording_ids = webex_list(webex_api, "recordings",
+            {"hostEmail": host_email, "from": webex_time(window_from), "to": webex_time(window_to), "max": 100},
+            fields = ("id",), limiter = limiter)
+        for item in recording_ids:
+            limiter.consume()
+            yield "", Recording.from_dict(webex_get(webex_api, f"recordings/{item['id']}"))
+                
+def export_summary_markdown(summary):
+    result = locale_strings["loc_export_done"].format(summary["recordings"], summary["targets"], summary["duration"])
+    if summary["failed"]:
+        result += "  \n" + locale_strings["loc_export_failed"].format(", ".join(summary["failed"][:10]))
     return result
     
+def run_export_command(actor_email, room_id, targets, from_time, to_time, manifest_format):
+    """
+    Run the export and send the manifest file to the requestor.
+    """
+    try:
+        path, summary = export_to_file(create_bulk_export(actor_email), targets, from_time, to_time,
+            manifest_format = manifest_format, directory = export_options.get("path"))
+    except Exception as e:
+        logger.error(f"bulk export failed: {e}")
+        webex_api.messages.create(roomId = room_id, toPersonEmail = None if room_id else actor_email, markdown = locale_strings["loc_export_error"])
+        return
+    audit_log(actor_email, None, None, (to_time - from_time).days, "export", f"{summary['recordings']} recordings of {summary['targets']} meetings or hosts exported")
+    deliver_export_file(path, export_summary_markdown(summary), manifest_format, room_id = room_id,
+        to_person_email = None if room_id else actor_email)
+    
+def run_export_job(job):
+    """
+    Job queue handler of the "export" jobs.
+    """
+    tenant = tenant_registry.get(job["tenant"])
+    if tenant is None:
+        logger.error(f"export job of unknown tenant {job['tenant']} dropped")
+        return
+    run_as(tenant, run_export_command, job["actor_email"], job["room_id"], [tuple(target) for target in job["targets"]],
+        datetime.fromisoformat(job["from_time"]), datetime.fromisoformat(job["to_time"]), job["format"])
+    
+def run_api_export_job(job):
+    """
+    Job queue handler of the "api_export" jobs (POST /export), the result goes to the job's status file.
+    """
+    tenant = tenant_registry.get(job["tenant"])
+    if tenant is None:
+        logger.error(f"export job {job['job_id']} of unknown tenant {job['tenant']} dropped")
+        save_export_status(job["job_id"], {"state": "failed", "error": f"unknown tenant {job['tenant']}"})
+        return
+    run_as(tenant, run_api_export, job["job_id"], [tuple(target) for target in job["targets"]],
+        datetime.fromisoformat(job["from_time"]), datetime.fromisoformat(job["to_time"]), job["format"])
+    
+def deliver_export_file(path, markdown, manifest_format, room_id = None, to_person_email = None):
+    """
+    Send the manifest as a message attachment (streamed from the disk) and remove it.
+    """
+    file_name = f"recordings_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{manifest_format}"
+    content_type = MANIFEST_FORMATS[manifest_format]
+    size = os.path.getsize(path)
+    source = lambda url: (open(url, "rb"), size)
+    if recording_uploader is not None:
+        future = recording_uploader.send_recording(path, file_name, content_type = content_type, to_person_email = to_person_email,
+            room_id = room_id, markdown = markdown, source = source)
+        future.add_done_callback(lambda result: os.remove(path))
+        return
+    try:
+        body, length = source(path)
+        with body:
+            post_file_message(os.getenv("BOT_ACCESS_TOKEN"), body, length, file_name, content_type, markdown = markdown,
+                room_id = room_id, to_person_email = to_person_email)
+    except Exception as e:
+        logger.error(f"export delivery failed: {e}")
+    finally:
+        os.remove(path)
+    
 def load_config(cfg_file = CONFIG_FILE):
     global locale_strings
     
@@ -750,7 +1609,102 @@ class WebexBotShare(WebexBotWsWh):
         self.commands = {self.help_command}
         self.help_command.commands = self.commands
     
+    def find_command(self, raw_message, is_card_callback_command = False):
+        """
+        Command of the message matched by its first word. webex_bot picks the first command
+        (in set order) whose keyword appears anywhere in the message, so "export director@acme.com"
+        could run "rec".
+        
+        Returns:
+            Command: matching command or None
+        """
+        user_command = (raw_message or "").strip().lower()
+        first_word = user_command.split(maxsplit = 1)[0] if user_command else ""
+        for command in self.commands:
+            if is_card_callback_command or not command.command_keyword:
+                if user_command in (command.command_keyword, command.card_callback_keyword):
+                    return command
+            elif first_word == command.command_keyword.lower():
+                return command
+        
+    def process_raw_command(self, raw_message, teams_message, user_email, activity, is_card_callback_command = False):
+        """
+        webex_bot process_raw_command() with the command matched by find_command().
+        """
+        room_id = teams_message.roomId
+        is_one_on_one_space = "ONE_ON_ONE" in activity["target"]["tags"]
+        raw_message = (raw_message or "").strip()
+        command = self.find_command(raw_message, is_card_callback_command)
+        if command is None:
+            logger.warning(f"Did not find command for {raw_message}. Default to help card.")
+            command = self.help_command
+        elif command.approved_rooms and not self.check_user_approved(user_email = user_email, approved_rooms = command.approved_rooms):
+            logger.info(f"{user_email} is not allowed to run command: '{command.command_keyword}'")
+            return
+
+        reply_one_to_one = False
+        message_without_command = self.get_message_passed_to_command(command.command_keyword, raw_message)
+        if command.delete_previous_message and hasattr(teams_message, "messageId"):
+            self.teams.messages.delete(teams_message.messageId)
+
+        if not is_card_callback_command and command.card is not None:
+            reply = Response()
+            reply.text = "This bot requires a client which can render cards."
+            reply.attachments = {
+                "contentType": "application/vnd.microsoft.card.adaptive",
+                "content": command.card
+            }
+            pre_reply, pre_reply_one_to_one = self.run_pre_card_load_reply(command = command, message = message_without_command,
+                teams_message = teams_message, activity = activity)
+        else:
+            pre_reply, pre_reply_one_to_one = self.run_pre_execute(command = command, message = message_without_command,
+                teams_message = teams_message, activity = activity)
+        self.do_reply(pre_reply, room_id, user_email, pre_reply_one_to_one, is_one_on_one_space)
+        if is_card_callback_command or command.card is None:
+            reply, reply_one_to_one = self.run_command_and_handle_bot_exceptions(command = command, message = message_without_command,
+                teams_message = teams_message, activity = activity)
+
+        return self.do_reply(reply, room_id, user_email, reply_one_to_one, is_one_on_one_space)
+    
     def _process_incoming_websocket_message(self, msg):
+        """
+        Dispatch websocket data to the worker pool. Events from the same space
+        are processed in the order of arrival.
+        :param msg: The raw websocket message
+        """
+        if traffic_recorder is not None and msg.get("data", {}).get("eventType") == "conversation.activity":
+            traffic_recorder.record("websocket", msg)
+        delivery_key = websocket_delivery_key(msg)
+        if not delivery_dedupe.first_seen(delivery_key):
+            return
+        try:
+            room_key = msg["data"]["activity"]["target"]["id"]
+        except (KeyError, TypeError):
+            room_key = ""
+        if job_queue is not None and job_queue.handles("websocket"):
+            job_queue.enqueue("websocket", msg, key = delivery_key, group = room_key or None)
+            return
+        if not self.dispatcher.submit(room_key, self._handle_websocket_delivery, msg, delivery_key):
+            delivery_dedupe.forget(delivery_key)
+        
+    def _handle_websocket_delivery(self, msg, delivery_key):
+        try:
+            org_id = msg["data"]["activity"]["actor"].get("orgId")
+        except (KeyError, TypeError, AttributeError):
+            org_id = None
+        tenant = tenant_registry.for_org(org_id)
+        if tenant is None:
+            logger.warning(f"activity from unknown org {org_id} ignored")
+            return
+        try:
+            with tenant_context(tenant):
+                self._handle_websocket_message(msg)
+        except Exception:
+            # a replayed activity is processed again
+            delivery_dedupe.forget(delivery_key)
+            raise
+        
+    def _handle_websocket_message(self, msg):
         """
         Handle websocket data.
         :param msg: The raw websocket message
@@ -762,16 +1716,7 @@ class WebexBotShare(WebexBotWsWh):
                 logger.debug(f"Share received")
                 share_object = activity["object"]
                 if share_object["objectType"] == "meetingContainer":
-                    my_activity = activity.copy()
-                    my_activity["verb"] = "post"
-                    message_base_64_id = self._get_base64_message_id(my_activity)
-                    webex_message = self.teams.messages.get(message_base_64_id)
-                    logging.debug(f"webex_message from message_base_64_id: {webex_message}")
-                    self._ack_message(message_base_64_id)
-                    
-                    user_email = webex_message.personEmail
-                    if self.check_user_approved(user_email=user_email, approved_rooms=[]):
-                        self.process_recording_share(webex_message, activity)
+                    self.handle_recording_share(activity)
                 else:
                     super()._process_incoming_websocket_message(msg)
             else:
@@ -779,13 +1724,57 @@ class WebexBotShare(WebexBotWsWh):
         else:
             super()._process_incoming_websocket_message(msg)
             
-    def process_recording_share(self, teams_message, activity):
+    def handle_recording_share(self, activity):
+        """
+        Reply to a meeting recording share.
+        
+        The approval is checked from the activity before any API call. The message lookup
+        (needed for the ack and for the reply space) runs in parallel with the meeting
+        and recording lookups.
+        """
+        started = time.monotonic()
+        my_activity = activity.copy()
+        my_activity["verb"] = "post"
+        if not self.check_user_approved(user_email = activity["actor"]["emailAddress"], approved_rooms = []):
+            self._ack_message(self._get_base64_message_id(my_activity))
+            return
+        room_future = share_executor.submit(self.share_room_id, my_activity)
+        try:
+            with deadline(webex_resilience.options.get("request_deadline")):
+                reply = self.recording_share_reply(activity)
+        except (DeadlineExceeded, CircuitOpenError, requests.RequestException) as e:
+            logger.error(f"Recording share degraded: {e}")
+            reply = Response()
+            reply.markdown = locale_strings["loc_degraded"]
+
+        self.teams.messages.create(roomId = room_future.result(), **reply.as_dict())
+        metrics.observe("share.latency", time.monotonic() - started)
+        
+    def share_room_id(self, post_activity):
+        """
+        Ack the share and get the space of its message.
+        """
+        message_base_64_id = self._get_base64_message_id(post_activity)
+        self._ack_message(message_base_64_id)
+        webex_message = self.teams.messages.get(message_base_64_id)
+        logger.debug(f"webex_message from message_base_64_id: {webex_message}")
+        return webex_message.roomId
+        
+    def recording_share_reply(self, activity):
         actor_email = activity["actor"]["emailAddress"]
         share_object = activity["object"]
         meeting_id = share_object["meetingInstanceId"]
-        meeting_details = get_meeting_details(meeting_id)
-        host_email = meeting_details["hostEmail"]
-        meeting_num = meeting_details.get("meetingNumber")
+        meeting_details = find_known_meeting(meeting_id)
+        recordings_future = None
+        if meeting_details is not None and meeting_details.host_email is not None:
+            # only meetings from the cache or the meeting store have a known host, their recordings
+            # are fetched while the reply is being prepared, the other meetings are fetched in sequence
+            recordings_future = submit_in_context(share_executor, recordings_flight.do, recordings_key(meeting_id, meeting_details.host_email),
+                get_meeting_recordings, meeting_id, meeting_details.host_email)
+        else:
+            meeting_details = get_meeting_details(meeting_id)
+        host_email = meeting_details.host_email
+        meeting_num = meeting_details.meeting_number
         logger.info(f"Recording shared for meeting id {meeting_id} hosted by {host_email}")
 
         if self.respond_only_to_host and actor_email.lower() != host_email.lower():
@@ -794,24 +1783,86 @@ class WebexBotShare(WebexBotWsWh):
             reply.markdown = locale_strings["loc_host_only"]
             audit_log(actor_email, host_email, meeting_num, 0, "denied", "only host can access recordings")
         else:
-            meeting_recordings = get_meeting_recordings(meeting_id, host_email)
+            if recordings_future is not None:
+                meeting_recordings = recordings_future.result()
+            else:
+                meeting_recordings = recordings_flight.do(recordings_key(meeting_id, host_email), get_meeting_recordings, meeting_id, host_email)
             reply = format_recording_response(meeting_details, meeting_recordings)
             audit_recordings = create_recording_audit(meeting_recordings)
             audit_log(actor_email, host_email, meeting_num, 0, "permitted", "shared recording links provided", recordings=audit_recordings)
+            send_audio_files(actor_email, meeting_recordings)
 
-        reply = reply.as_dict()
-        self.teams.messages.create(roomId = teams_message.roomId, **reply)
+        return reply
+        
+    def run(self):
+        # the acks are sent from the worker threads through the websocket event loop
+        self.websocket_loop = asyncio.get_event_loop()
+        if job_queue is not None:
+            job_queue.register("websocket", lambda msg: self._handle_websocket_delivery(msg, websocket_delivery_key(msg)))
+        super().run()
+        
+    def _ack_message(self, message_id):
+        """
+        Ack the message without waiting for the websocket send.
+        """
+        loop = getattr(self, "websocket_loop", None)
+        if loop is None or not loop.is_running() or self.websocket is None:
+            return super()._ack_message(message_id)
+        ack_message = {"type": "ack", "messageId": message_id}
+        future = asyncio.run_coroutine_threadsafe(self.websocket.send(json.dumps(ack_message)), loop)
+        def ack_done(done):
+            if not done.cancelled() and done.exception() is not None:
+                logger.error(f"WebSocket ack of {message_id} failed: {done.exception()}")
+        future.add_done_callback(ack_done)
         
     def reload_config(self):
         config = load_config(self.config_file)
         logger.info("CONFIG file reload: {}".format(config))
         
-        self.approved_users = config.get("approved_users", [])
-        self.approved_domains = config.get("approved_domains", [])
+        approved_users = config.get("approved_users", [])
+        approved_domains = config.get("approved_domains", [])
+        approval_file = config.get("approved_list_file")
+        if approval_file:
+            file_users, file_domains = load_approval_file(approval_file)
+            approved_users = approved_users + file_users
+            approved_domains = approved_domains + file_domains
+        self.approved_users = approved_users
+        self.approved_domains = approved_domains
+        self.approval_index = ApprovalIndex(approved_users, approved_domains, include_subdomains = config.get("approve_subdomains", False))
+        logger.info(f"approval index: {len(self.approval_index.users)} users, {self.approval_index.domain_count} domains")
         self.respond_only_to_host = config.get("respond_only_to_host", False)
         self.protect_pmr = config.get("protect_pmr", True)
+        if getattr(self, "dispatcher", None) is None:
+            # pool size can't be changed while running
+            dispatch_config = config.get("websocket_dispatch", {})
+            self.dispatcher = KeyedDispatcher(workers = dispatch_config.get("workers", 8),
+                max_pending = dispatch_config.get("max_pending", 1000), name = "websocket_dispatch")
         
         self.approval_parameters_check()
+        
+    def check_user_approved(self, user_email, approved_rooms):
+        """
+        Indexed version of WebexBot.check_user_approved().
+        
+        A user is approved if the lists of approved users, domains and rooms are empty
+        or if the user is found in the approval index or is a member of one of the approved rooms.
+        
+        Parameters:
+            user_email (str): e-mail of the user
+            approved_rooms (list): spaces the user needs to be in
+            
+        Returns:
+            bool: True if the user is approved
+        """
+        if len(self.approval_index) == 0 and len(approved_rooms) == 0:
+            return True
+        if self.approval_index.user_approved(user_email):
+            return True
+        if len(approved_rooms) > 0 and self.is_user_member_of_room(user_email, approved_rooms):
+            return True
+
+        logger.warning(f"{user_email} is not approved to interact at this time. Ignoring.")
+        return False
     
 
 """
@@ -827,7 +1878,21 @@ def webex_webhook():
     """
     webhook = request.get_json(silent=True)
     logger.debug("Webhook received: {}".format(webhook))
-    res = handle_webhook_event(webhook)
+    if traffic_recorder is not None and webhook is not None:
+        traffic_recorder.record("webhook", webhook)
+    delivery_key = webhook_delivery_key(webhook)
+    if not delivery_dedupe.first_seen(delivery_key):
+        return "OK"
+    if job_queue is not None:
+        # processed by the queue workers, survives a restart
+        job_queue.enqueue("webhook", webhook, key = delivery_key)
+        return "OK"
+    try:
+        res = handle_webhook_event(webhook)
+    except Exception:
+        # let the redelivery try again
+        delivery_dedupe.forget(delivery_key)
+        raise
     logger.debug(f"Webhook hadling result: {res}")
 
     logger.debug("Webhook handling done.")
@@ -855,14 +1920,18 @@ def webex_webhook_preparation():
     del_wh = request.args.get('delete')
     delete_only = del_wh is not None
     logger.debug(f"delete webhook: {del_wh}")
-    res = asyncio.run(manage_webhooks(request.url, delete = delete_only))
+    res, report = manage_webhooks(request.url, delete = delete_only)
     if res is True:
         if delete_only:
             message += "<center><b>Webhooks deleted sucessfully</center>"
         else:
-            message += "<center><b>New webhook created sucessfully</center>"
+            message += "<center><b>Webhooks are up to date</center>"
     else:
-        message += "<center><b>Tried to create a new webhook but failed, see application log for details.</center>"
+        message += "<center><b>Tried to update the webhooks but failed, see application log for details.</center>"
+    message += "<center><table>"
+    for item in report:
+        message += "<tr><td>{action}</td><td>{resource}</td><td>{event}</td><td>{id}</td><td>{status}</td></tr>".format(**item)
+    message += "</table></center>"
 
     return message
         
@@ -875,23 +1944,31 @@ def handle_webhook_event(webhook):
     Membership checks the Bot configuration and eventualy posts a message and removes the Bot from the Space.
     """
     action_list = []
+    
+    if webhook.get("resource") in MEETING_EVENT_RESOURCES:
+        return handle_meeting_event(webhook)
 
     # make sure Bot object is initialized
     bot = init_bot()
     activity = create_activity(bot.teams, webhook)    
     logger.debug(f"activity={activity}")
-    if activity['verb'] == 'post':
-        logger.debug(f"message received")        
-        message_id = webhook["data"]["id"]
-        webex_message = bot.teams.messages.get(message_id)
-        logger.debug(f"processing message {message_id}")
-        bot.process_incoming_message(teams_message=webex_message, activity=activity)
-    elif activity['verb'] == 'cardAction':
-        logger.debug(f"card action")
-        message_id = webhook["data"]["id"]
-        attachment_actions = bot.teams.attachment_actions.get(message_id)
-        logger.debug(f"processing attachement data: {attachment_actions}")
-        bot.process_incoming_card_action(attachment_actions=attachment_actions, activity=activity)
+    tenant = tenant_registry.for_org(activity["actor"].get("orgId"))
+    if tenant is None:
+        logger.warning(f"activity from unknown org {activity['actor'].get('orgId')} ignored")
+        return
+    with tenant_context(tenant):
+        if activity['verb'] == 'post':
+            logger.debug(f"message received")        
+            message_id = webhook["data"]["id"]
+            webex_message = bot.teams.messages.get(message_id)
+            logger.debug(f"processing message {message_id}")
+            bot.process_incoming_message(teams_message=webex_message, activity=activity)
+        elif activity['verb'] == 'cardAction':
+            logger.debug(f"card action")
+            message_id = webhook["data"]["id"]
+            attachment_actions = bot.teams.attachment_actions.get(message_id)
+            logger.debug(f"processing attachement data: {attachment_actions}")
+            bot.process_incoming_card_action(attachment_actions=attachment_actions, activity=activity)
 
 
         """"
@@ -923,6 +2000,50 @@ def handle_webhook_event(webhook):
                 logger.debug(f"activity verb is: {activity['verb']} ")
             """
 
+def handle_meeting_event(webhook):
+    """
+    handle "meetings" and "recordings" events
+    
+    Keep the recording cache fresh without polling. Ended meeting drops the cached
+    meeting lists of its series, created recording refreshes the recordings of the meeting
+    if the meeting is already known to the cache, otherwise just drops them.
+    """
+    resource = webhook.get("resource")
+    event = webhook.get("event")
+    data = webhook.get("data", {})
+    logger.debug(f"meeting event {resource}/{event}: {data}")
+    tenant = tenant_registry.for_org(webhook.get("orgId"))
+    if tenant is None:
+        return f"meeting event from unknown org {webhook.get('orgId')} ignored"
+    cache = tenant.recording_cache
+    if resource == "meetings" and event == "ended":
+        meeting_id = data.get("id")
+        cache.invalidate_series(meeting_num = data.get("meetingNumber"), series_id = data.get("meetingSeriesId"))
+        if meeting_id is not None:
+            cache.invalidate_recordings(meeting_id)
+        return f"meeting {meeting_id} ended, cache invalidated"
+    elif resource == "recordings" and event == "created":
+        meeting_id = data.get("meetingId")
+        if meeting_id is None:
+            return "recording event without meeting id"
+        meeting = cache.find_meeting(meeting_id)
+        cache.invalidate_recordings(meeting_id)
+        if meeting_store is not None:
+            meeting_store.forget_recordings(meeting_id)
+        if meeting is not None:
+            host_email = data.get("hostEmail") or meeting.host_email
+            _thread.start_new_thread(run_as, (tenant, refresh_meeting_recordings, meeting_id, host_email))
+            return f"recording created for meeting {meeting_id}, refreshing cache"
+        return f"recording created for meeting {meeting_id}, cache invalidated"
+        
+    return f"unhandled meeting event {resource}/{event}"
+    
+def refresh_meeting_recordings(meeting_id, host_email):
+    try:
+        prefetch_meeting_recordings(meeting_id, host_email)
+    except ApiError as e:
+        logger.error(f"Recording refresh for {meeting_id} failed: {e}")
+        
 def create_activity(webex_api, webhook):
     
     logger.debug(f"create activity from webhook: {webhook}")
@@ -952,13 +2073,29 @@ def create_activity(webex_api, webhook):
     logger.debug(f"activity created: {activity}")
     return activity
                 
-async def manage_webhooks(target_url, delete = False):
+BOT_WEBHOOK_RESOURCES = {
+    # "all": ["all"],
+    "messages": ["created"],
+    "memberships": ["created", "deleted", "updated"],
+    "rooms": ["updated"],
+    "attachmentActions": ["created"]
+}
+
+def manage_webhooks(target_url, delete = False):
     """
-    create a set of webhooks for the Bot
-    webhooks are defined according to the resource_events dict
+    reconcile the webhooks of the Bot with the desired set
+    webhooks are defined according to the BOT_WEBHOOK_RESOURCES and MEETING_EVENT_RESOURCES dicts
+    
+    Only the missing webhooks are created and only the stale ones (different target URL,
+    filter, inactive or duplicate) are deleted, so the Bot keeps receiving events
+    during the update.
     
     Args:
         target_url: full URL to be set for the webhook
+        delete: delete all webhooks of the Bot
+        
+    Returns:
+        tuple: (success, list of actions taken)
     """
     myUrlParts = urlparse(target_url)
     if os.getenv("SECURE_WEBHOOK_URL", None) is not None:
@@ -966,64 +2103,108 @@ async def manage_webhooks(target_url, delete = False):
     else:
         target_url = myUrlParts.scheme + "://" + myUrlParts.netloc + url_for("webex_webhook")
 
-    logger.debug("Create new webhook to URL: {}".format(target_url))
+    logger.debug("Reconcile webhooks for URL: {}".format(target_url))
     
-    resource_events = {
-        # "all": ["all"],
-        "messages": ["created"],
-        "memberships": ["created", "deleted", "updated"],
-        "rooms": ["updated"],
-        "attachmentActions": ["created"]
-    }
-    status = None
-        
+    desired = {} if delete else BOT_WEBHOOK_RESOURCES
     try:
-        check_webhook = webex_api.webhooks.list()
+        bot_webhooks = list(webex_api.webhooks.list(max = 100))
     except ApiError as e:
         logger.error("Webhook list failed: {}.".format(e))
-
-    local_loop = asyncio.get_event_loop()
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        wh_task_list = []
-        for webhook in check_webhook:
-            wh_task_list.append(local_loop.run_in_executor(executor, delete_webhook, webhook))
-            
-        await asyncio.gather(*wh_task_list)
-        
-        if not delete:
-            wh_task_list = []
-            for resource, events in resource_events.items():
-                for event in events:
-                    wh_task_list.append(local_loop.run_in_executor(executor, create_webhook, resource, event, target_url))
-                    
-            result = True
-            for status in await asyncio.gather(*wh_task_list):
-                if not status:
-                    result = False
-        else:
-            result = True
+        return False, [{"action": "list", "resource": "", "event": "", "id": "", "status": f"failed: {e}"}]
+    plans = [webhook_plan(bot_webhooks, desired, target_url, webex_api)]
+        
+    if meeting_events_enabled:
+        # meetings & recordings events are org-wide and require the Integration token of each tenant
+        for tenant in tenant_registry.all():
+            access_token = tenant.access_token()
+            if access_token is None:
+                logger.info(f"no Integration token of tenant {tenant.name}, org webhooks skipped")
+                continue
+            integration_api = tenant.api(access_token)
+            try:
+                # don't touch org webhooks of other applications
+                integration_webhooks = [webhook for webhook in integration_api.webhooks.list(max = 100) if webhook.targetUrl == target_url]
+                desired = {} if delete else MEETING_EVENT_RESOURCES
+                plans.append(webhook_plan(integration_webhooks, desired, target_url, integration_api, owned_by = "org"))
+            except ApiError as e:
+                logger.error(f"Integration webhook list of tenant {tenant.name} failed: {e}.")
+
+    return apply_webhook_plans(plans, target_url)
+    
+def apply_webhook_plans(plans, target_url):
+    """
+    Create and delete the webhooks of the plans (see webhook_plan()) in parallel.
+    
+    Returns:
+        tuple: (success, list of actions taken with their status)
+    """
+    pending = []
+    report = []
+    for to_create, to_delete, to_keep, api, owned_by in plans:
+        for resource, event in to_create:
+            item = {"action": "create", "resource": resource, "event": event, "id": ""}
+            pending.append((item, webhook_executor.submit(create_webhook, resource, event, target_url, api, owned_by)))
+            report.append(item)
+        for webhook in to_delete:
+            item = {"action": "delete", "resource": webhook.resource, "event": webhook.event, "id": webhook.id}
+            pending.append((item, webhook_executor.submit(delete_webhook, webhook, api)))
+            report.append(item)
+        for webhook in to_keep:
+            report.append({"action": "keep", "resource": webhook.resource, "event": webhook.event, "id": webhook.id, "status": "ok"})
+
+    result = True
+    for item, future in pending:
+        status = future.result()
+        item["status"] = "ok" if status else "failed"
+        result = result and status
+    logger.info(f"webhook reconciliation: {report}")
                 
-    return result
+    return result, report
+    
+def webhook_plan(registered, desired, target_url, api, owned_by = None):
+    """
+    Compare the registered webhooks with the desired (resource, event) pairs.
     
-def delete_webhook(webhook):
+    Returns:
+        tuple: ((resource, event) pairs to create, webhooks to delete, webhooks to keep, api, owned_by)
+    """
+    wanted = {(resource, event) for resource, events in desired.items() for event in events}
+    to_keep = {}
+    to_delete = []
+    for webhook in registered:
+        key = (webhook.resource, webhook.event)
+        webhook_status = getattr(webhook, "status", "active")
+        if key in wanted and key not in to_keep and webhook.targetUrl == target_url \
+            and not getattr(webhook, "filter", None) and webhook_status in (None, "active"):
+            to_keep[key] = webhook
+        else:
+            to_delete.append(webhook)
+    to_create = [key for key in sorted(wanted) if key not in to_keep]
+    return to_create, to_delete, list(to_keep.values()), api, owned_by
+    
+def delete_webhook(webhook, api = None):
     logger.debug(f"Deleting webhook {webhook.id}, '{webhook.id}', App Id: {webhook.appId}")
+    api = api or webex_api
     try:
         if not flask_app.testing:
             logger.debug(f"Start webhook {webhook.id} delete")
-            webex_api.webhooks.delete(webhook.id)
+            api.webhooks.delete(webhook.id)
             logger.debug(f"Webhook {webhook.id} deleted")
+        return True
     except ApiError as e:
         logger.error("Webhook {} delete failed: {}.".format(webhook.id, e))
+        return False
 
-def create_webhook(resource, event, target_url):
+def create_webhook(resource, event, target_url, api = None, owned_by = None):
     logger.debug(f"Creating for {resource,event}")
+    api = api or webex_api
+    request_parameters = {"ownedBy": owned_by} if owned_by is not None else {}
     status = False
     try:
         if not flask_app.testing:
-            result = webex_api.webhooks.create(name="Webhook for event \"{}\" on resource \"{}\"".format(event, resource), targetUrl=target_url, resource=resource, event=event)
+            result = api.webhooks.create(name="Webhook for event \"{}\" on resource \"{}\"".format(event, resource), targetUrl=target_url, resource=resource, event=event, **request_parameters)
+            logger.debug(f"Webhook for {resource}/{event} was successfully created with id: {result.id}")
         status = True
-        logger.debug(f"Webhook for {resource}/{event} was successfully created with id: {result.id}")
     except ApiError as e:
         logger.error("Webhook create failed: {}.".format(e))
         
@@ -1077,6 +2258,193 @@ def start_runner(config_file = None):
     logger.info("Started runner")
     start_loop()
     
+@flask_app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    queue, latency and cache statistics
+    """
+    result = metrics.snapshot()
+    result["recording_cache"] = recording_cache.stats()
+    result["single_flight"] = {flight.name: flight.stats() for flight in (meeting_list_flight, recordings_flight)}
+    result["circuits"] = webex_resilience.circuit_states()
+    if content_cache is not None:
+        result["content_cache"] = content_cache.stats()
+    if prefetcher is not None:
+        result["prefetcher"] = prefetcher.status()
+    if meeting_store is not None:
+        result["meeting_store"] = meeting_store.stats()
+    if job_queue is not None:
+        result["job_queue"] = job_queue.stats()
+    if tenant_registry.default.name in token_refreshers:
+        result["token_refresh"] = token_refreshers[tenant_registry.default.name].status()
+    tenants = {}
+    for tenant in tenant_registry.all():
+        if tenant is not tenant_registry.default:
+            tenants[tenant.name] = {"recording_cache": tenant.recording_cache.stats()}
+            if tenant.name in token_refreshers:
+                tenants[tenant.name]["token_refresh"] = token_refreshers[tenant.name].status()
+    if tenants:
+        result["tenants"] = tenants
+    return result
+
+EXPORT_JOB_TTL = 86400 # seconds the finished API exports are kept for download
+EXPORT_JOB_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+EXPORT_FILE_PATTERN = re.compile(r"^export_[0-9a-f]{32}\.(json|csv|jsonl)$")
+
+def bearer_authorized(api_key):
+    """
+    Check the "Authorization: Bearer <api_key>" header in constant time.
+    """
+    return hmac.compare_digest(request.headers.get("Authorization", "").encode("utf-8"), f"Bearer {api_key}".encode("utf-8"))
+
+def export_job_path(job_id, suffix):
+    """
+    Status and manifest files of the API exports are kept in the export directory,
+    so any worker process can report them.
+    """
+    return os.path.join(export_options.get("path") or tempfile.gettempdir(), f"export_{job_id}.{suffix}")
+
+def save_export_status(job_id, status):
+    path = export_job_path(job_id, "json")
+    with open(path + ".tmp", "w") as file:
+        json.dump(status, file)
+    os.replace(path + ".tmp", path)
+
+def purge_export_jobs():
+    """
+    Remove the status and manifest files of the API exports finished more than EXPORT_JOB_TTL ago.
+    Only the files named by export_job_path() are touched, the status of a running export is kept.
+    """
+    directory = export_options.get("path") or tempfile.gettempdir()
+    expired = time.time() - EXPORT_JOB_TTL
+    for name in os.listdir(directory):
+        match = EXPORT_FILE_PATTERN.match(name)
+        if match is None:
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) >= expired:
+                continue
+            if match.group(1) == "json":
+                with open(path) as file:
+                    if json.load(file).get("state") == "running":
+                        continue
+            os.remove(path)
+        except (OSError, ValueError, AttributeError):
+            pass
+
+def run_api_export(job_id, targets, from_time, to_time, manifest_format):
+    """
+    Run an export requested by POST /export and keep the manifest for GET /export/<job_id>.
+    """
+    try:
+        path, summary = export_to_file(create_bulk_export("api"), targets, from_time, to_time,
+            manifest_format = manifest_format, directory = export_options.get("path"))
+        os.replace(path, export_job_path(job_id, manifest_format))
+    except Exception as e:
+        logger.error(f"bulk export {job_id} failed: {e}")
+        save_export_status(job_id, {"state": "failed", "error": str(e)})
+        return
+    audit_log("api", None, None, (to_time - from_time).days, "export", f"{summary['recordings']} recordings of {summary['targets']} meetings or hosts exported")
+    save_export_status(job_id, {"state": "done", "format": manifest_format, "recordings": summary["recordings"],
+        "failed": len(summary["failed"])})
+
+@flask_app.route("/export", methods=["POST"])
+def bulk_export():
+    """
+    Start a bulk export of recording links. The export runs in the background,
+    the manifest is downloaded from the returned status URL once it is done.
+    
+    Authorization: Bearer <bulk_export.api_key>
+    JSON body: {"entries": [meeting numbers and/or host e-mails], "from": "YYYY-MM-DD", "to": "YYYY-MM-DD", "format": "csv" or "jsonl",
+        "tenant": tenant name (optional)}
+        
+    Returns:
+        202 {"job_id", "status_url"}
+    """
+    api_key = export_options.get("api_key")
+    if not export_options.get("enabled", False) or not api_key:
+        return "Not found", 404
+    if not bearer_authorized(api_key):
+        return "Unauthorized", 401
+    try:
+        data = request.get_json(force = True)
+        targets = parse_targets(data.get("entries", []))
+        to_time = parse_date(data["to"], end_of_day = True) if data.get("to") else datetime.utcnow().replace(tzinfo = timezone.utc)
+        from_time = parse_date(data["from"]) if data.get("from") else to_time - timedelta(days = MEETING_REC_RANGE)
+        manifest_format = data.get("format", "csv")
+        if manifest_format not in MANIFEST_FORMATS:
+            raise ExportRequestError(f"unknown format {manifest_format}")
+        tenant = tenant_registry.get(data.get("tenant"))
+        if tenant is None:
+            raise ExportRequestError(f"unknown tenant {data.get('tenant')}")
+        check_export_request(targets, from_time, to_time)
+    except (ExportRequestError, ValueError, KeyError, TypeError, AttributeError) as e:
+        return {"error": str(e)}, 400
+        
+    purge_export_jobs()
+    job_id = uuid.uuid4().hex
+    save_export_status(job_id, {"state": "running"})
+    if job_queue is not None:
+        job_queue.enqueue("api_export", {"job_id": job_id, "tenant": tenant.name, "targets": targets,
+            "from_time": from_time.isoformat(), "to_time": to_time.isoformat(), "format": manifest_format}, key = job_id)
+    else:
+        export_executor.submit(run_as, tenant, run_api_export, job_id, targets, from_time, to_time, manifest_format)
+    return {"job_id": job_id, "status_url": url_for("bulk_export_result", job_id = job_id)}, 202
+    
+@flask_app.route("/export/<job_id>", methods=["GET"])
+def bulk_export_result(job_id):
+    """
+    State of an API export, the manifest file once it is done.
+    
+    Authorization: Bearer <bulk_export.api_key>
+    
+    Returns:
+        202 {"state": "running"}, 500 {"state": "failed", "error"} or the manifest file
+    """
+    api_key = export_options.get("api_key")
+    if not export_options.get("enabled", False) or not api_key:
+        return "Not found", 404
+    if not bearer_authorized(api_key):
+        return "Unauthorized", 401
+    if not EXPORT_JOB_PATTERN.match(job_id):
+        return "Not found", 404
+    try:
+        with open(export_job_path(job_id, "json")) as file:
+            status = json.load(file)
+    except (OSError, ValueError):
+        return "Not found", 404
+    if status["state"] == "running":
+        return status, 202
+    if status["state"] == "failed":
+        return status, 500
+    manifest_format = status["format"]
+    response = send_file(export_job_path(job_id, manifest_format), mimetype = MANIFEST_FORMATS[manifest_format], as_attachment = True,
+        download_name = f"recordings.{manifest_format}")
+    response.headers["X-Export-Recordings"] = str(status["recordings"])
+    response.headers["X-Export-Failed"] = str(status["failed"])
+    return response
+
+@flask_app.route("/usage", methods=["GET"])
+def usage_report():
+    """
+    Usage rollups of the audit log.
+    
+    Authorization: Bearer <audit_rollup.api_key>
+    Query: days (default 30), top (number of hosts and requesters, default audit_rollup.top)
+    """
+    api_key = usage_options.get("api_key")
+    if not api_key:
+        return "Not found", 404
+    if not bearer_authorized(api_key):
+        return "Unauthorized", 401
+    try:
+        days = int(request.args.get("days", 30))
+        top = int(request.args.get("top", usage_options.get("top", 10)))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return usage_rollup.report(days = max(1, min(days, usage_rollup.days)), top = top)
+
 @flask_app.route("/startup", methods=["GET"])
 def startup():
     flask_app.logger.info(f"in startup")
@@ -1085,7 +2453,7 @@ def startup():
     
 @flask_app.before_first_request
 def init_app(log_level = logging.DEBUG, config_file = CFG_FILE_PATH):
-    global audit_logger, logger
+    global audit_logger, logger, meeting_events_enabled
     
     dir_path = os.path.dirname(os.path.realpath(__file__))
 
@@ -1153,6 +2521,33 @@ def init_app(log_level = logging.DEBUG, config_file = CFG_FILE_PATH):
     oauth.webex_scope = oauth.WBX_MEETINGS_RECORDING_READ_SCOPE
     oauth.webex_token_storage_path = config["token_storage_path"]
     oauth.webex_token_key = "recording_bot"
+    oauth.webex_token_store = create_token_store(config.get("token_store", {}), default_path = config["token_storage_path"])
+    oauth.access_token_objects.clear()
+    tenant_registry.configure(config.get("tenants", {}), default_token_key = oauth.webex_token_key,
+        cache_config = recording_cache_options(config))
+    oauth.tenant_credentials = tenant_registry.credentials
+    webex_resilience.call_budget = lambda: current_tenant().limiter
+    start_token_refresher(config)
+    
+    recording_cache.configure(recording_cache_options(config))
+    webex_resilience.configure(config.get("resilience", {}))
+    export_options.clear()
+    export_options.update(config.get("bulk_export", {}))
+    batch_options.clear()
+    batch_options.update(config.get("rec_batch", {}))
+    progressive_options.clear()
+    progressive_options.update(config.get("progressive_reply", {}))
+    usage_options.clear()
+    usage_options.update(config.get("audit_rollup", {}))
+    usage_rollup.configure(usage_options)
+    delivery_dedupe.configure(config.get("delivery_dedupe", {}))
+    meeting_events_enabled = config.get("meeting_events", False)
+    start_meeting_store(config)
+    start_prefetcher(config)
+    start_uploader(config)
+    start_scheduler(config)
+    start_traffic_capture(config)
+    start_job_queue(config)
     
 def init_bot(config_file = CFG_FILE_PATH, mode = BotMode.WEBHOOK):
     
@@ -1163,6 +2558,8 @@ def init_bot(config_file = CFG_FILE_PATH, mode = BotMode.WEBHOOK):
 
         # Add new commands for the bot to listen out for.
         bot.add_command(RecordingCommand(bot))
+        bot.add_command(ExportCommand(bot))
+        bot.add_command(UsageCommand(bot))
         
         return bot
     except Exception as e:
@@ -1194,6 +2591,7 @@ if __name__ == "__main__":
     logger.info(f"log level: {log_level}, debug: {logging.DEBUG} CONFIG: {config}")
     
     init_app(log_level = log_level, config_file = args.config)
+    drain_on_sigterm(config.get("job_queue", {}).get("drain_timeout", 8))
     
     app_mode = BotMode.WEBSOCKET
     if args.mode.lower() == "webhook":
@@ -0,0 +1,210 @@
+"""
+In-memory cache of meeting series listings and meeting recordings.
+
+- meeting lists are cached per (meeting number, host email) together with the time window
+  they cover, so a request for a shorter or equal "days back" range is served from the cache
+- recordings are cached per meeting instance id until shortly before their temporary
+  download links expire, empty results (recording not yet processed) are cached only briefly
+- PMR check results are cached per host
+
+The cache is filled by the request path, by the background prefetcher (see prefetcher.py)
+and refreshed by the meetings/recordings events.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+MEETING_LIST_TTL = 60 # seconds, without the meeting events a meeting which just ended is found after this time
+EVENTS_MEETING_LIST_TTL = 900 # seconds, the meeting events invalidate the lists
+EMPTY_RECORDINGS_TTL = 120 # seconds
+LINK_EXPIRY_MARGIN = 900 # seconds, stop serving links which expire sooner
+RECORDINGS_TTL = 3600 # seconds, for recordings without expiration info
+PMR_TTL = 3600 # seconds
+MAX_SERIES = 2000
+MAX_MEETINGS = 20000
+
+def series_key(meeting_num, host_email):
+    return (str(meeting_num).replace(" ", ""), (host_email or "").strip().casefold())
+
+class _SeriesEntry(object):
+    __slots__ = ("fetched_at", "window_from", "meetings", "message")
+
+    def __init__(self, fetched_at, window_from, meetings, message):
+        self.fetched_at = fetched_at
+        self.window_from = window_from
+        self.meetings = meetings
+        self.message = message
+
+class _RecordingsEntry(object):
+    __slots__ = ("valid_until", "recordings")
+
+    def __init__(self, valid_until, recordings):
+        self.valid_until = valid_until
+        self.recordings = recordings
+
+class RecordingCache(object):
+    """
+    Thread-safe LRU cache of meeting lists and recordings.
+    """
+    def __init__(self, meeting_list_ttl = MEETING_LIST_TTL,
+            empty_recordings_ttl = EMPTY_RECORDINGS_TTL,
+            link_expiry_margin = LINK_EXPIRY_MARGIN,
+            max_series = MAX_SERIES,
+            max_meetings = MAX_MEETINGS):
+        self.meeting_list_ttl = meeting_list_ttl
+        self.empty_recordings_ttl = empty_recordings_ttl
+        self.link_expiry_margin = link_expiry_margin
+        self.max_series = max_series
+        self.max_meetings = max_meetings
+
+        self._lock = threading.Lock()
+        self._series = OrderedDict()
+        self._recordings = OrderedDict()
+        self._pmr = {}
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, options):
+        """
+        Update cache parameters from the "recording_cache" config section.
+        """
+        self.meeting_list_ttl = options.get("meeting_list_ttl", self.meeting_list_ttl)
+        self.empty_recordings_ttl = options.get("empty_recordings_ttl", self.empty_recordings_ttl)
+        self.link_expiry_margin = options.get("link_expiry_margin", self.link_expiry_margin)
+        self.max_series = options.get("max_series", self.max_series)
+        self.max_meetings = options.get("max_meetings", self.max_meetings)
+
+    def get_meeting_list(self, meeting_num, host_email, days_back):
+        """
+        Get cached list of ended meeting instances.
+
+        Returns:
+            tuple: (list of Meeting, message) or (None, None) if not cached
+        """
+        now = time.time()
+        key = series_key(meeting_num, host_email)
+        with self._lock:
+            entry = self._series.get(key)
+            if entry is None or now - entry.fetched_at > self.meeting_list_ttl or entry.window_from > now - days_back * 86400:
+                self.misses += 1
+                return None, None
+            self._series.move_to_end(key)
+            self.hits += 1
+
+        from_epoch = now - days_back * 86400
+        meetings = [meeting for meeting in entry.meetings if meeting.start_epoch >= from_epoch]
+        return meetings, f"{len(meetings)} meetings found"
+
+    def put_meeting_list(self, meeting_num, host_email, days_back, meetings, message = None, fetched_at = None):
+        if meetings is None:
+            return
+        fetched_at = fetched_at or time.time()
+        key = series_key(meeting_num, host_email)
+        with self._lock:
+            self._series[key] = _SeriesEntry(fetched_at, fetched_at - days_back * 86400, list(meetings), message)
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last = False)
+
+    def get_recordings(self, meeting_id):
+        """
+        Get cached recordings of a meeting instance.
+
+        Returns:
+            list: list of Recording or None if not cached
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._recordings.get(meeting_id)
+            if entry is None or entry.valid_until < now:
+                self.misses += 1
+                return None
+            self._recordings.move_to_end(meeting_id)
+            self.hits += 1
+            return list(entry.recordings)
+
+    def put_recordings(self, meeting_id, recordings):
+        now = time.time()
+        if len(recordings) == 0:
+            valid_until = now + self.empty_recordings_ttl
+        else:
+            expirations = [rec.expiration_epoch for rec in recordings if rec.expiration_epoch is not None]
+            if len(expirations) > 0:
+                valid_until = min(expirations) - self.link_expiry_margin
+            else:
+                valid_until = now + RECORDINGS_TTL
+        with self._lock:
+            self._recordings[meeting_id] = _RecordingsEntry(valid_until, list(recordings))
+            self._recordings.move_to_end(meeting_id)
+            while len(self._recordings) > self.max_meetings:
+                self._recordings.popitem(last = False)
+
+    def recordings_valid_for(self, meeting_id):
+        """
+        Seconds for which the cached recordings remain valid, 0 if not cached.
+        """
+        with self._lock:
+            entry = self._recordings.get(meeting_id)
+            if entry is None:
+                return 0
+            return max(0, entry.valid_until - time.time())
+
+    def get_pmr(self, meeting_num, host_email):
+        key = series_key(meeting_num, host_email)
+        with self._lock:
+            entry = self._pmr.get(key)
+            if entry is not None and entry[0] > time.time():
+                return entry[1]
+
+    def put_pmr(self, meeting_num, host_email, is_pmr):
+        if is_pmr is None:
+            return
+        key = series_key(meeting_num, host_email)
+        with self._lock:
+            if len(self._pmr) >= self.max_series:
+                self._pmr.clear()
+            self._pmr[key] = (time.time() + PMR_TTL, is_pmr)
+
+    def invalidate_series(self, meeting_num = None, series_id = None):
+        """
+        Drop cached meeting lists for a meeting number and/or a meeting series id.
+        """
+        meeting_num = str(meeting_num).replace(" ", "") if meeting_num is not None else None
+        with self._lock:
+            stale = [key for key, entry in self._series.items()
+                if (meeting_num is not None and key[0] == meeting_num)
+                or (series_id is not None and any(meeting.meeting_series_id == series_id for meeting in entry.meetings))]
+            for key in stale:
+                del self._series[key]
+        logger.debug(f"invalidated {len(stale)} meeting lists for {meeting_num}/{series_id}")
+        return len(stale)
+
+    def find_meeting(self, meeting_id):
+        """
+        Find a meeting instance in the cached meeting lists.
+
+        Returns:
+            Meeting: meeting instance or None
+        """
+        with self._lock:
+            for entry in self._series.values():
+                for meeting in entry.meetings:
+                    if meeting.id == meeting_id:
+                        return meeting
+
+    def invalidate_recordings(self, meeting_id):
+        with self._lock:
+            return self._recordings.pop(meeting_id, None) is not None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "series": len(self._series),
+                "meetings": len(self._recordings),
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,302 @@
+"""
+Streaming download of recordings from the temporary download URLs.
+
+Recordings are never held in memory as a whole:
+- stream_recording() yields the content in chunks and transparently resumes the transfer
+  (using HTTP Range) if the connection drops
+- download_recording() stores the recording in a file. Large files are fetched in parallel
+  HTTP Range segments which are written directly to their offsets in a preallocated file.
+  Segment progress is saved in a state file, so an interrupted download resumes where it stopped.
+  The result is checked for size and optionally hashed.
+
+run: python recording_download.py <url> <file> for a command-line download with progress
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import concurrent.futures
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024 # bytes read from the network at once
+SEGMENT_SIZE = 16 * 1024 * 1024 # bytes per parallel segment
+PARALLEL_SEGMENTS = 4 # concurrent segment downloads
+PARALLEL_THRESHOLD = 32 * 1024 * 1024 # use segments only for files larger than this
+RETRIES = 5 # attempts per segment / stream
+RETRY_DELAY = 1 # seconds, doubled after each failed attempt
+TIMEOUT = (10, 60) # connect, read timeout in seconds
+STATE_SAVE_INTERVAL = 8 * 1024 * 1024 # bytes between state file updates
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".part.json"
+
+class DownloadError(Exception):
+    pass
+
+class DownloadResult(object):
+    __slots__ = ("path", "size", "sha256", "elapsed", "resumed")
+
+    def __init__(self, path, size, sha256 = None, elapsed = 0.0, resumed = False):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.elapsed = elapsed
+        self.resumed = resumed
+
+    def __repr__(self):
+        return f"DownloadResult(path={self.path!r}, size={self.size}, sha256={self.sha256!r}, elapsed={self.elapsed:.1f}s, resumed={self.resumed})"
+
+def create_session(pool_size = PARALLEL_SEGMENTS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections = 1, pool_maxsize = pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def probe(url, session = None):
+    """
+    Get the size of the content and check if the server supports HTTP Range requests.
+
+    Returns:
+        tuple: (size or None, accepts ranges (bool), validator (ETag or Last-Modified))
+    """
+    session = session or create_session(1)
+    with session.get(url, headers = {"Range": "bytes=0-0"}, stream = True, timeout = TIMEOUT) as response:
+        response.raise_for_status()
+        validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        if response.status_code == 206:
+            content_range = response.headers.get("Content-Range", "")
+            total = content_range.rpartition("/")[2]
+            return (int(total) if total.isdigit() else None), True, validator
+        length = response.headers.get("Content-Length")
+        return (int(length) if length is not None and length.isdigit() else None), False, validator
+
+class _Progress(object):
+    def __init__(self, total, callback, done = 0):
+        self.total = total
+        self.callback = callback
+        self.done = done
+        self._lock = threading.Lock()
+
+    def add(self, count):
+        with self._lock:
+            self.done += count
+            done = self.done
+        if self.callback is not None:
+            self.callback(done, self.total)
+
+def stream_recording(url, chunk_size = CHUNK_SIZE, session = None, retries = RETRIES, progress = None):
+    """
+    Stream the content of the URL in chunks, resume with HTTP Range after a failure.
+
+    Parameters:
+        url (str): download URL
+        chunk_size (int): maximum chunk size
+        progress (callable): progress(bytes_done, total_bytes)
+
+    Returns:
+        generator: chunks of bytes
+    """
+    session = session or create_session(1)
+    received = 0
+    total = None
+    attempt = 0
+    while True:
+        headers = {"Range": f"bytes={received}-"} if received > 0 else {}
+        try:
+            with session.get(url, headers = headers, stream = True, timeout = TIMEOUT) as response:
+                response.raise_for_status()
+                if received > 0 and response.status_code != 206:
+                    raise DownloadError(f"server does not support resume, {received} bytes already sent")
+                if total is None:
+                    length = response.headers.get("Content-Length")
+                    total = int(length) if length is not None and length.isdigit() else None
+                for chunk in response.iter_content(chunk_size = chunk_size):
+                    received += len(chunk)
+                    if progress is not None:
+                        progress(received, total)
+                    yield chunk
+            if total is not None and received < total:
+                raise requests.ConnectionError(f"connection closed after {received} of {total} bytes")
+            return
+        except requests.RequestException as e:
+            attempt += 1
+            if attempt >= retries:
+                raise DownloadError(f"download of {url} failed after {attempt} attempts: {e}") from e
+            logger.info(f"stream interrupted at {received} bytes ({e}), retry {attempt}")
+            time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+
+def _load_state(state_file, size, validator):
+    try:
+        with open(state_file) as file:
+            state = json.load(file)
+        if state.get("size") == size and state.get("validator") == validator:
+            return state
+        logger.info(f"download state {state_file} does not match the content, starting over")
+    except (OSError, ValueError):
+        pass
+
+def _save_state(state_file, state):
+    temp_file = state_file + ".tmp"
+    with open(temp_file, "w") as file:
+        json.dump(state, file)
+    os.replace(temp_file, state_file)
+
+def _fetch_segment(session, url, fd, segment, progress, state_lock, save_state, chunk_size, retries):
+    """
+    Download a single segment [start, end] into the file, resume from segment["done"].
+    """
+    attempt = 0
+    unsaved = 0
+    while segment["done"] < segment["end"] - segment["start"] + 1:
+        offset = segment["start"] + segment["done"]
+        try:
+            with session.get(url, headers = {"Range": f"bytes={offset}-{segment['end']}"}, stream = True, timeout = TIMEOUT) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise DownloadError(f"range request returned {response.status_code}")
+                for chunk in response.iter_content(chunk_size = chunk_size):
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+                    with state_lock:
+                        segment["done"] += len(chunk)
+                    progress.add(len(chunk))
+                    unsaved += len(chunk)
+                    if unsaved >= STATE_SAVE_INTERVAL:
+                        save_state()
+                        unsaved = 0
+            if segment["done"] < segment["end"] - segment["start"] + 1:
+                # a short or empty response counts as a failed attempt
+                raise requests.ConnectionError(f"response ended at {segment['done']} bytes of the segment")
+        except requests.RequestException as e:
+            attempt += 1
+            if attempt >= retries:
+                raise DownloadError(f"segment {segment['start']}-{segment['end']} failed after {attempt} attempts: {e}") from e
+            logger.info(f"segment {segment['start']}-{segment['end']} interrupted at {segment['done']} bytes ({e}), retry {attempt}")
+            time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+
+def file_sha256(path, chunk_size = CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def download_recording(url, destination, progress = None,
+        segments = PARALLEL_SEGMENTS,
+        segment_size = SEGMENT_SIZE,
+        parallel_threshold = PARALLEL_THRESHOLD,
+        chunk_size = CHUNK_SIZE,
+        retries = RETRIES,
+        checksum = True,
+        expected_sha256 = None):
+    """
+    Download the URL to a file with bounded memory, in parallel segments if possible.
+
+    Parameters:
+        url (str): download URL
+        destination (str): target file, written atomically after the download is complete
+        progress (callable): progress(bytes_done, total_bytes)
+        segments (int): number of parallel segment downloads
+        checksum (bool): compute SHA-256 of the result
+        expected_sha256 (str): fail if the SHA-256 of the result doesn't match
+
+    Returns:
+        DownloadResult: downloaded file information
+    """
+    start_time = time.monotonic()
+    part_file = destination + PART_SUFFIX
+    state_file = destination + STATE_SUFFIX
+    session = create_session(segments)
+    try:
+        size, accepts_ranges, validator = probe(url, session)
+        logger.debug(f"download {url}: size {size}, ranges: {accepts_ranges}")
+
+        if size is None or not accepts_ranges or size < parallel_threshold:
+            return _download_sequential(url, destination, session, progress, chunk_size, retries, checksum, expected_sha256, start_time)
+
+        state = _load_state(state_file, size, validator) if os.path.exists(part_file) else None
+        resumed = state is not None
+        if state is None:
+            state = {
+                "size": size,
+                "validator": validator,
+                "segments": [{"start": start, "end": min(start + segment_size, size) - 1, "done": 0} for start in range(0, size, segment_size)]
+            }
+            with open(part_file, "wb") as file:
+                file.truncate(size)
+            _save_state(state_file, state)
+
+        state_lock = threading.Lock()
+        def save_state():
+            with state_lock:
+                _save_state(state_file, state)
+
+        tracker = _Progress(size, progress, done = sum(segment["done"] for segment in state["segments"]))
+        fd = os.open(part_file, os.O_WRONLY)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers = segments, thread_name_prefix = "download") as executor:
+                futures = [executor.submit(_fetch_segment, session, url, fd, segment, tracker, state_lock, save_state, chunk_size, retries)
+                    for segment in state["segments"] if segment["done"] < segment["end"] - segment["start"] + 1]
+                try:
+                    for future in concurrent.futures.as_completed(futures):
+                        future.result()
+                finally:
+                    save_state()
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        if os.path.getsize(part_file) != size or tracker.done != size:
+            raise DownloadError(f"size mismatch, expected {size}, got {tracker.done}")
+        digest = _verify(part_file, checksum, expected_sha256)
+        os.replace(part_file, destination)
+        os.remove(state_file)
+
+        result = DownloadResult(destination, size, digest, time.monotonic() - start_time, resumed)
+        logger.info(f"downloaded {result}")
+        return result
+    finally:
+        session.close()
+
+def _verify(path, checksum, expected_sha256):
+    if not checksum and expected_sha256 is None:
+        return None
+    digest = file_sha256(path)
+    if expected_sha256 is not None and digest != expected_sha256.lower():
+        os.remove(path)
+        raise DownloadError(f"checksum mismatch, expected {expected_sha256}, got {digest}")
+    return digest
+
+def _download_sequential(url, destination, session, progress, chunk_size, retries, checksum, expected_sha256, start_time):
+    part_file = destination + PART_SUFFIX
+    size = 0
+    with open(part_file, "wb") as file:
+        for chunk in stream_recording(url, chunk_size = chunk_size, session = session, retries = retries, progress = progress):
+            file.write(chunk)
+            size += len(chunk)
+        file.flush()
+        os.fsync(file.fileno())
+    digest = _verify(part_file, checksum, expected_sha256)
+    os.replace(part_file, destination)
+
+    result = DownloadResult(destination, size, digest, time.monotonic() - start_time)
+    logger.info(f"downloaded {result}")
+    return result
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level = logging.INFO)
+    def print_progress(done, total):
+        if total:
+            print(f"\r{done * 100 // total:3d}% {done}/{total}", end = "", flush = True)
+
+    result = download_recording(sys.argv[1], sys.argv[2], progress = print_progress)
+    print()
+    print(result)
@@ -0,0 +1,198 @@
+"""
+Streaming upload of recording files to Webex messages.
+
+webexteamssdk reads the whole file into memory before posting it. Here the file
+is posted using requests_toolbelt.MultipartEncoder which reads the body in small pieces,
+so the downloaded chunks flow directly from the recording URL to the Webex message
+and the memory use doesn't depend on the file size.
+
+Uploads are run by RecordingUploader in a bounded thread pool and share a bandwidth limit.
+"""
+
+import logging
+import concurrent.futures
+import requests
+from requests_toolbelt import MultipartEncoder
+
+try:
+    from .rate_limit import TokenBucket
+except:
+    from rate_limit import TokenBucket
+try:
+    from .recording_download import stream_recording, probe, CHUNK_SIZE
+except:
+    from recording_download import stream_recording, probe, CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+WEBEX_MESSAGES_URL = "https://webexapis.com/v1/messages"
+MAX_FILE_SIZE = 100 * 1024 * 1024 # Webex message file size limit
+MAX_CONCURRENT_UPLOADS = 2
+UPLOAD_TIMEOUT = (10, 300) # connect, read timeout in seconds
+
+class UploadError(Exception):
+    pass
+
+class ChunkReader(object):
+    """
+    File-like object reading from an iterator of byte chunks.
+
+    MultipartEncoder needs to know the remaining length of the body, so the "len"
+    attribute is decreased as the data is read.
+
+    Attributes:
+        len (int): bytes remaining to be read
+    """
+    def __init__(self, chunks, length, limiter = None):
+        self._chunks = iter(chunks)
+        self._chunk = b""
+        self._pos = 0
+        self._limiter = limiter
+        self.len = length
+
+    def read(self, size = -1):
+        if self.len <= 0:
+            return b""
+        if size is None or size < 0:
+            size = self.len
+        size = min(size, self.len)
+        parts = []
+        missing = size
+        while missing > 0:
+            if self._pos >= len(self._chunk):
+                try:
+                    self._chunk = next(self._chunks)
+                    self._pos = 0
+                except StopIteration:
+                    raise UploadError(f"source ended {self.len - (size - missing)} bytes early")
+                continue
+            # slice the current chunk without copying the rest of it
+            part = self._chunk[self._pos:self._pos + missing]
+            self._pos += len(part)
+            missing -= len(part)
+            parts.append(part)
+        data = parts[0] if len(parts) == 1 else b"".join(parts)
+        self.len -= len(data)
+        if self._limiter is not None:
+            self._limiter.consume(len(data))
+        return data
+
+class ThrottledFile(object):
+    """
+    Bandwidth-limited read access to a local file or mmap.
+    """
+    def __init__(self, file, length, limiter = None):
+        self._file = file
+        self._limiter = limiter
+        self.len = length
+
+    def read(self, size = -1):
+        if size is None or size < 0 or size > self.len:
+            size = self.len
+        data = self._file.read(size)
+        self.len -= len(data)
+        if self._limiter is not None and len(data) > 0:
+            self._limiter.consume(len(data))
+        return data
+
+def post_file_message(access_token, body, length, file_name, content_type, markdown = None,
+        room_id = None, to_person_email = None, messages_url = WEBEX_MESSAGES_URL, limiter = None, session = None):
+    """
+    Post a Webex message with a file attachment, streaming the body.
+
+    Parameters:
+        access_token (str): Bot access token
+        body: iterable of byte chunks or a file-like object
+        length (int): size of the file in bytes
+        file_name (str): attachment file name
+        content_type (str): attachment MIME type
+
+    Returns:
+        dict: created message
+    """
+    if length > MAX_FILE_SIZE:
+        raise UploadError(f"file {file_name} too large: {length} bytes")
+    if hasattr(body, "read"):
+        reader = ThrottledFile(body, length, limiter)
+    else:
+        reader = ChunkReader(body, length, limiter)
+
+    fields = {}
+    if room_id is not None:
+        fields["roomId"] = room_id
+    if to_person_email is not None:
+        fields["toPersonEmail"] = to_person_email
+    if markdown is not None:
+        fields["markdown"] = markdown
+    fields["files"] = (file_name, reader, content_type)
+    encoder = MultipartEncoder(fields = fields)
+
+    session = session or requests
+    response = session.post(messages_url, data = encoder,
+        headers = {"Authorization": f"Bearer {access_token}", "Content-Type": encoder.content_type},
+        timeout = UPLOAD_TIMEOUT)
+    if response.status_code >= 400:
+        raise UploadError(f"message post failed: {response.status_code} {response.text}")
+    return response.json()
+
+class RecordingUploader(object):
+    """
+    Send recordings as Webex message attachments in a bounded pool of upload threads.
+
+    Attributes:
+        access_token (str): Bot access token
+        max_concurrent (int): maximum number of parallel uploads
+        bandwidth_limit (int): total upload bandwidth in bytes per second, 0 means unlimited
+    """
+    def __init__(self, access_token, max_concurrent = MAX_CONCURRENT_UPLOADS, bandwidth_limit = 0,
+            max_file_size = MAX_FILE_SIZE, messages_url = WEBEX_MESSAGES_URL):
+        self.access_token = access_token
+        self.max_file_size = max_file_size
+        self.messages_url = messages_url
+        self.limiter = TokenBucket(bandwidth_limit, capacity = max(bandwidth_limit, CHUNK_SIZE)) if bandwidth_limit else None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = max_concurrent, thread_name_prefix = "upload")
+        self._session = requests.Session()
+
+    def send_recording(self, url, file_name, content_type = "audio/mpeg", to_person_email = None, room_id = None, markdown = None, source = None):
+        """
+        Schedule an upload of the recording to a 1-1 or group space.
+
+        Parameters:
+            url (str): temporary download URL of the recording
+            source (callable): optional source(url) -> (file-like or chunk iterator, length),
+                the default streams the URL directly into the upload
+
+        Returns:
+            concurrent.futures.Future: resolves to the created message
+        """
+        return self.executor.submit(self._send, url, file_name, content_type, to_person_email, room_id, markdown, source)
+
+    def _send(self, url, file_name, content_type, to_person_email, room_id, markdown, source):
+        try:
+            if source is not None:
+                body, length = source(url)
+            else:
+                length, _, _ = probe(url)
+                if length is None:
+                    raise UploadError(f"unknown size of {file_name}")
+                body = stream_recording(url)
+            if length is None:
+                raise UploadError(f"unknown size of {file_name}")
+            if length > self.max_file_size:
+                raise UploadError(f"file {file_name} too large: {length} bytes")
+            logger.info(f"uploading {file_name} ({length} bytes) to {to_person_email or room_id}")
+            try:
+                result = post_file_message(self.access_token, body, length, file_name, content_type, markdown = markdown,
+                    room_id = room_id, to_person_email = to_person_email, messages_url = self.messages_url,
+                    limiter = self.limiter, session = self._session)
+            finally:
+                if hasattr(body, "close"):
+                    body.close()
+            logger.info(f"uploaded {file_name} to {to_person_email or room_id}")
+            return result
+        except Exception as e:
+            logger.error(f"upload of {file_name} failed: {e}")
+            raise
+
+    def shutdown(self, wait = True):
+        self.executor.shutdown(wait = wait)
@@ -0,0 +1,79 @@
+"""
+Coalescing of identical concurrent calls.
+
+When a team meeting ends, many participants ask for the same recording within seconds.
+SingleFlight runs the computation for a key only once at a time, all concurrent callers
+with the same key wait for it and receive the same result (or exception).
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class _Call(object):
+    __slots__ = ("done", "result", "exception", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+        self.waiters = 0
+
+class SingleFlight(object):
+    """
+    Share one in-flight computation among concurrent callers with the same key.
+    """
+    def __init__(self, name = "single-flight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Run function(*args, **kwargs) unless the same key is already in flight.
+
+        Returns:
+            result of the function, shared by all concurrent callers with the same key
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            logger.debug(f"{self.name}: waiting for in-flight {key}")
+            call.done.wait()
+        else:
+            try:
+                call.result = function(*args, **kwargs)
+            except BaseException as e:
+                call.exception = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+                if call.waiters > 0:
+                    logger.debug(f"{self.name}: {key} shared with {call.waiters} callers")
+
+        if call.exception is not None:
+            raise call.exception
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "in_flight": in_flight,
+            "executed": self.executed,
+            "shared": self.shared
+        }
@@ -0,0 +1,191 @@
+"""
+Tenant registry for serving several Webex organizations from one process.
+
+Each tenant (customer org) has its own Integration token storage key and credentials,
+its own pooled API client, recording cache and API call budget. The tenant
+of a request is selected by the orgId of the incoming activity and kept
+in a thread-local context, worker pools get it passed explicitly (run_as).
+
+Requests from orgs which are not in the registry use the default tenant
+(the single-org configuration) unless "unknown_org" is set to "reject".
+"""
+
+import os
+import base64
+import logging
+import binascii
+import threading
+from contextlib import contextmanager
+
+from webexteamssdk import WebexTeamsAPI
+
+try:
+    from .rate_limit import TokenBucket
+except:
+    from rate_limit import TokenBucket
+try:
+    from .recording_cache import RecordingCache
+except:
+    from recording_cache import RecordingCache
+try:
+    from . import oauth_grant_flow as oauth
+except:
+    import oauth_grant_flow as oauth
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+
+def org_uuid(org_id):
+    """
+    Webex API org id ("ciscospark://us/ORGANIZATION/<uuid>" in base64) or websocket orgId (uuid) -> uuid
+    """
+    if not org_id:
+        return None
+    try:
+        decoded = base64.b64decode(org_id + "=" * (-len(org_id) % 4)).decode("ascii")
+        if decoded.startswith("ciscospark://"):
+            return decoded.split("/")[-1].lower()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        pass
+    return org_id.lower()
+
+class Tenant(object):
+    """
+    Webex organization served by the Bot.
+
+    Attributes:
+        name (str): tenant name, used in the OAuth authorization URL (/webex/authorize?tenant=<name>)
+        org_id (str): org uuid, None for the default tenant
+        token_key (str): token storage key of the Integration
+        client_id (str): Integration client id
+        client_secret (str): Integration client secret
+        limiter (TokenBucket): Webex API call rate budget, None means unlimited
+        recording_cache (RecordingCache): meeting and recording cache of the org
+    """
+    def __init__(self, name, org_id = None, token_key = None, client_id = None, client_secret = None, api_rate = 0, recording_cache = None):
+        self.name = name
+        self.org_id = org_uuid(org_id)
+        self.token_key = token_key or name
+        self.client_id = client_id or os.getenv("WEBEX_INTEGRATION_CLIENT_ID")
+        self.client_secret = client_secret or os.getenv("WEBEX_INTEGRATION_CLIENT_SECRET")
+        self.limiter = TokenBucket(api_rate) if api_rate else None
+        self.recording_cache = recording_cache or RecordingCache()
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def access_token_obj(self):
+        return oauth.access_token_obj(storage_key = self.token_key, client_id = self.client_id, client_secret = self.client_secret)
+
+    def access_token(self):
+        return oauth.access_token(storage_key = self.token_key, client_id = self.client_id, client_secret = self.client_secret)
+
+    def api(self, access_token = None):
+        """
+        Integration API client of the tenant. The client and its HTTP connection pool
+        are shared by all requests until the token is refreshed.
+        """
+        access_token = access_token or self.access_token()
+        with self._client_lock:
+            if self._client is None or self._client.access_token != access_token:
+                self._client = WebexTeamsAPI(access_token = access_token)
+            return self._client
+
+    def __repr__(self):
+        return f"Tenant(name={self.name!r}, org_id={self.org_id!r}, token_key={self.token_key!r})"
+
+class TenantRegistry(object):
+    """
+    orgId -> Tenant mapping.
+    """
+    def __init__(self):
+        self.default = Tenant(DEFAULT_TENANT)
+        self.reject_unknown = False
+        self._by_org = {}
+        self._by_name = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config, default_token_key = None, cache_config = {}):
+        """
+        Set up the tenants from the "tenants" config section. Existing tenants keep
+        their caches and clients.
+
+        Parameters:
+            config (dict): {"unknown_org": "default" or "reject", "orgs": [{"name", "org_id", "token_key",
+                "client_id_env", "client_secret_env", "api_rate"}, ...]}
+            default_token_key (str): token storage key of the default tenant
+            cache_config (dict): "recording_cache" config section
+        """
+        with self._lock:
+            if default_token_key is not None:
+                self.default.token_key = default_token_key
+            self.reject_unknown = config.get("unknown_org", "default") == "reject"
+            by_org = {}
+            by_name = {}
+            for org in config.get("orgs", []):
+                name = org["name"]
+                tenant = self._by_name.get(name)
+                if tenant is None or tenant.org_id != org_uuid(org["org_id"]):
+                    tenant = Tenant(name, org_id = org["org_id"],
+                        token_key = org.get("token_key"),
+                        client_id = os.getenv(org["client_id_env"]) if org.get("client_id_env") else None,
+                        client_secret = os.getenv(org["client_secret_env"]) if org.get("client_secret_env") else None,
+                        api_rate = org.get("api_rate", 0))
+                    logger.info(f"tenant {tenant} configured")
+                tenant.recording_cache.configure(cache_config)
+                by_org[tenant.org_id] = tenant
+                by_name[name] = tenant
+            self._by_org = by_org
+            self._by_name = by_name
+
+    def for_org(self, org_id):
+        """
+        Returns:
+            Tenant: tenant of the org, default tenant for unknown orgs or None if unknown orgs are rejected
+        """
+        tenant = self._by_org.get(org_uuid(org_id))
+        if tenant is None and not self.reject_unknown:
+            return self.default
+        return tenant
+
+    def get(self, name):
+        if name is None or name == DEFAULT_TENANT:
+            return self.default
+        return self._by_name.get(name)
+
+    def credentials(self, name):
+        """
+        OAuth credentials of a tenant, see oauth_grant_flow.tenant_credentials
+
+        Returns:
+            tuple: (token storage key, client id, client secret) or None for an unknown tenant
+        """
+        tenant = self.get(name)
+        if tenant is not None:
+            return tenant.token_key, tenant.client_id, tenant.client_secret
+
+    def all(self):
+        return [self.default] + list(self._by_name.values())
+
+registry = TenantRegistry()
+
+_local = threading.local()
+
+def current_tenant():
+    return getattr(_local, "tenant", None) or registry.default
+
+@contextmanager
+def tenant_context(tenant):
+    previous = getattr(_local, "tenant", None)
+    _local.tenant = tenant
+    try:
+        yield tenant
+    finally:
+        _local.tenant = previous
+
+def run_as(tenant, function, *args, **kwargs):
+    """
+    Run the function in the tenant context (e.g. in a pool worker).
+    """
+    with tenant_context(tenant):
+        return function(*args, **kwargs)
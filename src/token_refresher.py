@@ -0,0 +1,131 @@
+"""
+Proactive background refresh of the Integration tokens.
+
+The Access Token is refreshed "margin" seconds before it expires, so a request never
+waits for the OAuth round trip. A failed refresh is retried with exponential backoff,
+meanwhile the requests keep using the still valid token. Time to expiry and refresh
+health are reported in /metrics.
+"""
+
+import time
+import logging
+import threading
+
+try:
+    from .metrics import metrics
+except:
+    from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+REFRESH_MARGIN = 7200 # seconds before expiry
+CHECK_INTERVAL = 300
+RETRY_INTERVAL = 30
+MAX_BACKOFF = 1800
+
+class TokenRefresher(object):
+    """
+    Daemon thread refreshing the tokens ahead of their expiration.
+
+    Attributes:
+        token_provider (callable): returns the AccessTokenAbs object or None if there are no tokens yet
+        margin (float): refresh when the Access Token expires within this many seconds
+        check_interval (float): how often to check the expiration
+        max_backoff (float): maximum delay between failed refresh attempts
+    """
+    def __init__(self, token_provider, margin = REFRESH_MARGIN, check_interval = CHECK_INTERVAL,
+            retry_interval = RETRY_INTERVAL, max_backoff = MAX_BACKOFF, name = "token"):
+        self.token_provider = token_provider
+        self.margin = margin
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self.max_backoff = max_backoff
+        self.name = name
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.failures = 0
+        self.last_refresh = None
+        self.last_error = None
+        self.expires_at = None
+        self.refresh_token_expires_at = None
+
+        metrics.register_gauge(f"{name}.expires_in", self.expires_in)
+        metrics.register_gauge(f"{name}.refresh_failures", lambda: self.failures)
+
+    def expires_in(self):
+        return None if self.expires_at is None else round(self.expires_at - time.time())
+
+    def run_once(self):
+        """
+        Check the token and refresh it if needed.
+
+        Returns:
+            float: seconds until the next check
+        """
+        token = self.token_provider()
+        if token is None:
+            self.last_error = "no tokens, authorization needed"
+            return self.check_interval
+
+        try:
+            token.sync()
+            if token.expires_in_seconds() < self.margin:
+                logger.info(f"{self.name}: Access Token expires in {token.expires_in_seconds():.0f} seconds, refreshing")
+                refreshed = token.refresh_if_needed(self.margin)
+                error = None if refreshed else "refresh failed"
+            else:
+                refreshed = True
+                error = None
+        except Exception as e:
+            refreshed = False
+            error = str(e)
+
+        self.expires_at = token.expires_at
+        self.refresh_token_expires_at = token.refresh_token_expires_at
+        if refreshed:
+            if self.failures > 0:
+                logger.info(f"{self.name}: token refresh recovered")
+            self.failures = 0
+            self.last_error = None
+            if token.token_refreshed:
+                self.last_refresh = time.time()
+            # check again when the token enters the refresh margin
+            return max(self.retry_interval, min(self.check_interval, token.expires_in_seconds() - self.margin))
+
+        self.failures += 1
+        self.last_error = error
+        delay = min(self.max_backoff, self.retry_interval * 2 ** (self.failures - 1))
+        logger.error(f"{self.name}: token refresh failed ({error}), attempt {self.failures}, retry in {delay} seconds, token valid for {token.expires_in_seconds():.0f} seconds")
+        return delay
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                delay = self.run_once()
+            except Exception as e:
+                logger.error(f"{self.name}: token refresher exception: {e}")
+                delay = self.check_interval
+            self._stop.wait(delay)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target = self._run, name = f"{self.name}-refresher", daemon = True)
+        self._thread.start()
+        logger.info(f"{self.name} refresher started, margin: {self.margin}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        expires_in = self.expires_in()
+        return {
+            "healthy": self.failures == 0 and expires_in is not None and expires_in > 0,
+            "expires_in": expires_in,
+            "refresh_token_expires_in": None if self.refresh_token_expires_at is None else round(self.refresh_token_expires_at - time.time()),
+            "last_refresh": self.last_refresh,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
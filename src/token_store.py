@@ -0,0 +1,191 @@
+"""
+Storage of OAuth tokens shared by several Bot processes.
+
+Every save increases a version counter of the token set. Readers keep the loaded tokens
+and compare only the version (a few bytes) to find out that another process refreshed
+the tokens. Token refresh is serialized across processes by an exclusive fcntl lock,
+so only one process calls the OAuth endpoint.
+
+Backends:
+- FileTokenStore: JSON file replaced by atomic rename, version in a sidecar file
+- SQLiteTokenStore: SQLite database (WAL mode), version in the same row
+"""
+
+import os
+import json
+import fcntl
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+WEBEX_TOKEN_FILE = "webex_tokens_{}.json"
+VERSION_FILE = "webex_tokens_{}.version"
+LOCK_FILE = ".webex_tokens_{}.lock"
+TOKEN_DB = "webex_tokens.db"
+
+class TokenStore(ABC):
+    """
+    Base class of the token stores.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok = True)
+        self._thread_locks = {}
+        self._thread_locks_lock = threading.Lock()
+        self._held = threading.local()
+
+    @abstractmethod
+    def load(self, key):
+        """
+        Returns:
+            tuple: (token dict or None, version)
+        """
+
+    @abstractmethod
+    def save(self, key, data):
+        """
+        Returns:
+            int: new version
+        """
+
+    @abstractmethod
+    def version(self, key):
+        """
+        Returns:
+            int: version of the stored token set, 0 if there is none
+        """
+
+    @contextmanager
+    def lock(self, key):
+        """
+        Exclusive lock of the token set, held during the token refresh. The lock
+        is reentrant within a thread, so the save during a refresh doesn't deadlock.
+        """
+        held = self._held.__dict__.setdefault("keys", set())
+        if key in held:
+            yield
+            return
+        with self._thread_locks_lock:
+            thread_lock = self._thread_locks.setdefault(key, threading.Lock())
+        with thread_lock:
+            with open(os.path.join(self.path, LOCK_FILE.format(key)), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                held.add(key)
+                try:
+                    yield
+                finally:
+                    held.discard(key)
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _atomic_write(path, text):
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "w") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class FileTokenStore(TokenStore):
+    """
+    Tokens in "webex_tokens_<key>.json" (compatible with the previous versions of the Bot),
+    version counter in "webex_tokens_<key>.version".
+    """
+    def _token_file(self, key):
+        return os.path.join(self.path, WEBEX_TOKEN_FILE.format(key))
+
+    def _version_file(self, key):
+        return os.path.join(self.path, VERSION_FILE.format(key))
+
+    def load(self, key):
+        # read the version first, a concurrent save then at worst causes one more reload
+        version = self.version(key)
+        try:
+            with open(self._token_file(key), "r") as file:
+                return json.load(file), version
+        except FileNotFoundError:
+            return None, version
+
+    def save(self, key, data):
+        with self.lock(key):
+            version = self.version(key) + 1
+            _atomic_write(self._token_file(key), json.dumps(data))
+            _atomic_write(self._version_file(key), str(version))
+        return version
+
+    def version(self, key):
+        try:
+            with open(self._version_file(key), "r") as file:
+                return int(file.read().strip() or 0)
+        except FileNotFoundError:
+            # tokens saved by a previous version of the Bot
+            return 1 if os.path.exists(self._token_file(key)) else 0
+        except ValueError:
+            return 0
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Tokens and their versions in a SQLite database "webex_tokens.db".
+    """
+    def __init__(self, path):
+        super().__init__(path)
+        self._local = threading.local()
+        self._connection().execute("CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, data TEXT NOT NULL, version INTEGER NOT NULL)")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(os.path.join(self.path, TOKEN_DB), timeout = 30, isolation_level = None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def load(self, key):
+        row = self._connection().execute("SELECT data, version FROM tokens WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, 0
+        return json.loads(row[0]), row[1]
+
+    def save(self, key, data):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT version FROM tokens WHERE key = ?", (key,)).fetchone()
+            version = (row[0] if row is not None else 0) + 1
+            connection.execute("INSERT OR REPLACE INTO tokens (key, data, version) VALUES (?, ?, ?)", (key, json.dumps(data), version))
+            connection.execute("COMMIT")
+            return version
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def version(self, key):
+        row = self._connection().execute("SELECT version FROM tokens WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else 0
+
+TOKEN_STORES = {
+    "file": FileTokenStore,
+    "sqlite": SQLiteTokenStore
+}
+
+def create_token_store(options, default_path = "./"):
+    """
+    Create a token store from the "token_store" config section.
+
+    Parameters:
+        options (dict): {"backend": "file" or "sqlite", "path": storage directory}
+        default_path (str): storage directory if "path" is not set
+    """
+    backend = options.get("backend", "file")
+    store_class = TOKEN_STORES.get(backend)
+    if store_class is None:
+        raise ValueError(f"unknown token store backend {backend}")
+    return store_class(options.get("path") or default_path)
@@ -0,0 +1,85 @@
+"""
+Opt-in capture of the incoming Webex traffic for load tests.
+
+Webhook payloads and websocket "conversation.activity" messages are appended to a JSON-lines
+file, one record per event: {"ts": epoch seconds, "kind": "webhook" or "websocket", "payload": ...}.
+Personal data (e-mails, names, message texts, card inputs) is replaced by hashes which are
+stable within the capture, so the replay keeps the mix of users, spaces and event types
+without the content. Ids are kept, they are needed to route and deduplicate the events.
+
+The capture stops when the file reaches "max_bytes".
+See webhook_replay.py for the replay.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MAX_BYTES = 100 * 1024 * 1024
+EMAIL_KEYS = {"emailAddress", "personEmail", "actorEmail", "hostEmail", "userEmail", "emails", "id_email"}
+TEXT_KEYS = {"displayName", "nickName", "firstName", "lastName", "text", "markdown", "html", "title", "topic",
+    "avatar", "files", "inputs", "password", "content", "name", "encryptionKeyUrl"}
+
+class TrafficRecorder(object):
+    """
+    Thread-safe writer of the sanitized events.
+
+    Attributes:
+        path (str): JSON-lines file
+        max_bytes (int): stop recording when the file reaches this size
+    """
+    def __init__(self, path, max_bytes = MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.records = 0
+        self._salt = os.urandom(8).hex()
+        self._lock = threading.Lock()
+        self._file = open(path, "a")
+        self._size = self._file.tell()
+        self._full = False
+        logger.info(f"traffic capture to {path} started")
+
+    def _hash(self, value):
+        return hashlib.sha256((self._salt + str(value).casefold()).encode("utf-8")).hexdigest()[:12]
+
+    def sanitize(self, data, key = None):
+        """
+        Copy of the data with the personal values replaced.
+        """
+        if isinstance(data, dict):
+            return {item_key: self.sanitize(value, item_key) for item_key, value in data.items()}
+        if isinstance(data, list):
+            return [self.sanitize(value, key) for value in data]
+        if key in EMAIL_KEYS and isinstance(data, str):
+            return f"u{self._hash(data)}@example.com"
+        if key in TEXT_KEYS and data is not None:
+            return f"redacted:{self._hash(data)}"
+        return data
+
+    def record(self, kind, payload):
+        if self._full:
+            return
+        try:
+            line = json.dumps({"ts": time.time(), "kind": kind, "payload": self.sanitize(payload)}) + "\n"
+        except (TypeError, ValueError) as e:
+            logger.error(f"traffic capture of {kind} failed: {e}")
+            return
+        with self._lock:
+            if self._size + len(line) > self.max_bytes:
+                self._full = True
+                logger.warning(f"traffic capture {self.path} reached {self.max_bytes} bytes, stopped")
+                return
+            self._file.write(line)
+            self._file.flush()
+            self._size += len(line)
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            self._full = True
+            self._file.close()
@@ -1,11 +1,14 @@
 import os
+import time
 from datetime import datetime, timedelta, timezone
 from webexteamssdk import WebexTeamsAPI, AccessToken, ApiError
-import json
 
 import logging
 
-WEBEX_TOKEN_FILE = "webex_tokens_{}.json"
+try:
+    from .token_store import FileTokenStore, WEBEX_TOKEN_FILE
+except:
+    from token_store import FileTokenStore, WEBEX_TOKEN_FILE
 
 TOKEN_REFRESH_TIME_MARGIN = 3600 # seconds
 
@@ -18,19 +21,29 @@ class AccessTokenAbs(AccessToken):
     Note that Refresh Token expiration is not important. As long as it's being used
     to generate new Access Tokens, its validity is extended even beyond the original expiration date.
     
+    Tokens are kept in a token store shared by all Bot processes. Before the token is used,
+    the version of the stored tokens is checked and the tokens are reloaded only if another
+    process has saved new ones. Refresh runs under the store lock, so only one process
+    calls the OAuth endpoint.
+    
     Attributes:
         expires_at (float): When the access token expires
         refresh_token_expires_at (float): When the refresh token expires.
     """
+    background_refresh = False # set if the tokens are refreshed by TokenRefresher
+    
     def __init__(self, access_token_json = None, storage_key = "default",
             token_storage_path = "./",
             client_id = os.getenv("WEBEX_INTEGRATION_CLIENT_ID"),
-            client_secret = os.getenv("WEBEX_INTEGRATION_CLIENT_SECRET")):
+            client_secret = os.getenv("WEBEX_INTEGRATION_CLIENT_SECRET"),
+            token_store = None):
 
         self.storage_key = storage_key
         self.token_storage_path = token_storage_path
         self.client_id = client_id
         self.client_secret = client_secret
+        self.token_store = token_store or FileTokenStore(token_storage_path)
+        self._version = 0
         
         self._token_refreshed = False
         
@@ -47,15 +60,52 @@ class AccessTokenAbs(AccessToken):
         
     @property
     def access_token(self):
-        exp = datetime.fromtimestamp(self.expires_at)
-        diff_sec = (exp - datetime.utcnow()).total_seconds()
+        self.sync()
+        diff_sec = self.expires_in_seconds()
+        if self.background_refresh and diff_sec > 0:
+            # refreshed ahead of expiry by the TokenRefresher, don't block the request
+            return super().access_token
         if diff_sec < TOKEN_REFRESH_TIME_MARGIN:
             logging.info(f"Access Token expiring in {diff_sec} sec. Attempting refresh.")
-            self.refresh_tokens()
-            if not self._token_refreshed:
+            if not self.refresh_if_needed(TOKEN_REFRESH_TIME_MARGIN) and diff_sec <= 0:
                 return None
             
         return super().access_token
+        
+    def expires_in_seconds(self):
+        return (self.expires_at or 0) - time.time()
+        
+    def refresh_if_needed(self, margin = TOKEN_REFRESH_TIME_MARGIN):
+        """
+        Refresh the tokens if the Access Token expires within the margin. Runs under the token store lock,
+        tokens refreshed meanwhile by another process are just reloaded.
+        
+        Returns:
+            bool: True if the Access Token is valid for longer than the margin
+        """
+        with self.token_store.lock(self.storage_key):
+            # another process may have refreshed the tokens while waiting for the lock
+            self.sync()
+            if self.expires_in_seconds() >= margin:
+                return True
+            return self.refresh_tokens()
+        
+    def sync(self):
+        """
+        Reload the tokens if they were saved by another process or object.
+        
+        Returns:
+            bool: True if the tokens were reloaded
+        """
+        version = self.token_store.version(self.storage_key)
+        if version == self._version:
+            return False
+        access_token_json = self._load_tokens()
+        if access_token_json is None:
+            return False
+        self._json_data = access_token_json
+        logging.debug(f"Tokens for key {self.storage_key} reloaded, version {self._version}")
+        return True
     
     @property
     def expires_at(self):
@@ -94,11 +144,9 @@ class AccessTokenAbs(AccessToken):
         Parameters:
         """        
         logging.debug(f"AT timestamp: {self.expires_at}")
-        file_destination = self._get_webex_token_file()
         try:
-            with open(file_destination, "w") as file:
-                logging.debug(f"Saving Webex tokens to: {file_destination}")
-                json.dump(self._json_data, file)
+            logging.debug(f"Saving Webex tokens for key: {self.storage_key}")
+            self._version = self.token_store.save(self.storage_key, self._json_data)
         except Exception as e:
             logging.info(f"Webex token save exception: {e}")
 
@@ -117,14 +165,12 @@ class AccessTokenAbs(AccessToken):
         Parameters:
             
         Returns:
-            AccessTokenAbs: Access & Refresh Token object or None
+            dict: Access & Refresh Token data or None
         """
         try:
-            file_source = self._get_webex_token_file()
-            with open(file_source, "r") as file:
-                logging.debug(f"Loading Webex tokens from: {file_source}")
-                access_token_json = json.load(file)
-                return access_token_json
+            logging.debug(f"Loading Webex tokens for key: {self.storage_key}")
+            access_token_json, self._version = self.token_store.load(self.storage_key)
+            return access_token_json
         except Exception as e:
             logging.info(f"Webex token load exception: {e}")
 
@@ -139,7 +185,7 @@ class AccessTokenAbs(AccessToken):
         Parameters:
             
         Returns:
-            str: message indicating the result of the operation
+            bool: True if the tokens were refreshed
         """
         integration_api = WebexTeamsAPI(access_token="12345")
         try:
@@ -149,5 +195,7 @@ class AccessTokenAbs(AccessToken):
             
             self._token_refreshed = True
             logging.info(f"Tokens refreshed for key {self.storage_key}")
+            return True
         except ApiError as e:
             logging.error(f"Error refreshing an access token. Client Id and Secret loading error: {e}")
+            return False
@@ -0,0 +1,308 @@
+"""
+Local stand-in for the Webex API used by the load tests (see webhook_replay.py).
+
+Answers the API calls the Bot makes while handling messages, card actions and recording
+requests with generated data after a configurable latency. The captured traffic doesn't
+contain the message texts, so the text of each message is picked from a weighted command
+mix by the message id - a replayed message gets the same command in every round.
+
+redirect_webex_api() sends the Webex API (https://webexapis.com/v1/) and conversation service
+calls of the current process to the stub.
+
+run: python webex_api_stub.py [-p 5060] [-l 0.05] [-c "rec 123456789=0.8,help=0.2"]
+"""
+
+import re
+import json
+import time
+import base64
+import random
+import hashlib
+import logging
+import threading
+import requests
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+WEBEX_API_URL = "https://webexapis.com/v1/"
+CONVERSATION_PATH = "/conversation/api/v1/"
+DEFAULT_COMMANDS = "rec 123456789=0.7,help=0.2,rec 123456789;987654321=0.1"
+STUB_ORG_ID = "00000000-0000-4000-8000-000000000000"
+
+def parse_command_mix(spec):
+    """
+    "text=weight,text=weight" -> [(text, cumulative weight), ...], the weights are normalized
+    """
+    commands = []
+    for item in spec.split(","):
+        text, _, weight = item.rpartition("=")
+        if not text:
+            text, weight = weight, "1"
+        commands.append((text.strip(), float(weight)))
+    total = sum(weight for _, weight in commands)
+    result = []
+    cumulative = 0.0
+    for text, weight in commands:
+        cumulative += weight / total
+        result.append((text, cumulative))
+    return result
+
+def stable_fraction(value):
+    """
+    Deterministic number in <0, 1) derived from the value.
+    """
+    return int(hashlib.md5(str(value).encode("utf-8")).hexdigest()[:8], 16) / 0x100000000
+
+def webex_id(kind, value):
+    return base64.b64encode(f"ciscospark://us/{kind}/{value}".encode("utf-8")).decode("ascii").rstrip("=")
+
+def stub_email(value):
+    return f"u{hashlib.md5(str(value).encode('utf-8')).hexdigest()[:12]}@example.com"
+
+def iso_time(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class WebexApiStub(object):
+    """
+    Threaded HTTP server answering the Webex API calls of the Bot.
+
+    Attributes:
+        latency (float): response delay in seconds
+        jitter (float): random extra delay in seconds (0 - jitter)
+        commands (str): weighted message text mix, see parse_command_mix()
+        meetings_per_series (int): ended instances of each meeting series
+        recordings_per_meeting (int): recordings of each meeting instance
+        counts (dict): number of calls per endpoint
+    """
+    def __init__(self, latency = 0.05, jitter = 0, commands = DEFAULT_COMMANDS, meetings_per_series = 4, recordings_per_meeting = 1,
+        host = "127.0.0.1", port = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.commands = parse_command_mix(commands)
+        self.meetings_per_series = meetings_per_series
+        self.recordings_per_meeting = recordings_per_meeting
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+        self.routes = [
+            ("GET", re.compile(r"^people/me$"), self.get_me),
+            ("GET", re.compile(r"^people/([^/]+)$"), self.get_person),
+            ("GET", re.compile(r"^rooms/([^/]+)$"), self.get_room),
+            ("GET", re.compile(r"^messages/([^/]+)$"), self.get_message),
+            ("POST", re.compile(r"^messages$"), self.post_message),
+            ("PUT", re.compile(r"^messages/([^/]+)$"), self.post_message),
+            ("GET", re.compile(r"^attachment/actions/([^/]+)$"), self.get_attachment_action),
+            ("GET", re.compile(r"^meetings$"), self.list_meetings),
+            ("GET", re.compile(r"^meetings/([^/]+)$"), self.get_meeting),
+            ("GET", re.compile(r"^recordings$"), self.list_recordings),
+            ("GET", re.compile(r"^recordings/([^/]+)$"), self.get_recording),
+            ("GET", re.compile(r"^meetingPreferences/personalMeetingRoom$"), self.get_pmr),
+            ("GET", re.compile(r"^webhooks$"), self.list_items)
+        ]
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target = self._server.serve_forever, name = "webex_api_stub", daemon = True)
+        self._thread.start()
+        logger.info(f"Webex API stub listening at {self.url}")
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, endpoint):
+        with self._lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, data = stub.dispatch(self.command, self.path, body)
+                content = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json;charset=UTF-8")
+                self.send_header("Content-Length", str(len(content)))
+                self.send_header("TrackingID", "STUB")
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+        return Handler
+
+    def dispatch(self, method, path, body = b""):
+        """
+        Returns:
+            tuple: (HTTP status, response data)
+        """
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        parsed = urlparse(path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        if CONVERSATION_PATH in parsed.path:
+            # conversation service lookup of the message id (webex_bot _get_base64_message_id)
+            self._count("conversation")
+            activity_id = parsed.path.rstrip("/").split("/")[-1]
+            kind = "ATTACHMENT_ACTION" if "/attachment/actions/" in parsed.path else "MESSAGE"
+            return 200, {"id": webex_id(kind, activity_id)}
+        api_path = parsed.path.split("/v1/", 1)[-1].strip("/")
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(api_path)
+            if route_method == method and match is not None:
+                self._count(f"{method} {pattern.pattern.strip('^$').replace('([^/]+)', '{id}')}")
+                try:
+                    data = json.loads(body) if body else {}
+                except ValueError:
+                    data = {}
+                return 200, handler(*match.groups(), params = params, data = data)
+        self._count("not_found")
+        return 404, {"message": f"{method} {api_path} not found in the stub", "trackingId": "STUB"}
+
+    def command_for(self, message_id):
+        fraction = stable_fraction(message_id)
+        for text, cumulative in self.commands:
+            if fraction < cumulative:
+                return text
+        return self.commands[-1][0]
+
+    def get_me(self, params, data):
+        return {"id": webex_id("PEOPLE", "bot"), "emails": ["recording-bot@example.com"], "displayName": "Recording Bot",
+            "nickName": "Recording Bot", "avatar": "https://example.com/avatar.png", "orgId": webex_id("ORGANIZATION", STUB_ORG_ID),
+            "type": "bot"}
+
+    def get_person(self, person_id, params, data):
+        return {"id": person_id, "emails": [stub_email(person_id)], "displayName": "Stub User", "orgId": webex_id("ORGANIZATION", STUB_ORG_ID),
+            "type": "person"}
+
+    def get_room(self, room_id, params, data):
+        return {"id": room_id, "title": "Stub Space", "type": "direct", "isLocked": False}
+
+    def get_message(self, message_id, params, data):
+        person_id = webex_id("PEOPLE", f"person-{int(stable_fraction(message_id) * 50)}")
+        return {"id": message_id, "roomId": webex_id("ROOM", f"room-{message_id}"), "roomType": "direct",
+            "text": self.command_for(message_id), "personId": person_id, "personEmail": stub_email(person_id),
+            "created": iso_time(datetime.now(timezone.utc))}
+
+    def post_message(self, message_id = None, params = None, data = None):
+        return dict(data, id = message_id or webex_id("MESSAGE", f"stub-{time.monotonic_ns()}"),
+            created = iso_time(datetime.now(timezone.utc)))
+
+    def get_attachment_action(self, action_id, params, data):
+        command, _, argument = self.command_for(action_id).partition(" ")
+        inputs = {"command_keyword": command}
+        if argument:
+            inputs["meeting_number"] = argument
+        person_id = webex_id("PEOPLE", f"person-{int(stable_fraction(action_id) * 50)}")
+        return {"id": action_id, "type": "submit", "messageId": webex_id("MESSAGE", f"card-{action_id}"), "inputs": inputs,
+            "personId": person_id, "roomId": webex_id("ROOM", f"room-{action_id}"), "created": iso_time(datetime.now(timezone.utc))}
+
+    def _meeting(self, series_id, index, host_email, start):
+        meeting_id = f"{series_id}_I_{index}" if index is not None else series_id
+        return {"id": meeting_id, "meetingSeriesId": series_id, "meetingNumber": series_id.split("-")[-1],
+            "title": f"Stub meeting {series_id}", "start": iso_time(start), "end": iso_time(start + timedelta(hours = 1)),
+            "hostEmail": host_email, "state": "ended" if index is not None else "active", "meetingType": "meeting" if index is not None else "meetingSeries"}
+
+    def list_meetings(self, params, data):
+        host_email = params.get("hostEmail") or "host@example.com"
+        now = datetime.now(timezone.utc)
+        if "meetingSeriesId" in params:
+            series_id = params["meetingSeriesId"]
+            return {"items": [self._meeting(series_id, index, host_email, now - timedelta(days = 7 * (index + 1)))
+                for index in range(self.meetings_per_series)]}
+        if "meetingNumber" in params:
+            return {"items": [self._meeting(f"series-{params['meetingNumber']}", None, host_email, now)]}
+        return {"items": []}
+
+    def get_meeting(self, meeting_id, params, data):
+        series_id, _, index = meeting_id.partition("_I_")
+        return self._meeting(series_id, int(index) if index else None, params.get("hostEmail") or "host@example.com",
+            datetime.now(timezone.utc) - timedelta(days = 7 * (int(index or 0) + 1)))
+
+    def list_recordings(self, params, data):
+        meeting_id = params.get("meetingId", "")
+        return {"items": [self.get_recording(f"{meeting_id}_R_{index}", params) for index in range(self.recordings_per_meeting)]}
+
+    def get_recording(self, recording_id, params = None, data = None):
+        meeting_id = recording_id.split("_R_")[0]
+        now = datetime.now(timezone.utc)
+        return {"id": recording_id, "meetingId": meeting_id, "topic": f"Stub recording {meeting_id}",
+            "timeRecorded": iso_time(now - timedelta(days = 1)), "durationSeconds": 3600, "hostEmail": (params or {}).get("hostEmail", "host@example.com"),
+            "temporaryDirectDownloadLinks": {
+                "audioDownloadLink": f"https://example.com/download/{recording_id}.mp3",
+                "recordingDownloadLink": f"https://example.com/download/{recording_id}.mp4",
+                "expiration": iso_time(now + timedelta(hours = 3))
+            }}
+
+    def get_pmr(self, params, data):
+        return {"telephony": {"accessCode": "999999999"}}
+
+    def list_items(self, params, data):
+        return {"items": []}
+
+def stub_target(stub_url, url):
+    """
+    Stub URL of a Webex API or conversation service URL, None for the other URLs.
+    """
+    if url.startswith(WEBEX_API_URL):
+        return f"{stub_url}/v1/{url[len(WEBEX_API_URL):]}"
+    parsed = urlparse(url)
+    if parsed.scheme == "https" and CONVERSATION_PATH in parsed.path:
+        return f"{stub_url}{parsed.path}"
+
+def redirect_webex_api(stub_url):
+    """
+    Send the Webex calls of all requests Sessions in this process to the stub.
+
+    Returns:
+        callable: restores the original behavior
+    """
+    original_request = requests.Session.request
+
+    def request(session, method, url, *args, **kwargs):
+        target = stub_target(stub_url, url)
+        if target is not None:
+            url = target
+            kwargs["proxies"] = {"http": None, "https": None}
+        return original_request(session, method, url, *args, **kwargs)
+
+    requests.Session.request = request
+    return lambda: setattr(requests.Session, "request", original_request)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-p", "--port", type = int, default = 5060, help="Listening port, default: 5060")
+    parser.add_argument("-l", "--latency", type = float, default = 0.05, help="Response latency in seconds, default: 0.05")
+    parser.add_argument("-j", "--jitter", type = float, default = 0, help="Random extra latency in seconds, default: 0")
+    parser.add_argument("-c", "--commands", default = DEFAULT_COMMANDS, help=f"Message text mix, default: \"{DEFAULT_COMMANDS}\"")
+    args = parser.parse_args()
+
+    logging.basicConfig(level = logging.INFO)
+    stub = WebexApiStub(latency = args.latency, jitter = args.jitter, commands = args.commands, port = args.port)
+    stub.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        stub.stop()
+        print(json.dumps(stub.counts, indent = 2))
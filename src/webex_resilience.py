@@ -0,0 +1,313 @@
+"""
+Latency budgets, circuit breakers and hedged reads for Webex API calls.
+
+- deadline: a "rec" request gets a time budget. Every API call within the request uses
+  the remaining budget as its timeout and fails fast once the budget is spent,
+  so the user gets a partial or degraded reply instead of waiting for the default timeouts.
+- circuit breaker per endpoint: after "failure_threshold" consecutive failures (timeouts,
+  connection errors, 5xx) the endpoint is not called for "reset_timeout" seconds. Then
+  a single probe call is let through (half-open), its success closes the circuit.
+- hedged GET: an idempotent call which takes longer than the endpoint's p95 latency
+  is sent once more, the first response wins.
+- call budget: optional rate limit of the calls (e.g. per tenant), waits within the deadline.
+- streamed lists: list pages are parsed item by item from the response stream (see json_stream.py).
+"""
+
+import time
+import logging
+import threading
+import concurrent.futures
+from contextlib import contextmanager
+
+import requests
+from webexteamssdk import ApiError
+
+try:
+    from .metrics import metrics
+except:
+    from metrics import metrics
+try:
+    from .json_stream import iter_items, CHUNK_SIZE
+except:
+    from json_stream import iter_items, CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DEADLINE = 20 # seconds for a whole "rec" request
+CALL_TIMEOUT = 10 # seconds, maximum for a single call
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30
+HEDGE_MIN_SAMPLES = 20 # latency samples needed before hedging an endpoint
+HEDGE_MIN_DELAY = 0.05
+
+options = {
+    "request_deadline": REQUEST_DEADLINE,
+    "call_timeout": CALL_TIMEOUT,
+    "failure_threshold": FAILURE_THRESHOLD,
+    "reset_timeout": RESET_TIMEOUT,
+    "hedge": True,
+    "hedge_min_samples": HEDGE_MIN_SAMPLES
+}
+
+class DeadlineExceeded(Exception):
+    pass
+
+class CircuitOpenError(Exception):
+    pass
+
+_local = threading.local()
+call_budget = None # callable() -> TokenBucket for the current call or None
+
+def configure(config):
+    options.update({key: value for key, value in config.items() if key in options})
+
+@contextmanager
+def deadline(seconds):
+    """
+    Set a time budget for the calls made by the current thread. Nested deadlines
+    can only shorten the budget.
+    """
+    previous = getattr(_local, "deadline", None)
+    new = time.monotonic() + seconds if seconds else None
+    if previous is not None and (new is None or previous < new):
+        new = previous
+    _local.deadline = new
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+def current_deadline():
+    return getattr(_local, "deadline", None)
+
+@contextmanager
+def deadline_at(monotonic_deadline):
+    """
+    Continue a deadline of another thread (e.g. in a pool worker).
+    """
+    previous = getattr(_local, "deadline", None)
+    _local.deadline = monotonic_deadline
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+def remaining():
+    """
+    Returns:
+        float: seconds left in the current deadline or None if there is no deadline
+    """
+    current = getattr(_local, "deadline", None)
+    return None if current is None else current - time.monotonic()
+
+def check_deadline():
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return left
+
+class CircuitBreaker(object):
+    """
+    Closed -> open after consecutive failures, open -> half-open after reset_timeout,
+    half-open -> closed after a successful probe or back to open after a failed one.
+    """
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0
+        self._probing = False
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= options["reset_timeout"]:
+                self.state = "half-open"
+                self._probing = False
+            if self.state == "half-open" and not self._probing:
+                self._probing = True
+                logger.info(f"circuit {self.name} half-open, probing")
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"circuit {self.name} closed")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """
+        The call ended without telling whether the endpoint works, allow another probe.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or (self.state == "closed" and self.failures >= options["failure_threshold"]):
+                logger.warning(f"circuit {self.name} open after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probing = False
+                metrics.inc(f"webex.{self.name}.circuit_opened")
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_hedge_executor = concurrent.futures.ThreadPoolExecutor(max_workers = 8, thread_name_prefix = "hedge")
+
+def breaker(endpoint):
+    with _breakers_lock:
+        return _breakers.setdefault(endpoint, CircuitBreaker(endpoint))
+
+def circuit_states():
+    with _breakers_lock:
+        return {name: item.state for name, item in _breakers.items()}
+
+def endpoint_name(path):
+    """
+    "recordings/<id>" -> "recordings/{id}", "meetings" -> "meetings"
+    """
+    parts = path.strip("/").split("/")
+    return parts[0] + ("/{id}" if len(parts) > 1 else "")
+
+def _is_failure(exception):
+    if isinstance(exception, ApiError):
+        return exception.status_code is None or exception.status_code >= 500
+    return isinstance(exception, requests.RequestException)
+
+def _timed_get(session, url, params, timeout, endpoint):
+    started = time.monotonic()
+    result = session.get(url, params, timeout = timeout)
+    metrics.observe(f"webex.{endpoint}", time.monotonic() - started)
+    return result
+
+def _timed_stream(session, url, params, timeout, endpoint):
+    """
+    GET with the response body left unread, the latency is measured to the response headers.
+    """
+    started = time.monotonic()
+    response = session.request("GET", url, 200, params = params, stream = True, timeout = timeout)
+    metrics.observe(f"webex.{endpoint}", time.monotonic() - started)
+    return response
+
+def webex_get(api, path, params = None, hedge = False):
+    """
+    GET a Webex API resource within the current deadline and the circuit breaker of the endpoint.
+
+    Parameters:
+        api (WebexTeamsAPI): API object
+        path (str): resource path relative to the API base URL
+        params (dict): query parameters
+        hedge (bool): the call is idempotent and may be sent twice if slow
+
+    Returns:
+        dict: JSON response
+
+    Raises:
+        DeadlineExceeded, CircuitOpenError, ApiError, requests.RequestException
+    """
+    endpoint = endpoint_name(path)
+    url = api._session.base_url + path
+    if hedge and options["hedge"]:
+        return _guarded_call(endpoint, lambda timeout: _hedged_get(api._session, url, params, timeout, endpoint))
+    return _guarded_call(endpoint, lambda timeout: _timed_get(api._session, url, params, timeout, endpoint))
+
+def webex_list(api, path, params = None, fields = None, limiter = None):
+    """
+    GET a Webex API list resource and yield its items one at a time. The pages (Link: rel="next")
+    are streamed and parsed incrementally, each page request is made within the current deadline,
+    call budget and circuit breaker like webex_get().
+
+    Parameters:
+        api (WebexTeamsAPI): API object
+        path (str): resource path relative to the API base URL
+        params (dict): query parameters of the first page
+        fields (iterable): item fields to keep, None keeps the whole items
+        limiter (TokenBucket): optional extra rate limit consumed for each page
+
+    Raises:
+        DeadlineExceeded, CircuitOpenError, ApiError, requests.RequestException, JSONStreamError
+    """
+    endpoint = endpoint_name(path)
+    url = api._session.base_url + path
+    while url is not None:
+        if limiter is not None:
+            limiter.consume()
+        response = _guarded_call(endpoint, lambda timeout: _timed_stream(api._session, url, params, timeout, endpoint))
+        try:
+            yield from iter_items(response.iter_content(chunk_size = CHUNK_SIZE), fields = fields)
+        except requests.RequestException:
+            breaker(endpoint).record_failure()
+            raise
+        finally:
+            response.close()
+        next_link = response.links.get("next")
+        url = next_link.get("url") if next_link else None
+        params = None # the next page URL has all the parameters
+
+def _guarded_call(endpoint, call):
+    """
+    Make the call within the current deadline, call budget and the circuit breaker of the endpoint.
+
+    Parameters:
+        call (callable): call(timeout) -> result
+    """
+    left = check_deadline()
+    budget = call_budget() if call_budget is not None else None
+    if budget is not None:
+        if not budget.consume(timeout = left):
+            raise DeadlineExceeded(f"request deadline exceeded waiting for the API call budget of {endpoint}")
+        left = check_deadline()
+    circuit = breaker(endpoint)
+    if not circuit.allow():
+        metrics.inc(f"webex.{endpoint}.rejected")
+        raise CircuitOpenError(f"{endpoint} unavailable")
+
+    timeout = options["call_timeout"] if left is None else min(options["call_timeout"], left)
+    try:
+        result = call(timeout)
+    except Exception as e:
+        if isinstance(e, requests.Timeout) and left is not None and left < options["call_timeout"]:
+            # the timeout was shortened by the deadline, not a fault of the endpoint
+            circuit.release()
+            raise DeadlineExceeded(f"request deadline exceeded in {endpoint}") from e
+        if _is_failure(e):
+            circuit.record_failure()
+        else:
+            circuit.record_success()
+        raise
+    circuit.record_success()
+    return result
+
+def _hedged_get(session, url, params, timeout, endpoint):
+    histogram = metrics.histogram(f"webex.{endpoint}")
+    if histogram is None or histogram.count < options["hedge_min_samples"]:
+        return _timed_get(session, url, params, timeout, endpoint)
+    delay = max(HEDGE_MIN_DELAY, histogram.percentile(95))
+    if delay >= timeout:
+        return _timed_get(session, url, params, timeout, endpoint)
+
+    started = time.monotonic()
+    first = _hedge_executor.submit(_timed_get, session, url, params, timeout, endpoint)
+    done, _ = concurrent.futures.wait([first], timeout = delay)
+    if done:
+        return first.result()
+
+    metrics.inc(f"webex.{endpoint}.hedged")
+    logger.debug(f"hedging {endpoint} after {delay:.3f}s")
+    second = _hedge_executor.submit(_timed_get, session, url, params, timeout - (time.monotonic() - started), endpoint)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = concurrent.futures.wait(pending, return_when = concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
@@ -0,0 +1,333 @@
+"""
+Replay saved Webex webhook payloads against a locally running Bot.
+
+Useful for testing the webhook handling (for example the meetings/recordings events
+which update the recording cache) without registering the webhooks in Webex.
+
+The input file is either a JSON file with a single payload or a list of payloads,
+or a JSON-lines file with one payload per line, or a traffic capture (see traffic_capture.py).
+
+Load test mode (-m) replays the traffic open-loop at the rate multipliers, keeping the captured
+inter-arrival times (or --rate events per second for payloads without a time stamp), and reports
+the throughput and latency for each multiplier and the saturation point. The target is either
+a running Bot (http) or the Bot loaded in this process (webhook - the /webhook route,
+websocket - WebexBotShare._process_incoming_websocket_message) with the Webex API
+replaced by webex_api_stub.py.
+
+run: python webhook_replay.py payloads.jsonl [-u http://127.0.0.1:5050/webhook]
+     python webhook_replay.py capture.jsonl -t websocket -m 1,2,4,8 [-c config.json] [-l 0.05]
+"""
+
+import os
+import copy
+import json
+import time
+import logging
+import tempfile
+import threading
+import requests
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEBHOOK_URL = "http://127.0.0.1:5050/webhook"
+
+def load_payloads(file_name):
+    """
+    Load webhook payloads from a JSON or JSON-lines file.
+
+    Returns:
+        list: webhook payloads (dict)
+    """
+    with open(file_name) as file:
+        content = file.read().strip()
+    if len(content) == 0:
+        return []
+    try:
+        data = json.loads(content)
+        return data if isinstance(data, list) else [data]
+    except ValueError:
+        return [json.loads(line) for line in content.splitlines() if len(line.strip()) > 0]
+
+def replay(payloads, url = DEFAULT_WEBHOOK_URL, delay = 0):
+    """
+    POST the payloads to the Bot webhook URL.
+
+    Returns:
+        list: (status code, latency in seconds) for each payload
+    """
+    results = []
+    with requests.Session() as session:
+        for payload in payloads:
+            start = time.monotonic()
+            try:
+                status = session.post(url, json = payload, proxies = {"http": None, "https": None}, verify = False).status_code
+            except requests.RequestException as e:
+                logger.error(f"webhook replay failed: {e}")
+                status = None
+            results.append((status, time.monotonic() - start))
+            if delay > 0:
+                time.sleep(delay)
+
+    return results
+
+def load_capture(file_name):
+    """
+    Load a traffic capture or plain webhook payloads.
+
+    Returns:
+        list: {"ts": epoch seconds or None, "kind": "webhook" or "websocket", "payload": dict} records
+    """
+    records = []
+    for item in load_payloads(file_name):
+        if "kind" in item and "payload" in item:
+            records.append(item)
+        else:
+            records.append({"ts": None, "kind": "webhook", "payload": item})
+    return records
+
+def unique_payload(kind, payload, suffix):
+    """
+    Copy of the payload with the event id changed, so that the delivery deduplication
+    doesn't drop the repeated events.
+    """
+    payload = copy.deepcopy(payload)
+    try:
+        if kind == "websocket":
+            payload["data"]["activity"]["id"] += suffix
+        else:
+            payload["data"]["id"] += suffix
+    except (KeyError, TypeError):
+        pass
+    return payload
+
+def schedule(records, multiplier = 1, rate = 10):
+    """
+    Send time offsets of the records: captured inter-arrival times or 1/rate, divided by the multiplier.
+    """
+    first_ts = next((record["ts"] for record in records if record.get("ts") is not None), None)
+    offsets = []
+    for index, record in enumerate(records):
+        if first_ts is not None and record.get("ts") is not None:
+            offsets.append((record["ts"] - first_ts) / multiplier)
+        else:
+            offsets.append(index / (rate * multiplier))
+    return offsets
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def run_load(records, send, multiplier = 1, rate = 10, workers = 64, round_id = 0):
+    """
+    Open-loop replay: each record is sent at its scheduled time regardless of the completion
+    of the previous ones, the latency includes the waiting for a free worker.
+
+    Parameters:
+        send (callable): send(kind, payload) - returns when the Bot finished the event, raises on error
+
+    Returns:
+        dict: multiplier, events, offered rate, throughput, p50/p95/p99 latency (seconds), errors
+    """
+    offsets = schedule(records, multiplier, rate)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    finished = [0.0]
+
+    def timed_send(index, record, scheduled):
+        try:
+            send(record["kind"], unique_payload(record["kind"], record["payload"], f"-r{round_id}n{index}"))
+            with lock:
+                latencies.append(time.monotonic() - scheduled)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+        with lock:
+            finished[0] = max(finished[0], time.monotonic())
+
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(max_workers = workers, thread_name_prefix = "replay") as executor:
+        for index, (record, offset) in enumerate(zip(records, offsets)):
+            delay = start + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(timed_send, index, record, start + offset)
+    span = offsets[-1] if offsets else 0
+    elapsed = max(finished[0] - start, 1e-6)
+    return {
+        "multiplier": multiplier,
+        "events": len(records),
+        "offered_rate": len(records) / span if span > 0 else None,
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "errors": len(errors)
+    }
+
+def saturation(results, throughput_ratio = 0.9, latency_growth = 3):
+    """
+    Saturation estimate from the results of the increasing multipliers: the highest throughput
+    and the first multiplier at which the Bot doesn't keep up (throughput below the offered rate
+    or p95 latency growing over "latency_growth" times the lowest load p95).
+    """
+    if not results:
+        return {}
+    base_p95 = results[0]["p95"]
+    knee = None
+    for result in results:
+        lagging = result["offered_rate"] is not None and result["throughput"] < throughput_ratio * result["offered_rate"]
+        slow = base_p95 and result["p95"] is not None and result["p95"] > latency_growth * base_p95
+        if lagging or slow or result["errors"] > 0:
+            knee = result["multiplier"]
+            break
+    return {
+        "max_throughput": max(result["throughput"] for result in results),
+        "knee_multiplier": knee
+    }
+
+def http_target(url):
+    session = requests.Session()
+
+    def send(kind, payload):
+        response = session.post(url, json = payload, proxies = {"http": None, "https": None}, verify = False)
+        response.raise_for_status()
+
+    return send
+
+def load_bot(config_file, stub_url):
+    """
+    Import the Bot with the Webex API redirected to the stub and the Integration token faked.
+    """
+    try:
+        from .webex_api_stub import redirect_webex_api
+    except:
+        from webex_api_stub import redirect_webex_api
+
+    log_dir = tempfile.gettempdir()
+    os.environ.setdefault("LOG_FILE", os.path.join(log_dir, "replay_debug.log"))
+    os.environ.setdefault("AUDIT_LOG_FILE", os.path.join(log_dir, "replay_audit.log"))
+    os.environ.setdefault("BOT_ACCESS_TOKEN", "stub-bot-token")
+    os.environ["CFG_FILE_PATH"] = config_file
+    redirect_webex_api(stub_url)
+    import recording_bot
+
+    recording_bot.oauth.access_token = lambda *args, **kwargs: "stub-integration-token"
+    return recording_bot
+
+def webhook_target(config_file, stub_url):
+    bot_module = load_bot(config_file, stub_url)
+    local = threading.local()
+    bot_module.flask_app.test_client().get("/startup") # runs the first request initialization
+    bot_module.init_app(log_level = logging.WARNING, config_file = config_file)
+
+    def send(kind, payload):
+        if not hasattr(local, "client"):
+            local.client = bot_module.flask_app.test_client()
+        response = local.client.post("/webhook", json = payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+    return send
+
+def websocket_target(config_file, stub_url, timeout = 60):
+    bot_module = load_bot(config_file, stub_url)
+    bot_module.init_app(log_level = logging.WARNING, config_file = config_file)
+    bot = bot_module.init_bot(config_file = config_file, mode = bot_module.BotMode.WEBSOCKET)
+    bot._ack_message = lambda message_id: None # no websocket connection
+    pending = {}
+    lock = threading.Lock()
+    handle_delivery = bot._handle_websocket_delivery
+
+    def handle_and_notify(msg, delivery_key):
+        with lock:
+            future = pending.pop(delivery_key, None)
+        try:
+            handle_delivery(msg, delivery_key)
+        except Exception as e:
+            if future is not None:
+                future.set_exception(e)
+            raise
+        if future is not None:
+            future.set_result(None)
+
+    bot._handle_websocket_delivery = handle_and_notify
+
+    def send(kind, payload):
+        delivery_key = bot_module.websocket_delivery_key(payload)
+        future = concurrent.futures.Future()
+        with lock:
+            pending[delivery_key] = future
+        bot._process_incoming_websocket_message(payload)
+        try:
+            future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            with lock:
+                pending.pop(delivery_key, None)
+            raise TimeoutError(f"{delivery_key} not processed in {timeout}s")
+
+    return send
+
+def format_result(result):
+    def ms(value):
+        return f"{value * 1000:8.1f}" if value is not None else "       -"
+    offered = f"{result['offered_rate']:8.1f}" if result["offered_rate"] is not None else "       -"
+    return f"x{result['multiplier']:<6g} {result['events']:7d} {offered} {result['throughput']:8.1f} {ms(result['p50'])} {ms(result['p95'])} {ms(result['p99'])} {result['errors']:6d}"
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("payloads", help="JSON or JSON-lines file with webhook payloads")
+    parser.add_argument("-u", "--url", default = DEFAULT_WEBHOOK_URL, help=f"Bot webhook URL, default: {DEFAULT_WEBHOOK_URL}")
+    parser.add_argument("-d", "--delay", type = float, default = 0, help="Delay between the payloads in seconds")
+    parser.add_argument("-t", "--target", default = "http", choices = ["http", "webhook", "websocket"],
+        help="Load test target: http - Bot at the URL, webhook or websocket - Bot in this process with the Webex API stub, default: http")
+    parser.add_argument("-m", "--multipliers", help="Load test rate multipliers, comma separated, for example 1,2,4,8")
+    parser.add_argument("-r", "--rate", type = float, default = 10, help="Events per second for payloads without time stamp, default: 10")
+    parser.add_argument("-w", "--workers", type = int, default = 64, help="Maximum number of events in flight, default: 64")
+    parser.add_argument("-c", "--config", help="Bot configuration file for the in-process targets, default: default-config.json")
+    parser.add_argument("-l", "--stub-latency", type = float, default = 0.05, help="Webex API stub latency in seconds, default: 0.05")
+    parser.add_argument("--commands", help="Message text mix of the Webex API stub, see webex_api_stub.py")
+    args = parser.parse_args()
+
+    if args.multipliers is None and args.target == "http":
+        payloads = load_payloads(args.payloads)
+        for payload, (status, latency) in zip(payloads, replay(payloads, url = args.url, delay = args.delay)):
+            print(f"{payload.get('resource')}/{payload.get('event')}: {status}, {latency * 1000:.1f} ms")
+    else:
+        logging.basicConfig(level = logging.WARNING)
+        kind = "websocket" if args.target == "websocket" else "webhook"
+        records = [record for record in load_capture(args.payloads) if record["kind"] == kind]
+        if not records:
+            parser.error(f"no {kind} events in {args.payloads}")
+        stub = None
+        if args.target == "http":
+            send = http_target(args.url)
+        else:
+            try:
+                from .webex_api_stub import WebexApiStub, DEFAULT_COMMANDS
+            except:
+                from webex_api_stub import WebexApiStub, DEFAULT_COMMANDS
+            stub = WebexApiStub(latency = args.stub_latency, commands = args.commands or DEFAULT_COMMANDS)
+            stub_url = stub.start()
+            config_file = args.config or os.path.join(os.path.dirname(os.path.realpath(__file__)), "default-config.json")
+            target = websocket_target if args.target == "websocket" else webhook_target
+            send = target(config_file, stub_url)
+
+        results = []
+        print(f"{len(records)} {kind} events, target: {args.target}")
+        print("rate    events  offered  through      p50      p95      p99 errors")
+        for round_id, multiplier in enumerate(float(value) for value in (args.multipliers or "1").split(",")):
+            result = run_load(records, send, multiplier = multiplier, rate = args.rate, workers = args.workers, round_id = round_id)
+            results.append(result)
+            print(format_result(result))
+        estimate = saturation(results)
+        print(f"saturation throughput: {estimate['max_throughput']:.1f} events/s, " +
+            (f"knee at x{estimate['knee_multiplier']:g}" if estimate["knee_multiplier"] is not None else "no knee in the tested range"))
+        if stub is not None:
+            print(f"Webex API stub calls: {json.dumps(stub.counts, sort_keys = True)}")
+            stub.stop()
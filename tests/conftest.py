@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+@pytest.fixture(scope = "session")
+def recording_bot(tmp_path_factory):
+    """
+    The Bot module with its logs, tokens and config in a temporary directory.
+    """
+    root = tmp_path_factory.mktemp("recording_bot")
+    with open(os.path.join(SRC_DIR, "default-config.json")) as file:
+        config = json.load(file)
+    config["log_file"] = str(root / "debug.log")
+    config["audit_log_file"] = str(root / "audit.log")
+    config["token_storage_path"] = str(root / "tokens")
+    config["token_refresh"]["enabled"] = False
+    config["audit_rollup"]["path"] = str(root / "audit_rollup.db")
+    config_file = root / "config.json"
+    config_file.write_text(json.dumps(config))
+    os.environ["LOG_FILE"] = config["log_file"]
+    os.environ["AUDIT_LOG_FILE"] = config["audit_log_file"]
+    os.environ["BOT_ACCESS_TOKEN"] = "test-bot-token"
+    os.environ["CFG_FILE_PATH"] = str(config_file)
+    import recording_bot
+    return recording_bot
+
+class ContentServer(object):
+    """
+    Local HTTP server of a single file with Range support. "short_responses" responses
+    end after half of the requested range, posted bodies are kept in "posts".
+    """
+    def __init__(self, content):
+        import threading
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+        self.content = content
+        self.short_responses = 0
+        self.requests = 0
+        self.posts = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                content = server.content
+                start, end = 0, len(content) - 1
+                range_header = self.headers.get("Range")
+                if range_header:
+                    first, _, last = range_header.split("=")[1].partition("-")
+                    start, end = int(first), int(last) if last else len(content) - 1
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(content)}")
+                else:
+                    self.send_response(200)
+                body = content[start:end + 1]
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", '"content"')
+                self.end_headers()
+                if server.short_responses > 0 and len(body) > 1:
+                    server.short_responses -= 1
+                    body = body[:len(body) // 2]
+                    self.close_connection = True
+                self.wfile.write(body)
+
+            def do_POST(self):
+                server.posts.append((self.headers.get("Content-Type"), self.rfile.read(int(self.headers["Content-Length"]))))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b'{"id": "message-1"}')
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/recording"
+        self.thread = threading.Thread(target = self.httpd.serve_forever, args = (0.05,), daemon = True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def content_server():
+    server = ContentServer(os.urandom(300 * 1024))
+    yield server
+    server.close()
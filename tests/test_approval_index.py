@@ -0,0 +1,27 @@
+import json
+
+from approval_index import ApprovalIndex, load_approval_file
+
+def test_users_and_domains_are_case_insensitive():
+    index = ApprovalIndex(["User@Example.com"], ["Partner.ORG."])
+    assert index.user_approved(" user@example.COM ")
+    assert index.user_approved("anyone@partner.org")
+    assert not index.user_approved("someone@example.com")
+    assert not index.user_approved("no-domain")
+    assert not index.user_approved(None)
+    assert len(index) == 2
+
+def test_subdomains_only_when_enabled():
+    assert not ApprovalIndex(domains = ["example.com"]).user_approved("user@sub.example.com")
+    assert ApprovalIndex(domains = ["example.com"], include_subdomains = True).user_approved("user@sub.example.com")
+    assert not ApprovalIndex(domains = ["sub.example.com"], include_subdomains = True).user_approved("user@example.com")
+    assert not ApprovalIndex(domains = ["example.com"], include_subdomains = True).user_approved("user@badexample.com")
+
+def test_approval_files(tmp_path):
+    csv_file = tmp_path / "approved.csv"
+    csv_file.write_text("email\nuser@example.com,partner.org\n\n")
+    assert load_approval_file(str(csv_file)) == (["user@example.com"], ["partner.org"])
+    json_file = tmp_path / "approved.json"
+    json_file.write_text(json.dumps({"approved_users": ["a@example.com"], "approved_domains": ["example.net"]}))
+    assert load_approval_file(str(json_file)) == (["a@example.com"], ["example.net"])
+    assert load_approval_file(str(tmp_path / "missing.csv")) == ([], [])
@@ -0,0 +1,39 @@
+import time
+
+from audit_rollup import AuditRollup
+
+API_KEY = "usage-secret"
+
+def entry(status, host, requester, recordings = 0):
+    return {"status": status, "meeting_host": host, "requestor": requester,
+        "recordings": [{"recordings": [{"id": f"rec-{index}"} for index in range(recordings)]}]}
+
+def test_rollups_are_shared_by_processes(tmp_path):
+    path = str(tmp_path / "rollup.db")
+    first = AuditRollup(path = path)
+    second = AuditRollup(path = path) # another worker process with the same database
+    first.record(entry("ok", "Host@example.com", "user@example.com", recordings = 2))
+    second.record(entry("ok", "host@example.com", "other@example.com", recordings = 1))
+    second.record(entry("denied", "host@example.com", "user@example.com"))
+
+    report = first.report(days = 1)
+    assert report["totals"] == {"requests": 3, "ok": 2, "denied": 1, "recordings": 3}
+    assert list(report["days"].values()) == [report["totals"]]
+    assert report["hosts"] == [{"name": "host@example.com", "requests": 3, "ok": 2, "denied": 1, "recordings": 3}]
+    assert [item["name"] for item in report["requesters"]] == ["user@example.com", "other@example.com"]
+    assert AuditRollup(path = path).report(days = 1, top = 1)["requesters"][0]["requests"] == 2
+
+def test_old_days_are_dropped(tmp_path):
+    rollup = AuditRollup(days = 10, path = str(tmp_path / "rollup.db"))
+    rollup.record(entry("ok", "host@example.com", "user@example.com"), timestamp = time.time() - 20 * 86400)
+    rollup.record(entry("ok", "host@example.com", "user@example.com"))
+    assert rollup.report(days = 30)["totals"]["requests"] == 1
+
+def test_usage_endpoint_requires_the_api_key(recording_bot, monkeypatch):
+    client = recording_bot.flask_app.test_client()
+    client.get("/startup")
+    monkeypatch.setattr(recording_bot, "usage_options", {"api_key": API_KEY, "top": 10})
+    assert client.get("/usage", headers = {"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/usage?days=7", headers = {"Authorization": f"Bearer {API_KEY}"})
+    assert response.status_code == 200
+    assert set(response.get_json()) == {"since", "totals", "days", "hosts", "requesters"}
@@ -0,0 +1,100 @@
+import os
+import time
+
+import pytest
+
+import job_queue
+from bulk_export import parse_targets
+from job_queue import JobQueue
+from metrics import MetricsRegistry
+
+API_KEY = "export-secret"
+
+def test_parse_targets():
+    assert parse_targets("123 456 789 host@example.com; 987654321\nother@example.com, 987654321") == [
+        ("meeting", "123456789", "host@example.com"),
+        ("meeting", "987654321", None),
+        ("host", "other@example.com", "other@example.com")
+    ]
+
+@pytest.fixture
+def client(recording_bot, monkeypatch, tmp_path):
+    client = recording_bot.flask_app.test_client()
+    client.get("/startup") # runs the first request initialization
+    monkeypatch.setattr(recording_bot, "export_options", {"enabled": True, "api_key": API_KEY, "path": str(tmp_path)})
+    return client
+
+def test_export_runs_in_background(recording_bot, client, monkeypatch, tmp_path):
+    def export_to_file(export, targets, from_time, to_time, manifest_format = "csv", directory = None):
+        time.sleep(0.2)
+        path = tmp_path / f"manifest.{manifest_format}"
+        path.write_text("meeting_number\n123456789\n")
+        return str(path), {"recordings": 1, "targets": len(targets), "failed": []}
+    monkeypatch.setattr(recording_bot, "export_to_file", export_to_file)
+    headers = {"Authorization": f"Bearer {API_KEY}"}
+
+    response = client.post("/export", json = {"entries": ["123456789"], "from": "2026-10-01", "to": "2026-10-10"}, headers = headers)
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+    assert client.get(status_url, headers = headers).status_code == 202
+
+    for _ in range(50):
+        response = client.get(status_url, headers = headers)
+        if response.status_code != 202:
+            break
+        time.sleep(0.05)
+    assert response.status_code == 200
+    assert response.headers["X-Export-Recordings"] == "1"
+    assert b"123456789" in response.data
+
+def test_api_export_is_queued(recording_bot, client, monkeypatch, tmp_path):
+    exported = []
+    def export_to_file(export, targets, from_time, to_time, manifest_format = "csv", directory = None):
+        exported.append((targets, from_time, to_time))
+        path = tmp_path / f"manifest.{manifest_format}"
+        path.write_text("meeting_number\n123456789\n")
+        return str(path), {"recordings": 1, "targets": len(targets), "failed": []}
+    monkeypatch.setattr(recording_bot, "export_to_file", export_to_file)
+    monkeypatch.setattr(job_queue, "POLL_INTERVAL", 0.02)
+    queue = JobQueue(str(tmp_path / "jobs.db"), metrics = MetricsRegistry())
+    monkeypatch.setattr(recording_bot, "job_queue", queue)
+    headers = {"Authorization": f"Bearer {API_KEY}"}
+
+    response = client.post("/export", json = {"entries": ["123456789"], "from": "2026-10-01", "to": "2026-10-10"}, headers = headers)
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+    assert queue.depth() == {"api_export": 1}
+    try:
+        queue.register("api_export", recording_bot.run_api_export_job)
+        for _ in range(100):
+            response = client.get(status_url, headers = headers)
+            if response.status_code != 202:
+                break
+            time.sleep(0.05)
+    finally:
+        queue.shutdown(timeout = 5)
+    assert response.status_code == 200
+    assert exported == [([("meeting", "123456789", None)], recording_bot.parse_date("2026-10-01"),
+        recording_bot.parse_date("2026-10-10", end_of_day = True))]
+
+def test_export_requires_the_api_key(client):
+    assert client.post("/export", json = {"entries": ["123456789"]}, headers = {"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/export/" + "0" * 32, headers = {"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/export/" + "0" * 32, headers = {"Authorization": f"Bearer {API_KEY}"}).status_code == 404
+
+def test_purge_removes_only_finished_export_files(recording_bot, monkeypatch, tmp_path):
+    monkeypatch.setattr(recording_bot, "export_options", {"path": str(tmp_path)})
+    files = {
+        "export_" + "a" * 32 + ".json": '{"state": "done"}',
+        "export_" + "a" * 32 + ".csv": "meeting_number\n",
+        "export_" + "b" * 32 + ".json": '{"state": "running"}',
+        "export_notes.txt": "not created by the Bot",
+        "export_" + "c" * 32 + ".csv": "meeting_number\n"
+    }
+    old = time.time() - recording_bot.EXPORT_JOB_TTL - 60
+    for name, content in files.items():
+        (tmp_path / name).write_text(content)
+        if "c" * 32 not in name:
+            os.utime(tmp_path / name, (old, old))
+    recording_bot.purge_export_jobs()
+    assert sorted(os.listdir(tmp_path)) == ["export_" + "b" * 32 + ".json", "export_" + "c" * 32 + ".csv", "export_notes.txt"]
@@ -0,0 +1,40 @@
+import os
+import concurrent.futures
+
+from content_cache import ContentCache
+
+def leftovers(root):
+    return [name for name in os.listdir(root) if name.endswith((".lock", ".download", ".tmp"))]
+
+def test_concurrent_requests_share_one_download(content_server, tmp_path):
+    cache = ContentCache(str(tmp_path), max_bytes = 1024 * 1024)
+    with concurrent.futures.ThreadPoolExecutor(max_workers = 5) as executor:
+        results = list(executor.map(lambda _: cache.open_or_fetch("rec-1", "audio", content_server.url), range(5)))
+    for body, size in results:
+        assert size == len(content_server.content)
+        assert body[:] == content_server.content
+        body.close()
+    assert cache.stats()["files"] == 1
+    assert cache.misses == 1
+    assert leftovers(str(tmp_path)) == []
+    assert cache._key_locks == {}
+
+def test_file_larger_than_the_cache_is_streamed(content_server, tmp_path):
+    cache = ContentCache(str(tmp_path), max_bytes = 1024)
+    body, size = cache.open_or_fetch("rec-1", "audio", content_server.url)
+    assert size == len(content_server.content)
+    assert b"".join(body) == content_server.content
+    assert cache.stats()["files"] == 0
+    assert leftovers(str(tmp_path)) == []
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = ContentCache(str(tmp_path), max_bytes = 25)
+    cache.put_chunks("rec-1", "audio", [b"1" * 10])
+    cache.put_chunks("rec-2", "audio", [b"2" * 10])
+    cache.get("rec-1", "audio")
+    cache.put_chunks("rec-3", "audio", [b"3" * 10])
+    assert cache.get("rec-2", "audio") == (None, None)
+    assert cache.get("rec-1", "audio")[1] == 10
+    mapped, size = cache.open("rec-3", "audio")
+    assert mapped[:] == b"3" * 10
+    mapped.close()
@@ -0,0 +1,36 @@
+import time
+
+from delivery_dedupe import DeliveryDedupe, webhook_delivery_key, websocket_delivery_key
+
+def test_duplicates_within_the_ttl_are_skipped():
+    dedupe = DeliveryDedupe(ttl = 60)
+    assert dedupe.first_seen("messages:created:1")
+    assert not dedupe.first_seen("messages:created:1")
+    dedupe.forget("messages:created:1")
+    assert dedupe.first_seen("messages:created:1")
+    assert dedupe.first_seen(None)
+
+def test_expired_and_oldest_ids_are_dropped():
+    dedupe = DeliveryDedupe(ttl = 0.05, max_entries = 2)
+    assert dedupe.first_seen("a")
+    time.sleep(0.1)
+    assert dedupe.first_seen("a")
+    dedupe = DeliveryDedupe(ttl = 60, max_entries = 2)
+    for key in ("a", "b", "c"):
+        dedupe.first_seen(key)
+    assert len(dedupe) <= 2
+
+def test_processes_share_the_store(tmp_path):
+    path = str(tmp_path / "dedupe.db")
+    first = DeliveryDedupe(ttl = 60, store_path = path)
+    second = DeliveryDedupe(ttl = 60, store_path = path) # another Bot process
+    assert first.first_seen("messages:created:1")
+    assert not second.first_seen("messages:created:1")
+    first.forget("messages:created:1")
+    assert second.first_seen("messages:created:1")
+
+def test_delivery_keys():
+    assert webhook_delivery_key({"resource": "messages", "event": "created", "data": {"id": "m1"}}) == "messages:created:m1"
+    assert webhook_delivery_key({"resource": "messages"}) is None
+    assert websocket_delivery_key({"data": {"activity": {"verb": "post", "id": "a1"}}}) == "post:a1"
+    assert websocket_delivery_key({"data": {}}) is None
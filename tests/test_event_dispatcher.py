@@ -0,0 +1,48 @@
+import time
+import threading
+
+from event_dispatcher import KeyedDispatcher
+from metrics import MetricsRegistry
+
+def test_events_of_a_key_run_in_order():
+    dispatcher = KeyedDispatcher(workers = 4, metrics = MetricsRegistry())
+    processed = {"room-1": [], "room-2": []}
+    done = threading.Semaphore(0)
+    def handle(room, index):
+        time.sleep(0.001 * (5 - index))
+        processed[room].append(index)
+        done.release()
+    try:
+        for index in range(5):
+            for room in processed:
+                assert dispatcher.submit(room, handle, room, index)
+        for _ in range(10):
+            assert done.acquire(timeout = 5)
+    finally:
+        dispatcher.shutdown()
+    assert processed == {"room-1": [0, 1, 2, 3, 4], "room-2": [0, 1, 2, 3, 4]}
+
+def test_failed_event_does_not_block_the_key():
+    dispatcher = KeyedDispatcher(workers = 1, metrics = MetricsRegistry())
+    done = threading.Event()
+    def fail():
+        raise ValueError("failed")
+    try:
+        dispatcher.submit("room-1", fail)
+        dispatcher.submit("room-1", done.set)
+        assert done.wait(5)
+    finally:
+        dispatcher.shutdown()
+
+def test_events_over_the_limit_are_rejected():
+    metrics = MetricsRegistry()
+    dispatcher = KeyedDispatcher(workers = 1, max_pending = 2, metrics = metrics)
+    release = threading.Event()
+    try:
+        assert dispatcher.submit("room-1", release.wait, 5)
+        assert dispatcher.submit("room-2", print)
+        assert not dispatcher.submit("room-3", print)
+    finally:
+        release.set()
+        dispatcher.shutdown()
+    assert metrics.snapshot()["counters"]["dispatcher.rejected"] == 1
@@ -0,0 +1,44 @@
+from fair_scheduler import FairScheduler, MIN_WEIGHT
+from metrics import MetricsRegistry
+
+def paused_scheduler(**options):
+    # without workers the jobs stay queued and _pick() can be called directly
+    return FairScheduler(workers = 0, metrics = MetricsRegistry(), **options)
+
+def picked(scheduler, count):
+    with scheduler._cond:
+        jobs = [scheduler._pick() for _ in range(count)]
+    return [(job.user, job.args[0]) if job is not None else None for job in jobs]
+
+def test_burst_of_one_user_does_not_starve_the_others():
+    scheduler = paused_scheduler(quantum = 10)
+    for index in range(3):
+        scheduler.submit("Busy@example.com", 10, print, f"busy-{index}")
+    scheduler.submit("other@example.com", 10, print, "other-0")
+    assert picked(scheduler, 4) == [("busy@example.com", "busy-0"), ("other@example.com", "other-0"),
+        ("busy@example.com", "busy-1"), ("busy@example.com", "busy-2")]
+    assert picked(scheduler, 1) == [None]
+
+def test_heavy_requests_are_capped():
+    scheduler = paused_scheduler(quantum = 100, heavy_cost = 20, max_heavy = 1)
+    scheduler.submit("first@example.com", 50, print, "heavy-1")
+    scheduler.submit("second@example.com", 50, print, "heavy-2")
+    scheduler.submit("third@example.com", 1, print, "light")
+    scheduler._heavy_running = 1
+    assert picked(scheduler, 2) == [("third@example.com", "light"), None]
+    scheduler._heavy_running = 0
+    assert picked(scheduler, 1) == [("first@example.com", "heavy-1")]
+
+def test_zero_weight_is_clamped():
+    scheduler = paused_scheduler(quantum = 10, weights = {"Slow@example.com": 0})
+    assert scheduler.weights["slow@example.com"] == MIN_WEIGHT
+    scheduler.submit("slow@example.com", 1, print, "slow")
+    assert picked(scheduler, 1) == [("slow@example.com", "slow")]
+
+def test_jobs_run_on_the_workers():
+    scheduler = FairScheduler(workers = 2, metrics = MetricsRegistry())
+    try:
+        futures = [scheduler.submit(f"user{index}@example.com", 1, lambda value: value * 2, index) for index in range(5)]
+        assert [future.result(timeout = 5) for future in futures] == [0, 2, 4, 6, 8]
+    finally:
+        scheduler.shutdown()
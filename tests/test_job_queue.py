@@ -0,0 +1,93 @@
+import time
+import threading
+
+import pytest
+
+import job_queue
+from job_queue import JobQueue
+from metrics import MetricsRegistry
+
+@pytest.fixture(autouse = True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(job_queue, "POLL_INTERVAL", 0.02)
+
+def open_queue(tmp_path, **options):
+    return JobQueue(str(tmp_path / "jobs.db"), metrics = MetricsRegistry(), **options)
+
+def wait_for(condition, timeout = 5):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.01)
+
+def test_jobs_of_a_group_run_in_order(tmp_path):
+    queue = open_queue(tmp_path, workers = 4)
+    done = []
+    def handle(payload):
+        time.sleep(0.02 if payload["index"] == 0 else 0)
+        done.append((payload["group"], payload["index"]))
+    queue.register("event", handle)
+    try:
+        for index in range(4):
+            for group in ("room-1", "room-2"):
+                queue.enqueue("event", {"group": group, "index": index}, group = group)
+        wait_for(lambda: len(done) == 8)
+    finally:
+        queue.shutdown(timeout = 5)
+    for group in ("room-1", "room-2"):
+        assert [index for item_group, index in done if item_group == group] == [0, 1, 2, 3]
+
+def test_duplicate_keys_are_not_queued(tmp_path):
+    queue = open_queue(tmp_path, workers = 0)
+    assert queue.enqueue("event", {}, key = "message-1") is not None
+    assert queue.enqueue("event", {}, key = "message-1") is None
+    assert queue.depth() == {"event": 1}
+    queue.shutdown()
+
+def test_failing_job_is_retried_and_dead_lettered(tmp_path):
+    queue = open_queue(tmp_path, workers = 1, max_attempts = 2, retry_delay = 0.01)
+    attempts = []
+    def fail(payload):
+        attempts.append(payload)
+        raise ValueError("handler failed")
+    queue.register("event", fail)
+    try:
+        job_id = queue.enqueue("event", {"id": 1})
+        wait_for(lambda: queue.stats()["dead"] == 1)
+        assert len(attempts) == 2
+        assert queue.dead_letters()[0]["error"] == "ValueError: handler failed"
+        queue.register("event", attempts.append)
+        assert queue.requeue(job_id)
+        wait_for(lambda: queue.stats()["dead"] == 0 and queue.depth() == {})
+        assert len(attempts) == 3
+    finally:
+        queue.shutdown(timeout = 5)
+
+def test_job_of_a_dead_process_resumes(tmp_path):
+    crashed = open_queue(tmp_path, workers = 0, lease_time = 0.05)
+    crashed.register("event", lambda payload: None)
+    crashed.enqueue("event", {"id": 1})
+    assert crashed._lease() is not None # leased, then the process dies
+    done = []
+    restarted = open_queue(tmp_path, workers = 1)
+    restarted.register("event", done.append)
+    try:
+        wait_for(lambda: done == [{"id": 1}])
+    finally:
+        restarted.shutdown(timeout = 5)
+        crashed.shutdown()
+
+def test_shutdown_releases_unfinished_jobs(tmp_path):
+    queue = open_queue(tmp_path, workers = 1)
+    started = threading.Event()
+    release = threading.Event()
+    def slow(payload):
+        started.set()
+        release.wait(5)
+    queue.register("export", slow)
+    queue.enqueue("export", {"id": 1})
+    assert started.wait(5)
+    assert queue.shutdown(timeout = 0.05) == 1
+    row = queue._connection().execute("SELECT state, attempts, lease_owner FROM jobs").fetchone()
+    assert row == ("ready", 0, None)
+    release.set()
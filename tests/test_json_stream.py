@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from json_stream import iter_items, JSONStreamError
+
+DOCUMENT = {"notice": {"nested": [1, 2]}, "items": [
+    {"id": "rec-1", "topic": "Porada týmu", "durationSeconds": 1234567, "links": {"audio": "https://example.com/a"}},
+    {"id": "rec-2", "topic": "Weekly \"sync\"", "durationSeconds": 7, "links": None}
+], "after": True}
+
+def chunked(text, size):
+    data = text.encode("utf-8")
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1024])
+def test_items_match_the_full_parser_for_any_chunk_size(size):
+    text = json.dumps(DOCUMENT, ensure_ascii = False, indent = 1)
+    assert list(iter_items(chunked(text, size))) == DOCUMENT["items"]
+
+def test_fields_are_projected():
+    items = iter_items(chunked(json.dumps(DOCUMENT), 5), fields = ("id", "durationSeconds"))
+    assert list(items) == [{"id": "rec-1", "durationSeconds": 1234567}, {"id": "rec-2", "durationSeconds": 7}]
+
+def test_empty_and_missing_lists():
+    assert list(iter_items([b"{}"])) == []
+    assert list(iter_items([b'{"items": []}'])) == []
+    assert list(iter_items([b'{"other": [1, 2]}'])) == []
+
+def test_malformed_documents():
+    with pytest.raises(JSONStreamError):
+        list(iter_items([b'["not", "an", "object"]']))
+    with pytest.raises(JSONStreamError):
+        list(iter_items([b'{"items": [{"id": 1}, {"id": ']))
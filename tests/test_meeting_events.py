@@ -0,0 +1,33 @@
+import time
+import threading
+
+from meeting_model import Meeting, Recording
+
+def test_ended_meeting_drops_the_meeting_lists(recording_bot):
+    cache = recording_bot.tenant_registry.default.recording_cache
+    meeting = Meeting("instance-1", meeting_number = "123456789", meeting_series_id = "series-1", start_epoch = time.time() - 60)
+    cache.put_meeting_list("123456789", "host@example.com", 7, [meeting])
+    cache.put_recordings("instance-1", [])
+    result = recording_bot.handle_meeting_event({"resource": "meetings", "event": "ended",
+        "data": {"id": "instance-1", "meetingNumber": "123456789", "meetingSeriesId": "series-1"}})
+    assert "invalidated" in result
+    assert cache.get_meeting_list("123456789", "host@example.com", 7) == (None, None)
+    assert cache.get_recordings("instance-1") is None
+
+def test_created_recording_refreshes_a_known_meeting(recording_bot, monkeypatch):
+    cache = recording_bot.tenant_registry.default.recording_cache
+    meeting = Meeting("instance-2", meeting_number = "987654321", host_email = "host@example.com", start_epoch = time.time() - 60)
+    cache.put_meeting_list("987654321", "host@example.com", 7, [meeting])
+    cache.put_recordings("instance-2", [])
+    refreshed = threading.Event()
+    def prefetch_meeting_recordings(meeting_id, host_email):
+        cache.put_recordings(meeting_id, [Recording("rec-1")])
+        refreshed.set()
+    monkeypatch.setattr(recording_bot, "prefetch_meeting_recordings", prefetch_meeting_recordings)
+    result = recording_bot.handle_meeting_event({"resource": "recordings", "event": "created",
+        "data": {"meetingId": "instance-2"}})
+    assert "refreshing" in result
+    assert refreshed.wait(5)
+    assert [rec.id for rec in cache.get_recordings("instance-2")] == ["rec-1"]
+    assert "cache invalidated" in recording_bot.handle_meeting_event({"resource": "recordings", "event": "created",
+        "data": {"meetingId": "unknown"}})
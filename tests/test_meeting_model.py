@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from meeting_model import Meeting, Recording, parse_timestamp
+
+def test_parse_timestamp_matches_the_full_parser():
+    for stamp in ("2026-10-19T08:30:00Z", "2024-02-29T23:59:59.250Z", "2026-10-19T10:30:00+02:00", "1969-12-31T23:00:00-01:00"):
+        assert parse_timestamp(stamp) == datetime.fromisoformat(stamp.replace("Z", "+00:00")).timestamp()
+    assert parse_timestamp("2026-10-19") == datetime.fromisoformat("2026-10-19T00:00:00+00:00").timestamp()
+    assert parse_timestamp(None) is None
+
+def test_meeting_from_api_item():
+    meeting = Meeting.from_dict({"id": "instance-1", "meetingNumber": "123456789", "meetingSeriesId": "series-1",
+        "title": "Weekly", "start": "2026-10-19T08:30:00Z", "hostEmail": "host@example.com", "state": "ended"})
+    assert (meeting.meeting_number, meeting.meeting_series_id, meeting.host_email) == ("123456789", "series-1", "host@example.com")
+    assert meeting.start_epoch == parse_timestamp("2026-10-19T08:30:00Z")
+
+def test_recording_links_get_file_names():
+    recording = Recording.from_dict({"id": "rec-1", "meetingId": "instance-1", "topic": "Weekly sync",
+        "timeRecorded": "2026-10-19T08:31:00Z", "durationSeconds": 3725,
+        "temporaryDirectDownloadLinks": {"audioDownloadLink": "https://example.com/download/abc",
+            "recordingDownloadLink": "https://example.com/download/video.mp4", "expiration": "2026-10-19T11:31:00Z"}})
+    assert recording.audio_url == "https://example.com/download/abc/Weekly%20sync.mp3"
+    assert recording.video_url == "https://example.com/download/video.mp4"
+    assert recording.duration == "62:05"
+    assert recording.has_links
+    assert not Recording("rec-2").has_links
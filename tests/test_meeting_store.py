@@ -0,0 +1,61 @@
+import time
+import sqlite3
+
+from meeting_model import Meeting
+from meeting_store import MeetingStore, plan_sync
+
+DAY = 86400
+
+def store_with_meeting(tmp_path, start_epoch):
+    store = MeetingStore(str(tmp_path / "meetings.db"), settle_time = DAY)
+    meeting = Meeting("instance-1", meeting_number = "123456789", meeting_series_id = "series-1", title = "Weekly",
+        host_email = "host@example.com", start_epoch = start_epoch)
+    store.merge("default", "123456789", "host@example.com", "series-1", "host@example.com", [meeting], start_epoch - DAY, time.time())
+    return store
+
+def test_plan_sync_continues_the_synced_range():
+    now = 100 * DAY
+    assert plan_sync(None, now - 30 * DAY, now) == ([(now - 30 * DAY, now)], now - 30 * DAY)
+    series = {"covered_from": now - 10 * DAY, "covered_to": now - DAY}
+    ranges, covered_from = plan_sync(series, now - 30 * DAY, now, settle_time = DAY)
+    assert ranges == [(now - 30 * DAY, now - 10 * DAY), (now - 2 * DAY, now)]
+    assert covered_from == now - 30 * DAY
+    # a range older than the window is synced again as a whole
+    assert plan_sync({"covered_from": now - 60 * DAY, "covered_to": now - 40 * DAY}, now - 30 * DAY, now) == \
+        ([(now - 30 * DAY, now)], now - 30 * DAY)
+
+def test_settled_meeting_without_recordings_is_final(tmp_path):
+    store = store_with_meeting(tmp_path, time.time() - 2 * DAY)
+    assert store.recording_ids("instance-1") is None
+    assert store.put_recording_ids("instance-1", [])
+    assert store.recording_ids("instance-1") == []
+    # synced again with the series, the marker stays
+    store.merge("default", "123456789", "host@example.com", "series-1", "host@example.com", store.meetings("series-1", 0), 0, time.time())
+    assert store.recording_ids("instance-1") == []
+    store.forget_recordings("instance-1")
+    assert store.recording_ids("instance-1") is None
+
+def test_recording_ids_are_replaced(tmp_path):
+    store = store_with_meeting(tmp_path, time.time() - 2 * DAY)
+    assert store.put_recording_ids("instance-1", [{"id": "rec-1", "timeRecorded": "2026-01-01T10:00:00Z"}])
+    assert store.put_recording_ids("instance-1", [{"id": "rec-2", "timeRecorded": "2026-01-01T11:00:00Z"}])
+    assert store.recording_ids("instance-1") == [{"id": "rec-2", "timeRecorded": "2026-01-01T11:00:00Z"}]
+
+def test_recent_or_unknown_meeting_is_not_stored(tmp_path):
+    store = store_with_meeting(tmp_path, time.time() - 3600)
+    assert not store.put_recording_ids("instance-1", [])
+    assert store.recording_ids("instance-1") is None
+    assert not store.put_recording_ids("unknown", [{"id": "rec-1"}])
+
+def test_older_database_is_migrated(tmp_path):
+    path = str(tmp_path / "old.db")
+    connection = sqlite3.connect(path)
+    connection.execute("""CREATE TABLE instances (id TEXT PRIMARY KEY, series_id TEXT NOT NULL, host_email TEXT,
+        meeting_number TEXT, title TEXT, start TEXT, start_epoch REAL NOT NULL, host_user_id TEXT, state TEXT)""")
+    connection.execute("INSERT INTO instances (id, series_id, start_epoch) VALUES ('instance-1', 'series-1', ?)", (time.time() - 2 * DAY,))
+    connection.commit()
+    connection.close()
+    store = MeetingStore(path, settle_time = DAY)
+    assert store.recording_ids("instance-1") is None
+    assert store.put_recording_ids("instance-1", [])
+    assert store.recording_ids("instance-1") == []
@@ -0,0 +1,77 @@
+import json
+from types import SimpleNamespace
+
+import requests
+
+from meeting_model import Meeting, Recording
+from progressive_reply import ProgressiveReply
+
+class FakeTeamsAPI(object):
+    """
+    Records the messages created and edited by ProgressiveReply.
+    """
+    def __init__(self):
+        self.created = []
+        self.edits = []
+        self.messages = SimpleNamespace(create = self._create)
+        self._session = SimpleNamespace(base_url = "https://webexapis.example.com/v1/", put = self._put)
+
+    def _create(self, **kwargs):
+        self.created.append(kwargs)
+        return SimpleNamespace(id = f"message-{len(self.created)}")
+
+    def _put(self, url, json = None):
+        self.edits.append((url, json))
+
+def block(size):
+    return {"type": "TextBlock", "text": "x" * size}
+
+def test_pages_are_split_by_card_size():
+    api = FakeTeamsAPI()
+    reply = ProgressiveReply(api, "room", "Title", max_card_bytes = 300, edit_interval = 0)
+    reply.start("searching")
+    for index in range(5):
+        reply.add(block(100), f"line {index}")
+    reply.finish("done")
+
+    pages = api.created[1:]
+    assert [page["markdown"].split("  \n")[0] for page in pages] == ["Title", "Title (2)", "Title (3)"]
+    assert sum(len(page["markdown"].split("  \n")) - 1 for page in pages) == 5
+    assert api.edits[-1][1]["markdown"] == "done"
+
+def test_request_error_finishes_the_placeholder(recording_bot, monkeypatch):
+    meetings = [Meeting(f"meeting-{index}", title = "Weekly", host_email = "host@example.com") for index in range(3)]
+    def get_meeting_recordings(meeting_id, host_email):
+        if meeting_id == "meeting-1":
+            raise requests.ConnectionError("connection reset")
+        return [Recording(f"rec-{meeting_id}", meeting_id = meeting_id, topic = "Weekly", time_recorded = "2026-10-01T10:00:00Z")]
+    monkeypatch.setattr(recording_bot, "get_meeting_recordings", get_meeting_recordings)
+    api = FakeTeamsAPI()
+
+    recordings, complete = recording_bot.stream_meeting_recordings(api, "room", meetings[0], meetings, "host@example.com")
+
+    assert complete is False
+    assert [rec.id for rec in recordings] == ["rec-meeting-0"]
+    final_text = api.edits[-1][1]["markdown"]
+    assert recording_bot.locale_strings["loc_partial"] in final_text
+
+def test_batch_response_is_paginated_by_card_size(recording_bot, monkeypatch):
+    monkeypatch.setitem(recording_bot.progressive_options, "max_card_bytes", 2000)
+    results = []
+    for index in range(10):
+        meeting = Meeting(f"meeting-{index}", title = f"Series {index}", host_email = "host@example.com")
+        recordings = [Recording(f"rec-{index}-{number}", meeting_id = meeting.id, topic = f"Series {index}",
+            time_recorded = "2026-10-01T10:00:00Z", audio_url = f"https://example.com/{index}-{number}/" + "a" * 200,
+            video_url = "https://example.com/" + "v" * 200, expiration = "2026-10-02T10:00:00Z") for number in range(5)]
+        results.append((f"12345678{index}", (meeting, recordings, True)))
+    results.append(("987654321", "Meeting not found"))
+
+    pages = recording_bot.format_batch_response(results)
+
+    assert len(pages) > 1
+    for page in pages:
+        assert len(json.dumps(page.attachments)) < 2000 + 1500
+    markdown = "\n".join(page.markdown for page in pages)
+    cards = json.dumps([page.attachments for page in pages])
+    assert all(f"https://example.com/{index}-4/" in cards for index in range(10))
+    assert "**987654321**: Meeting not found" in markdown
@@ -0,0 +1,28 @@
+import types
+
+from webexteamssdk.models.immutable import Message
+
+def test_single_meeting_defaults(recording_bot):
+    assert recording_bot.parse_rec_text("123 456 789", "me@example.com") == ("123456789", "me@example.com", recording_bot.MEETING_REC_RANGE)
+
+def test_host_and_days_back(recording_bot):
+    assert recording_bot.parse_rec_text(" 123456789 host@example.com 30", "me@example.com") == ("123456789", "host@example.com", 30)
+
+def test_more_meetings_in_one_message(recording_bot):
+    message = Message({"text": "123456789 host@example.com 5; 987654321\n555666777 other@example.com 7"})
+    assert recording_bot.parse_rec_requests(message.text, message, "me@example.com") == [
+        ("123456789", "host@example.com", 5),
+        ("987654321", "me@example.com", recording_bot.MEETING_REC_RANGE),
+        ("555666777", "other@example.com", 7)
+    ]
+
+def test_commands_are_matched_by_the_first_word(recording_bot):
+    commands = [types.SimpleNamespace(command_keyword = keyword, card_callback_keyword = None) for keyword in ("rec", "help", "export", "usage")]
+    commands.append(types.SimpleNamespace(command_keyword = None, card_callback_keyword = "details"))
+    bot = types.SimpleNamespace(commands = commands)
+    find = lambda message, callback = False: getattr(recording_bot.WebexBotShare.find_command(bot, message, callback), "command_keyword", "-")
+    assert find("export director@acme.com 2026-10-01") == "export"
+    assert find("  Usage 30 records@acme.com") == "usage"
+    assert find("rec 123456789 export@acme.com") == "rec"
+    assert find("records please") == "-"
+    assert recording_bot.WebexBotShare.find_command(bot, "details", True).card_callback_keyword == "details"
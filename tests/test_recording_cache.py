@@ -0,0 +1,84 @@
+import json
+import time
+
+from meeting_model import Meeting, Recording
+from recording_cache import RecordingCache, MEETING_LIST_TTL, EVENTS_MEETING_LIST_TTL
+from prefetcher import RecordingPrefetcher
+from tenants import TenantRegistry, current_tenant
+
+DAY = 86400
+
+def meeting(meeting_id, days_ago, series_id = "series-1"):
+    return Meeting(meeting_id, meeting_number = "123456789", meeting_series_id = series_id, start_epoch = time.time() - days_ago * DAY)
+
+def test_meeting_list_serves_shorter_windows():
+    cache = RecordingCache()
+    cache.put_meeting_list("123 456 789", "Host@example.com", 10, [meeting("old", 8), meeting("new", 1)])
+    meetings, _ = cache.get_meeting_list("123456789", "host@example.com", 5)
+    assert [item.id for item in meetings] == ["new"]
+    assert cache.get_meeting_list("123456789", "host@example.com", 20) == (None, None)
+    assert cache.find_meeting("old").id == "old"
+    assert cache.invalidate_series(series_id = "series-1") == 1
+    assert cache.get_meeting_list("123456789", "host@example.com", 5) == (None, None)
+
+def test_meeting_list_expires():
+    cache = RecordingCache(meeting_list_ttl = 60)
+    cache.put_meeting_list("123456789", "host@example.com", 10, [meeting("new", 1)], fetched_at = time.time() - 61)
+    assert cache.get_meeting_list("123456789", "host@example.com", 5) == (None, None)
+
+def test_recordings_are_valid_until_the_links_expire():
+    cache = RecordingCache(link_expiry_margin = 900, empty_recordings_ttl = 120)
+    expiration = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 3600))
+    cache.put_recordings("instance-1", [Recording("rec-1", expiration = expiration)])
+    assert 2600 < cache.recordings_valid_for("instance-1") <= 2700
+    assert [rec.id for rec in cache.get_recordings("instance-1")] == ["rec-1"]
+    cache.put_recordings("instance-2", [])
+    assert cache.get_recordings("instance-2") == []
+    assert cache.recordings_valid_for("instance-2") <= 120
+    expired = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 600))
+    cache.put_recordings("instance-3", [Recording("rec-3", expiration = expired)])
+    assert cache.get_recordings("instance-3") is None
+
+def test_meeting_list_ttl_depends_on_the_meeting_events(recording_bot):
+    assert recording_bot.recording_cache_options({})["meeting_list_ttl"] == MEETING_LIST_TTL
+    assert recording_bot.recording_cache_options({"meeting_events": True})["meeting_list_ttl"] == EVENTS_MEETING_LIST_TTL
+    assert recording_bot.recording_cache_options({"recording_cache": {"meeting_list_ttl": 5}})["meeting_list_ttl"] == 5
+
+def test_prefetch_round_keeps_the_api_budget():
+    cache = RecordingCache()
+    fetched = []
+    def fetch_meeting_list(meeting_num, host_email, days_back):
+        return [meeting(f"{meeting_num}-{index}", index) for index in range(5)]
+    def fetch_recordings(meeting_id, host_email):
+        fetched.append(meeting_id)
+        return [Recording(f"rec-{meeting_id}")]
+    prefetcher = RecordingPrefetcher(cache, fetch_meeting_list, fetch_recordings, api_budget = 10)
+    prefetcher.note_request("111", "first@example.com", 7, timestamp = time.time() - 60)
+    prefetcher.note_request("222", "second@example.com", 7)
+    calls = prefetcher.run_once()
+    assert calls <= 10
+    # the most recently requested series and its newest meetings first
+    assert fetched[:2] == ["222-0", "222-1"]
+
+def test_prefetch_runs_each_series_as_its_tenant(tmp_path):
+    registry = TenantRegistry()
+    registry.configure({"orgs": [{"name": "acme", "org_id": "acme-org"}]})
+    fetched = []
+    def fetch_meeting_list(meeting_num, host_email, days_back):
+        fetched.append((current_tenant().name, meeting_num))
+        return [meeting(f"{meeting_num}-0", 0)]
+    def fetch_recordings(meeting_id, host_email):
+        current_tenant().recording_cache.put_recordings(meeting_id, [])
+        return []
+    audit_log = tmp_path / "audit.log"
+    audit_log.write_text("".join(f"INFO JSON: {json.dumps(record)}\n" for record in [
+        {"status": "permitted", "days_back": 7, "meeting_number": "111", "meeting_host": "first@example.com"},
+        {"status": "permitted", "days_back": 7, "meeting_number": "222", "meeting_host": "second@example.com", "tenant": "acme"},
+        {"status": "permitted", "days_back": 7, "meeting_number": "333", "meeting_host": "third@example.com", "tenant": "gone"}]))
+    prefetcher = RecordingPrefetcher(None, fetch_meeting_list, fetch_recordings, audit_log_file = str(audit_log), tenants = registry)
+    assert prefetcher.learn_from_audit_log() == 3
+    prefetcher.note_request("111", "first@example.com", 7, tenant = "acme")
+    prefetcher.run_once()
+    assert sorted(fetched) == [("acme", "111"), ("acme", "222"), ("default", "111")]
+    assert registry.get("acme").recording_cache.recordings_valid_for("222-0") > 0
+    assert registry.default.recording_cache.recordings_valid_for("222-0") == 0
@@ -0,0 +1,42 @@
+import hashlib
+
+import pytest
+
+import recording_download
+from recording_download import download_recording, stream_recording, probe, DownloadError
+
+def test_probe(content_server):
+    assert probe(content_server.url) == (len(content_server.content), True, '"content"')
+
+def test_parallel_segments(content_server, tmp_path):
+    destination = str(tmp_path / "recording.mp3")
+    result = download_recording(content_server.url, destination, segment_size = 64 * 1024, parallel_threshold = 1)
+    with open(destination, "rb") as file:
+        assert file.read() == content_server.content
+    assert result.sha256 == hashlib.sha256(content_server.content).hexdigest()
+    assert not (tmp_path / "recording.mp3.part.json").exists()
+
+def test_short_segment_responses_are_retried(content_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(recording_download, "RETRY_DELAY", 0)
+    content_server.short_responses = 3
+    destination = str(tmp_path / "recording.mp3")
+    download_recording(content_server.url, destination, segment_size = 64 * 1024, parallel_threshold = 1, segments = 1)
+    with open(destination, "rb") as file:
+        assert file.read() == content_server.content
+
+def test_segments_fail_after_the_retries(content_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(recording_download, "RETRY_DELAY", 0)
+    content_server.short_responses = 1000
+    with pytest.raises(DownloadError):
+        download_recording(content_server.url, str(tmp_path / "recording.mp3"), segment_size = 64 * 1024,
+            parallel_threshold = 1, segments = 1, retries = 2)
+
+def test_stream_resumes_a_short_response(content_server, monkeypatch):
+    monkeypatch.setattr(recording_download, "RETRY_DELAY", 0)
+    content_server.short_responses = 1
+    assert b"".join(stream_recording(content_server.url, chunk_size = 16 * 1024)) == content_server.content
+
+def test_checksum_mismatch(content_server, tmp_path):
+    with pytest.raises(DownloadError):
+        download_recording(content_server.url, str(tmp_path / "recording.mp3"), expected_sha256 = "0" * 64)
+    assert not (tmp_path / "recording.mp3").exists()
@@ -0,0 +1,31 @@
+import types
+
+from meeting_model import Meeting
+
+def share_activity(actor_email):
+    return {"actor": {"emailAddress": actor_email}, "object": {"meetingInstanceId": "instance-1"}}
+
+def share_reply(recording_bot, monkeypatch, known_meeting, actor_email):
+    fetched = []
+    def get_meeting_recordings(meeting_id, host_email):
+        fetched.append((meeting_id, host_email))
+        return []
+    meeting = Meeting("instance-1", meeting_number = "123456789", title = "Weekly", host_email = "host@example.com")
+    monkeypatch.setattr(recording_bot, "find_known_meeting", lambda meeting_id: meeting if known_meeting else None)
+    monkeypatch.setattr(recording_bot, "get_meeting_details", lambda meeting_id: meeting)
+    monkeypatch.setattr(recording_bot, "get_meeting_recordings", get_meeting_recordings)
+    monkeypatch.setattr(recording_bot, "send_audio_files", lambda actor_email, recordings: None)
+    bot = types.SimpleNamespace(respond_only_to_host = True)
+    reply = recording_bot.WebexBotShare.recording_share_reply(bot, share_activity(actor_email))
+    return reply, fetched
+
+def test_share_by_non_host_fetches_nothing(recording_bot, monkeypatch):
+    reply, fetched = share_reply(recording_bot, monkeypatch, False, "guest@example.com")
+    assert fetched == []
+    assert reply.markdown == recording_bot.locale_strings["loc_host_only"]
+
+def test_share_of_known_meeting_uses_the_stored_host(recording_bot, monkeypatch):
+    reply, fetched = share_reply(recording_bot, monkeypatch, True, "Host@example.com")
+    assert fetched == [("instance-1", "host@example.com")]
+    reply, fetched = share_reply(recording_bot, monkeypatch, False, "host@example.com")
+    assert fetched == [("instance-1", "host@example.com")]
@@ -0,0 +1,43 @@
+import io
+
+import pytest
+
+from recording_upload import ChunkReader, ThrottledFile, RecordingUploader, UploadError
+
+def test_chunk_reader_spans_chunks():
+    reader = ChunkReader([b"abc", b"defgh", b"ij"], 10)
+    assert reader.read(4) == b"abcd"
+    assert reader.len == 6
+    assert reader.read(100) == b"efghij"
+    assert reader.read(1) == b""
+
+def test_chunk_reader_detects_a_short_source():
+    reader = ChunkReader([b"abc"], 5)
+    with pytest.raises(UploadError):
+        reader.read()
+
+def test_throttled_file_limits_the_length():
+    reader = ThrottledFile(io.BytesIO(b"0123456789"), 4)
+    assert reader.read() == b"0123"
+    assert reader.read() == b""
+
+def test_recording_is_streamed_into_the_message(content_server):
+    uploader = RecordingUploader("bot-token", messages_url = content_server.url.replace("/recording", "/messages"))
+    try:
+        message = uploader.send_recording(content_server.url, "Weekly.mp3", to_person_email = "user@example.com").result(timeout = 10)
+    finally:
+        uploader.shutdown()
+    assert message == {"id": "message-1"}
+    content_type, body = content_server.posts[0]
+    assert content_type.startswith("multipart/form-data")
+    assert b"user@example.com" in body
+    assert content_server.content in body
+
+def test_large_recording_is_refused(content_server):
+    uploader = RecordingUploader("bot-token", max_file_size = 1024, messages_url = content_server.url)
+    try:
+        with pytest.raises(UploadError):
+            uploader.send_recording(content_server.url, "Weekly.mp3", to_person_email = "user@example.com").result(timeout = 10)
+    finally:
+        uploader.shutdown()
+    assert content_server.posts == []
@@ -0,0 +1,38 @@
+import threading
+import concurrent.futures
+
+import pytest
+
+from single_flight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    def fetch(value):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return [value]
+    with concurrent.futures.ThreadPoolExecutor(max_workers = 4) as executor:
+        leader = executor.submit(flight.do, "key", fetch, 1)
+        assert started.wait(5)
+        followers = [executor.submit(flight.do, "key", fetch, 2) for _ in range(3)]
+        while flight.stats()["shared"] < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        results = [leader.result()] + [future.result() for future in followers]
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "shared": 3}
+
+def test_exception_is_shared_and_the_key_released():
+    flight = SingleFlight("test")
+    def fail():
+        raise ValueError("failed")
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "ok") == "ok"
+    assert flight.do("other", lambda: "ok") == "ok"
+    assert flight.stats()["executed"] == 3
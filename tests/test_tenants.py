@@ -0,0 +1,39 @@
+import base64
+
+from tenants import Tenant, TenantRegistry, org_uuid, tenant_context, current_tenant, run_as
+
+ORG_UUID = "1eb65fdf-9643-417f-9974-ad72cae0e10f"
+
+def test_org_uuid_of_api_and_websocket_ids():
+    api_id = base64.b64encode(f"ciscospark://us/ORGANIZATION/{ORG_UUID}".encode("ascii")).decode("ascii").rstrip("=")
+    assert org_uuid(api_id) == ORG_UUID
+    assert org_uuid(ORG_UUID.upper()) == ORG_UUID
+    assert org_uuid(None) is None
+
+def test_registry_maps_orgs_to_tenants():
+    registry = TenantRegistry()
+    registry.configure({"orgs": [{"name": "acme", "org_id": ORG_UUID}]})
+    assert registry.for_org(ORG_UUID).name == "acme"
+    assert registry.for_org("unknown") is registry.default
+    registry.configure({"unknown_org": "reject", "orgs": [{"name": "acme", "org_id": ORG_UUID}]})
+    assert registry.for_org("unknown") is None
+
+def test_tenant_context_is_restored():
+    acme = Tenant("acme", org_id = ORG_UUID)
+    default = current_tenant()
+    with tenant_context(acme):
+        assert current_tenant() is acme
+        assert run_as(Tenant("other"), lambda: current_tenant().name) == "other"
+        assert current_tenant() is acme
+    assert current_tenant() is default
+
+def test_flight_keys_are_per_tenant(recording_bot):
+    with tenant_context(Tenant("acme")):
+        acme_key = recording_bot.flight_key("123456789", "host@example.com", 10)
+    with tenant_context(Tenant("globex")):
+        globex_key = recording_bot.flight_key("123456789", "host@example.com", 10)
+    assert acme_key != globex_key
+
+def test_recordings_keys_are_per_host(recording_bot):
+    assert recording_bot.recordings_key("meeting-1", "Host@Example.com") == recording_bot.recordings_key("meeting-1", "host@example.com")
+    assert recording_bot.recordings_key("meeting-1", "host@example.com") != recording_bot.recordings_key("meeting-1", "other@example.com")
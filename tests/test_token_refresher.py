@@ -0,0 +1,57 @@
+import time
+
+from token_refresher import TokenRefresher
+
+class FakeToken(object):
+    def __init__(self, expires_in, refresh_result = True):
+        self.expires_at = time.time() + expires_in
+        self.refresh_token_expires_at = time.time() + 90 * 86400
+        self.refresh_result = refresh_result
+        self.token_refreshed = False
+        self.refreshes = 0
+
+    def sync(self):
+        pass
+
+    def expires_in_seconds(self):
+        return self.expires_at - time.time()
+
+    def refresh_if_needed(self, margin):
+        self.refreshes += 1
+        if isinstance(self.refresh_result, Exception):
+            raise self.refresh_result
+        if self.refresh_result:
+            self.expires_at = time.time() + 14 * 86400
+            self.token_refreshed = True
+        return self.refresh_result
+
+def test_token_is_refreshed_within_the_margin():
+    token = FakeToken(3600)
+    refresher = TokenRefresher(lambda: token, margin = 7200, check_interval = 300, retry_interval = 30, name = "test-token")
+    assert refresher.run_once() == 300
+    assert token.refreshes == 1
+    assert refresher.status()["healthy"]
+    assert refresher.last_refresh is not None
+
+def test_valid_token_is_checked_again_at_the_margin():
+    token = FakeToken(7200 + 100)
+    refresher = TokenRefresher(lambda: token, margin = 7200, check_interval = 300, retry_interval = 30, name = "test-token")
+    assert 30 <= refresher.run_once() <= 100
+    assert token.refreshes == 0
+
+def test_failed_refresh_backs_off():
+    token = FakeToken(600, refresh_result = ConnectionError("OAuth endpoint unreachable"))
+    refresher = TokenRefresher(lambda: token, margin = 7200, retry_interval = 30, max_backoff = 100, name = "test-token")
+    assert [refresher.run_once() for _ in range(4)] == [30, 60, 100, 100]
+    status = refresher.status()
+    assert not status["healthy"]
+    assert status["failures"] == 4
+    assert "unreachable" in status["last_error"]
+    token.refresh_result = True
+    refresher.run_once()
+    assert refresher.failures == 0
+
+def test_missing_tokens():
+    refresher = TokenRefresher(lambda: None, check_interval = 300, name = "test-token")
+    assert refresher.run_once() == 300
+    assert refresher.last_error == "no tokens, authorization needed"
@@ -0,0 +1,49 @@
+import os
+import json
+import time
+import threading
+
+import pytest
+
+from token_store import TokenStore, FileTokenStore, create_token_store, WEBEX_TOKEN_FILE
+
+@pytest.fixture(params = ["file", "sqlite"])
+def store(request, tmp_path):
+    return create_token_store({"backend": request.param, "path": str(tmp_path)})
+
+def test_versions_grow_with_every_save(store):
+    assert store.load("default") == (None, 0)
+    assert store.save("default", {"access_token": "one"}) == 1
+    assert store.save("default", {"access_token": "two"}) == 2
+    assert store.load("default") == ({"access_token": "two"}, 2)
+    # another process sees the new version
+    other = type(store)(store.path)
+    assert other.version("default") == 2
+
+def test_lock_is_exclusive_and_reentrant(store):
+    order = []
+    def wait_for_lock():
+        with store.lock("default"):
+            order.append("waiter")
+    with store.lock("default"):
+        waiter = threading.Thread(target = wait_for_lock)
+        waiter.start()
+        time.sleep(0.1)
+        with store.lock("default"):
+            store.save("default", {"access_token": "refreshed"})
+        order.append("holder")
+    waiter.join(5)
+    assert order == ["holder", "waiter"]
+
+def test_tokens_of_previous_versions_are_loaded(tmp_path):
+    with open(os.path.join(str(tmp_path), WEBEX_TOKEN_FILE.format("default")), "w") as file:
+        json.dump({"access_token": "old"}, file)
+    assert FileTokenStore(str(tmp_path)).load("default") == ({"access_token": "old"}, 1)
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_token_store({"backend": "redis"})
+
+def test_backends_implement_the_store(tmp_path):
+    with pytest.raises(TypeError):
+        TokenStore(str(tmp_path))
@@ -0,0 +1,65 @@
+import json
+
+from traffic_capture import TrafficRecorder
+from webhook_replay import load_capture, schedule, unique_payload, run_load, saturation
+from webex_api_stub import WebexApiStub, parse_command_mix
+
+WEBHOOK = {"resource": "messages", "event": "created", "data": {"id": "message-1", "personEmail": "User@Example.com",
+    "roomId": "room-1"}}
+
+def test_capture_is_sanitized_and_replayable(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    recorder = TrafficRecorder(path)
+    recorder.record("webhook", WEBHOOK)
+    recorder.record("webhook", dict(WEBHOOK, data = dict(WEBHOOK["data"], personEmail = "user@example.com", text = "rec 123")))
+    recorder.close()
+    records = load_capture(path)
+    assert [record["kind"] for record in records] == ["webhook", "webhook"]
+    first, second = [record["payload"]["data"] for record in records]
+    assert first["id"] == "message-1" and first["roomId"] == "room-1"
+    assert first["personEmail"] != "User@Example.com" and first["personEmail"] == second["personEmail"]
+    assert second["text"].startswith("redacted:")
+    assert "rec 123" not in open(path).read()
+
+def test_capture_stops_at_max_bytes(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path / "capture.jsonl"), max_bytes = 300)
+    for _ in range(10):
+        recorder.record("webhook", WEBHOOK)
+    recorder.close()
+    assert 0 < recorder.records < 10
+
+def test_plain_payloads_are_loaded_as_webhooks(tmp_path):
+    path = tmp_path / "payloads.json"
+    path.write_text(json.dumps([WEBHOOK]))
+    assert load_capture(str(path)) == [{"ts": None, "kind": "webhook", "payload": WEBHOOK}]
+
+def test_schedule_and_unique_payloads():
+    records = [{"ts": 100.0}, {"ts": 101.0}, {"ts": 103.0}]
+    assert schedule(records, multiplier = 2) == [0.0, 0.5, 1.5]
+    assert schedule([{}, {}], rate = 10) == [0.0, 0.1]
+    assert unique_payload("webhook", WEBHOOK, "-x")["data"]["id"] == "message-1-x"
+    assert WEBHOOK["data"]["id"] == "message-1"
+
+def test_open_loop_load():
+    sent = []
+    records = [{"ts": None, "kind": "webhook", "payload": WEBHOOK} for _ in range(20)]
+    result = run_load(records, lambda kind, payload: sent.append(payload["data"]["id"]), rate = 200)
+    assert result["events"] == 20 and result["errors"] == 0
+    assert len(set(sent)) == 20
+
+def test_saturation_is_where_the_bot_falls_behind():
+    def result(multiplier, throughput, p95):
+        return {"multiplier": multiplier, "offered_rate": 10.0 * multiplier, "throughput": throughput, "p95": p95, "errors": 0}
+    assert saturation([result(1, 10, 0.1), result(2, 20, 0.12), result(4, 25, 0.2)]) == {"max_throughput": 25, "knee_multiplier": 4}
+    assert saturation([result(1, 10, 0.1), result(2, 20, 0.5)])["knee_multiplier"] == 2
+    assert saturation([result(1, 10, 0.1), result(2, 20, 0.12)])["knee_multiplier"] is None
+
+def test_stub_answers_the_bot_calls():
+    stub = WebexApiStub(latency = 0, meetings_per_series = 2, recordings_per_meeting = 3)
+    status, meetings = stub.dispatch("GET", "/v1/meetings?meetingSeriesId=series-123&hostEmail=host@example.com")
+    assert status == 200 and len(meetings["items"]) == 2
+    status, recordings = stub.dispatch("GET", f"/v1/recordings?meetingId={meetings['items'][0]['id']}")
+    assert len(recordings["items"]) == 3
+    assert stub.dispatch("GET", "/v1/unknown")[0] == 404
+    assert stub.counts["GET meetings"] == 1 and stub.counts["not_found"] == 1
+    assert [round(weight, 2) for _, weight in parse_command_mix("help=1,rec 1=3")] == [0.25, 1.0]
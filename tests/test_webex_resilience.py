@@ -0,0 +1,86 @@
+import time
+import types
+
+import pytest
+import requests
+
+import webex_resilience
+from webex_resilience import (deadline, remaining, check_deadline, CircuitBreaker, DeadlineExceeded, CircuitOpenError,
+    endpoint_name, webex_get)
+
+class FakeSession(object):
+    base_url = "https://webexapis.com/v1/"
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def get(self, url, params, timeout = None):
+        self.calls.append((url, timeout))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+@pytest.fixture(autouse = True)
+def breakers(monkeypatch):
+    # the circuits opened here don't leak into the other tests
+    monkeypatch.setattr(webex_resilience, "_breakers", {})
+
+def fake_api(outcomes):
+    return types.SimpleNamespace(_session = FakeSession(outcomes))
+
+def test_nested_deadline_only_shortens_the_budget():
+    assert remaining() is None
+    with deadline(10):
+        with deadline(60):
+            assert remaining() <= 10
+        with deadline(0.01):
+            time.sleep(0.02)
+            with pytest.raises(DeadlineExceeded):
+                check_deadline()
+        assert 9 < remaining() <= 10
+    assert remaining() is None
+
+def test_circuit_opens_and_probes_once(monkeypatch):
+    monkeypatch.setitem(webex_resilience.options, "failure_threshold", 2)
+    monkeypatch.setitem(webex_resilience.options, "reset_timeout", 0.05)
+    circuit = CircuitBreaker("test")
+    circuit.record_failure()
+    assert circuit.allow()
+    circuit.record_failure()
+    assert circuit.state == "open"
+    assert not circuit.allow()
+    time.sleep(0.06)
+    assert circuit.allow()
+    assert not circuit.allow() # a single probe at a time
+    circuit.record_success()
+    assert circuit.state == "closed"
+    assert circuit.allow()
+
+def test_server_errors_open_the_circuit_of_the_endpoint(monkeypatch):
+    monkeypatch.setitem(webex_resilience.options, "failure_threshold", 2)
+    monkeypatch.setitem(webex_resilience.options, "reset_timeout", 60)
+    api = fake_api([requests.ConnectionError("reset"), requests.ConnectionError("reset"), {"id": "ok"}])
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            webex_get(api, "people/abc")
+    with pytest.raises(CircuitOpenError):
+        webex_get(api, "people/abc")
+    assert len(api._session.calls) == 2
+    assert webex_resilience.circuit_states()["people/{id}"] == "open"
+
+def test_call_timeout_follows_the_deadline(monkeypatch):
+    monkeypatch.setitem(webex_resilience.options, "call_timeout", 10)
+    api = fake_api([{"id": "ok"}, requests.Timeout("slow")])
+    with deadline(2):
+        assert webex_get(api, "rooms/abc") == {"id": "ok"}
+        with pytest.raises(DeadlineExceeded):
+            webex_get(api, "rooms/abc")
+    assert all(timeout <= 2 for _, timeout in api._session.calls)
+    # the shortened timeout is not counted against the endpoint
+    assert webex_resilience.breaker("rooms/{id}").failures == 0
+
+def test_endpoint_names():
+    assert endpoint_name("recordings/abc") == "recordings/{id}"
+    assert endpoint_name("/meetings") == "meetings"
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+TARGET_URL = "https://bot.example.com/webhook"
+
+def webhook(resource, event, webhook_id, target_url = TARGET_URL, **attributes):
+    return SimpleNamespace(resource = resource, event = event, id = webhook_id, targetUrl = target_url, appId = "app", **attributes)
+
+def test_plan_keeps_matching_and_deletes_stale_webhooks(recording_bot):
+    registered = [
+        webhook("messages", "created", "keep"),
+        webhook("messages", "created", "duplicate"),
+        webhook("rooms", "updated", "other-url", target_url = "https://old.example.com/webhook"),
+        webhook("memberships", "created", "filtered", filter = "roomId=abc"),
+        webhook("memberships", "deleted", "inactive", status = "inactive")
+    ]
+    desired = {"messages": ["created"], "rooms": ["updated"], "memberships": ["created", "deleted"]}
+    to_create, to_delete, to_keep, api, owned_by = recording_bot.webhook_plan(registered, desired, TARGET_URL, "api")
+
+    assert [item.id for item in to_keep] == ["keep"]
+    assert sorted(item.id for item in to_delete) == ["duplicate", "filtered", "inactive", "other-url"]
+    assert to_create == [("memberships", "created"), ("memberships", "deleted"), ("rooms", "updated")]
+
+def test_keep_only_plan_and_create_plan_report(recording_bot, monkeypatch):
+    created = []
+    def create_webhook(resource, event, target_url, api = None, owned_by = None):
+        created.append((resource, event, api, owned_by))
+        return resource != "recordings"
+    monkeypatch.setattr(recording_bot, "create_webhook", create_webhook)
+
+    bot_plan = ([], [], [webhook("messages", "created", "wh1"), webhook("attachmentActions", "created", "wh2")], "bot-api", None)
+    org_plan = ([("meetings", "ended"), ("recordings", "created")], [], [], "org-api", "org")
+    result, report = recording_bot.apply_webhook_plans([bot_plan, org_plan], TARGET_URL)
+
+    assert result is False
+    assert [(item["action"], item["resource"], item["status"]) for item in report] == [
+        ("keep", "messages", "ok"),
+        ("keep", "attachmentActions", "ok"),
+        ("create", "meetings", "ok"),
+        ("create", "recordings", "failed")
+    ]
+    assert sorted(created) == [("meetings", "ended", "org-api", "org"), ("recordings", "created", "org-api", "org")]
+    # the report is rendered by GET /webhook
+    for item in report:
+        "{action}{resource}{event}{id}{status}".format(**item)